@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class GenerationCache:
+    """Content-addressed on-disk cache of generated images.
+
+    Entries are keyed on a hash of the model id and the full input dict, so an
+    identical request is served from disk instead of calling Replicate again.
+    The cache is bounded by total size and evicts least recently used entries.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(model: str, model_input: Dict[str, Any]) -> str:
+        """Hash the model id and input dict into a stable cache key"""
+        payload = json.dumps(
+            {"model": model, "input": model_input},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU order from files already on disk, oldest first"""
+        files = []
+        for path in self.cache_dir.glob("*/*.png"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits (lock held)"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._path_for(key).unlink()
+            except OSError:
+                pass
+
+    def _lookup(self, key: str) -> Optional[Path]:
+        """Return the cached file for a key and mark it recently used (lock held)"""
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        path = self._path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            self._total_bytes -= self._entries.pop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return path
+
+    def _store(self, key: str, size: int) -> None:
+        """Record a newly written entry and evict if over budget"""
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def _temp_path(self, path: Path) -> Path:
+        return path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+
+    def get(self, model: str, model_input: Dict[str, Any]) -> Optional[bytes]:
+        """Return cached image bytes for this request, or None on a miss"""
+        key = self.make_key(model, model_input)
+        with self._lock:
+            path = self._lookup(key)
+            if path is None:
+                return None
+            return path.read_bytes()
+
+    def get_to_file(self, model: str, model_input: Dict[str, Any], filepath: Path) -> bool:
+        """Copy the cached image for this request to ``filepath`` if present"""
+        key = self.make_key(model, model_input)
+        filepath = Path(filepath)
+        with self._lock:
+            path = self._lookup(key)
+            if path is None:
+                return False
+            tmp_path = self._temp_path(filepath)
+            shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, filepath)
+        return True
+
+    def put(self, model: str, model_input: Dict[str, Any], data: bytes) -> None:
+        """Store image bytes for this request and evict if over budget"""
+        key = self.make_key(model, model_input)
+        path = self._path_for(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = self._temp_path(path)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._store(key, len(data))
+
+    def put_file(self, model: str, model_input: Dict[str, Any], filepath: Path) -> None:
+        """Store a copy of an image file for this request"""
+        key = self.make_key(model, model_input)
+        path = self._path_for(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = self._temp_path(path)
+        shutil.copyfile(filepath, tmp_path)
+        os.replace(tmp_path, path)
+        self._store(key, path.stat().st_size)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current cache size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+            }
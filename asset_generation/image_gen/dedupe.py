@@ -0,0 +1,184 @@
+import random
+import re
+import unicodedata
+import zlib
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+# Multiply-add-shift hashing of 32-bit shingles: ((a * x + b) mod 2^64) >> 32
+_MASK64 = (1 << 64) - 1
+_WORD = re.compile(r"[a-z0-9]+")
+
+COLLAPSE = "collapse"
+FLAG = "flag"
+
+
+def normalize_prompt(prompt: str) -> List[str]:
+    """Lowercased words of a prompt, ignoring punctuation, quotes and accents"""
+    # Apostrophes are dropped so "boy's" and "boy’s" both become "boys"
+    text = prompt.replace("’", "").replace("'", "")
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _WORD.findall(text.lower())
+
+
+def shingles(words: Sequence[str], size: int = 3) -> Set[int]:
+    """Hashed word n-grams; prompts shorter than size become one shingle"""
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode())}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode()) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _bands_for(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Band count and rows per band whose LSH s-curve crosses closest to threshold"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        # Similarity at which a pair becomes a candidate with probability ~0.5;
+        # bias slightly low so borderline pairs still get checked exactly
+        crossing = (1 / bands) ** (1 / rows)
+        error = abs(crossing - threshold * 0.9)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class PromptDeduper:
+    """MinHash/LSH index that finds near-duplicate prompts before generation.
+
+    Prompts are normalized to words and split into word shingles. Each
+    prompt gets a MinHash signature, and LSH banding turns that into a few
+    bucket lookups, so finding candidates costs the same no matter how many
+    prompts are indexed. Candidates are confirmed with the exact Jaccard
+    similarity of their shingles against ``threshold``.
+
+    With ``mode="collapse"`` a duplicate is generated once, through the
+    first prompt of its group; with ``mode="flag"`` every prompt is still
+    generated and duplicates only show up in the report.
+
+    Only group representatives are kept, so memory grows with the number of
+    distinct prompts. ``max_representatives`` caps that for streamed input by
+    forgetting the oldest representatives; duplicates further apart than the
+    window are then generated again.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        mode: str = COLLAPSE,
+        num_perm: int = 64,
+        shingle_size: int = 3,
+        seed: int = 1,
+        max_representatives: Optional[int] = None
+    ):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        if mode not in (COLLAPSE, FLAG):
+            raise ValueError(f"mode must be '{COLLAPSE}' or '{FLAG}'")
+        self.threshold = threshold
+        self.mode = mode
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_representatives = max_representatives
+        self.bands, self.rows = _bands_for(threshold, num_perm)
+        rng = random.Random(seed)
+        self._perms = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(num_perm)]
+        self.reset()
+
+    def reset(self) -> None:
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        # Shingles, labels and bucket keys of representatives only, oldest first in _order
+        self._shingles: Dict[int, Set[int]] = {}
+        self._labels: Dict[int, Any] = {}
+        self._order: Deque[Tuple[int, List[Tuple[int, ...]]]] = deque()
+        self._count = 0
+        # Exact Jaccard checks of LSH candidates, the part that would grow quadratically without banding
+        self.comparisons = 0
+
+    def signature(self, shingle_set: Set[int]) -> List[int]:
+        values = tuple(shingle_set)
+        return [min([((a * s + b) & _MASK64) >> 32 for s in values]) for a, b in self._perms]
+
+    def add(self, prompt: str, label: Any = None) -> Tuple[int, Optional[int], float]:
+        """Index a prompt; returns its index, the group representative it duplicates, and their similarity.
+
+        label is kept with the prompt if it becomes a representative, see label().
+        """
+        index = self._count
+        self._count += 1
+        shingle_set = shingles(normalize_prompt(prompt), self.shingle_size)
+        signature = self.signature(shingle_set)
+        keys = [tuple(signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+        candidates: Set[int] = set()
+        for band, key in enumerate(keys):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        match, similarity = None, 0.0
+        # Earlier prompts first so ties go to the first member of a group
+        self.comparisons += len(candidates)
+        for candidate in sorted(candidates):
+            score = jaccard(shingle_set, self._shingles[candidate])
+            if score >= self.threshold and score > similarity:
+                match, similarity = candidate, score
+
+        # Only group representatives are indexed, which keeps buckets small
+        # even when thousands of prompts collapse onto one
+        if match is None:
+            self._shingles[index] = shingle_set
+            self._labels[index] = label
+            self._order.append((index, keys))
+            for band, key in enumerate(keys):
+                self._buckets[band][key].append(index)
+            if self.max_representatives and len(self._order) > self.max_representatives:
+                self._evict()
+        return index, match, similarity
+
+    def label(self, index: int) -> Any:
+        """The label a representative was added with"""
+        return self._labels.get(index)
+
+    def _evict(self) -> None:
+        """Forget the oldest representative"""
+        index, keys = self._order.popleft()
+        for band, key in enumerate(keys):
+            bucket = self._buckets[band][key]
+            bucket.remove(index)
+            if not bucket:
+                del self._buckets[band][key]
+        del self._shingles[index]
+        del self._labels[index]
+
+    def dedupe(self, prompts: Sequence[str]) -> Dict[str, Any]:
+        """Group a prompt list; clears the index first.
+
+        Returns ``canonical`` (for each prompt, the index of the prompt
+        generated in its place), ``unique`` (indexes to generate) and
+        ``report`` (one entry per duplicate).
+        """
+        self.reset()
+        report = []
+        canonical = []
+        for prompt in prompts:
+            index, match, similarity = self.add(prompt)
+            canonical.append(index if match is None else match)
+            if match is not None:
+                report.append({
+                    "index": index,
+                    "prompt": prompt,
+                    "duplicate_of": match,
+                    "similarity": round(similarity, 3),
+                })
+
+        if self.mode == FLAG:
+            unique = list(range(len(prompts)))
+        else:
+            unique = [i for i, c in enumerate(canonical) if c == i]
+        return {"canonical": canonical, "unique": unique, "report": report}
@@ -0,0 +1,106 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# Errors worth resuming from; HTTP error statuses are raised straight away
+RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class IncompleteDownloadError(IOError):
+    """Raised when the server closes the stream before Content-Length bytes arrive"""
+
+
+def get_session(pool_size: int = 16) -> requests.Session:
+    """Return the process-wide pooled HTTP session, creating it on first use.
+
+    Connections are kept alive and reused across downloads, so a batch pays
+    for one TLS handshake per pooled connection instead of one per image.
+    ``pool_size`` only applies when the session is first created.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def download_to_file(
+    url: str,
+    filepath: Union[str, Path],
+    session: Optional[requests.Session] = None,
+    retries: int = 3,
+    timeout: int = 10,
+    chunk_size: int = 64 * 1024,
+    retry_delay: float = 1.0
+) -> int:
+    """Stream ``url`` into ``filepath`` and return the number of bytes written.
+
+    Data is written in chunks to a temporary file next to ``filepath`` and
+    atomically renamed once complete, so readers never see a partial image.
+    If the connection drops, the download resumes with a Range request when
+    the server supports it and starts over otherwise.
+    """
+    filepath = Path(filepath)
+    part_path = filepath.with_name(f".{filepath.name}.{uuid.uuid4().hex}.part")
+    session = session or get_session()
+    written = 0
+
+    try:
+        for attempt in range(retries):
+            headers = {"Range": f"bytes={written}-"} if written else {}
+            try:
+                with session.get(url, stream=True, timeout=timeout, headers=headers) as response:
+                    if written and response.status_code == 206:
+                        mode = "ab"
+                    else:
+                        response.raise_for_status()
+                        mode = "wb"
+                        written = 0
+
+                    expected = response.headers.get("Content-Length")
+                    received = 0
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if chunk:
+                                f.write(chunk)
+                                received += len(chunk)
+                                written += len(chunk)
+
+                    if expected is not None and received < int(expected):
+                        raise IncompleteDownloadError(
+                            f"Received {received} of {expected} bytes from {url}"
+                        )
+
+                os.replace(part_path, filepath)
+                return written
+
+            except RETRYABLE_ERRORS + (IncompleteDownloadError,) as e:
+                logging.warning(
+                    f"Download attempt {attempt + 1}/{retries} failed after {written} bytes: {str(e)}"
+                )
+                if attempt == retries - 1:
+                    raise
+                time.sleep(retry_delay * (attempt + 1))
+    finally:
+        if part_path.exists():
+            part_path.unlink()
+
+    return written
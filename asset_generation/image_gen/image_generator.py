@@ -1,136 +1,289 @@
+import argparse
 import os
 import time
+import uuid
 import logging
-import requests
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterable, Iterator
 from dotenv import load_dotenv
 import replicate
 from datetime import datetime
 from tqdm import tqdm
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 import random
+import threading
+
+from .cache import GenerationCache
+from .dedupe import COLLAPSE, PromptDeduper
+from .downloads import download_to_file, get_session
+from .ingest import FORMATS, iter_prompt_records
+from .manifest import AssetManifest
+from .postprocess import PostProcessor, summarize_timings
+from .rate_limiter import TokenBucket
+from .router import ModelRouter
+
+PRIMARY_MODEL = "black-forest-labs/flux-1.1-pro"
+FALLBACK_MODEL = "black-forest-labs/flux-dev"
+
+# Base input of each routed model; the prompt, seed and per-prompt params are added per call
+MODEL_INPUTS: Dict[str, Dict[str, Any]] = {
+    PRIMARY_MODEL: {
+        "aspect_ratio": "16:9",
+        "width": 1024,
+        "height": 576,
+        "output_format": "png",
+        "output_quality": 95,
+        "safety_tolerance": 5,
+    },
+    FALLBACK_MODEL: {
+        "go_fast": True,
+        "guidance": 3.5,
+        "megapixels": "1",
+        "num_outputs": 1,
+        "aspect_ratio": "16:9",
+        "output_format": "png",
+        "output_quality": 100,
+        "prompt_strength": 0.8,
+        "num_inference_steps": 50,
+    },
+}
 
 class ImageGenerator:
-    def __init__(self, output_dir: str = "generated_images"):
+    def __init__(
+        self,
+        output_dir: str = "generated_images",
+        max_concurrency: int = 4,
+        requests_per_second: Optional[float] = None,
+        burst: Optional[int] = None,
+        seed: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = 2 * 1024 ** 3,
+        postprocessor: Optional[PostProcessor] = None,
+        manifest_path: Optional[str] = None,
+        router: Optional[ModelRouter] = None,
+        deduper: Optional[PromptDeduper] = None
+    ):
         load_dotenv()
         self.api_token = os.getenv("REPLICATE_API_TOKEN")
         if not self.api_token:
             raise ValueError("REPLICATE_API_TOKEN not found in environment variables")
         
-        # Generate a random seed for this session
-        self.seed = random.randint(0, 2**32 - 1)  # Using 32-bit integer range
+        # Use a fixed seed when given so re-runs can hit the cache, else a random one
+        self.seed = seed if seed is not None else random.randint(0, 2**32 - 1)  # Using 32-bit integer range
         print(f"Using seed: {self.seed}")  # Print to console
         logging.info(f"Initialized with seed: {self.seed}")  # Log to file
         
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
-        self.metadata_store = {}
+        # Durable record of every generated image, queryable by scene or prompt
+        self.manifest = AssetManifest(manifest_path or self.output_dir / "manifest.sqlite")
+        # Model and input of each thread's last successful run, for the manifest
+        self._local = threading.local()
+        
+        # Concurrency and rate limiting for batch runs
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = (
+            TokenBucket(requests_per_second, burst) if requests_per_second else None
+        )
+        
+        # Optional content-addressed cache of previously generated images
+        self.cache = GenerationCache(cache_dir, cache_max_bytes) if cache_dir else None
+        
+        # Pooled keep-alive session shared by all download threads
+        self.session = get_session(pool_size=max(16, self.max_concurrency))
+        
+        # Chooses between the primary and fallback model by recent latency and errors
+        self.router = router or ModelRouter([PRIMARY_MODEL, FALLBACK_MODEL])
+        
+        # Optional near-duplicate prompt detection before batch generation
+        self.deduper = deduper
+        self.last_dedupe_report: List[Dict[str, Any]] = []
+        
+        # Optional thumbnails, previews and contact sheets built on a process pool
+        self.postprocessor = postprocessor
     
-    def generate_with_primary_model(self, prompt: str) -> Optional[bytes]:
-        """Try generating with flux-1.1-pro model"""
+    def _throttle(self) -> None:
+        """Wait for a rate limit token before calling the Replicate API"""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+    
+    def _extract_image_url(self, output: Any) -> Optional[str]:
+        """Get the image URL from a Replicate model output"""
+        if not output:
+            return None
+        if isinstance(output, list):
+            return output[0]
+        if isinstance(output, str):
+            return output
+        raise ValueError(f"Unexpected output format: {type(output)}")
+    
+    def _run_model(self, model: str, model_input: Dict[str, Any], filepath: Path) -> bool:
+        """Run a Replicate model and stream the image into filepath, serving repeats from the cache"""
+        if self.cache and self.cache.get_to_file(model, model_input, filepath):
+            self._local.last_run = {"model": model, "params": model_input, "cached": True}
+            return True
+        
+        self._throttle()
+        output = replicate.run(model, input=model_input)
+        
+        image_url = self._extract_image_url(output)
+        if not image_url:
+            return False
+        
+        download_to_file(image_url, filepath, session=self.session)
+        
+        if self.cache:
+            self.cache.put_file(model, model_input, filepath)
+        self._local.last_run = {"model": model, "params": model_input, "cached": False}
+        return True
+    
+    def _read_generated(self, generate: Callable[[Path], bool]) -> Optional[bytes]:
+        """Run a file-based generation step and return the image as bytes"""
+        filepath = self.output_dir / f".{uuid.uuid4().hex}.png"
         try:
-            output = replicate.run(
-                "black-forest-labs/flux-1.1-pro",
-                input={
-                    "prompt": prompt,
-                    "aspect_ratio": "16:9",
-                    "output_format": "png",
-                    "output_quality": 95,
-                    "safety_tolerance": 5,
-                    "seed": self.seed
-                }
-            )
-            
-            if output:
-                return requests.get(output, timeout=10).content
+            if generate(filepath):
+                return filepath.read_bytes()
             return None
+        finally:
+            if filepath.exists():
+                filepath.unlink()
+    
+    def _model_input(self, model: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Input for generate_to_file calls to each model, with per-prompt overrides"""
+        base = MODEL_INPUTS.get(model, MODEL_INPUTS[PRIMARY_MODEL])
+        return {"prompt": prompt, **base, "seed": self.seed, **(params or {})}
+    
+    def _routed_run(
+        self,
+        model: str,
+        prompt: str,
+        filepath: Path,
+        params: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Run a model and report its latency and outcome to the router"""
+        self._local.last_run = {}
+        start = time.perf_counter()
+        try:
+            ok = self._run_model(model, self._model_input(model, prompt, params), filepath)
+        except Exception as e:
+            # A refused prompt says nothing about the model's health
+            self.router.record(model, time.perf_counter() - start, "NSFW content detected" in str(e))
+            raise
+        # Cache hits would hide how slow the model really is
+        latency = None if self._local.last_run.get("cached") else time.perf_counter() - start
+        self.router.record(model, latency, ok)
+        return ok
+    
+    def _fallback_to_file(self, prompt: str, filepath: Path, params: Optional[Dict[str, Any]] = None) -> bool:
+        try:
+            return self._routed_run(FALLBACK_MODEL, prompt, filepath, params)
+                
+        except Exception as e:
+            logging.error(f"Fallback model failed: {str(e)}")
+            return False
+    
+    def _primary_to_file(self, prompt: str, filepath: Path, params: Optional[Dict[str, Any]] = None) -> bool:
+        try:
+            return self._routed_run(PRIMARY_MODEL, prompt, filepath, params)
             
         except Exception as e:
             if "NSFW content detected" in str(e):
-                return None
+                return False
             raise e
+    
+    def generate_with_primary_model(self, prompt: str) -> Optional[bytes]:
+        """Try generating with flux-1.1-pro model, reporting the outcome to the router"""
+        return self._read_generated(lambda filepath: self._primary_to_file(prompt, filepath))
             
     def generate_with_fallback_model(self, prompt: str) -> Optional[bytes]:
         """Try generating with flux-dev model"""
-        try:
-            output = replicate.run(
-                "black-forest-labs/flux-dev",
-                input={
-                    "prompt": prompt,
-                    "go_fast": True,
-                    "guidance": 3.5,
-                    "megapixels": "1",
-                    "num_outputs": 1,
-                    "aspect_ratio": "16:9",
-                    "output_format": "png",
-                    "output_quality": 100,
-                    "prompt_strength": 0.8,
-                    "num_inference_steps": 50,
-                    "seed": self.seed
-                }
-            )
-            
-            if isinstance(output, list) and output:
-                image_url = output[0]
-                response = requests.get(image_url, timeout=10)
-                if response.status_code == 200:
-                    return response.content
-                    
-            return None
-                
-        except Exception as e:
-            logging.error(f"Fallback model failed: {str(e)}")
-            return None
+        return self._read_generated(lambda filepath: self._fallback_to_file(prompt, filepath))
 
-    def generate_single_image(
-        self, 
-        prompt: str, 
+    def generate_to_file(
+        self,
+        prompt: str,
+        filepath: Path,
         retries: int = 3,
-        retry_delay: int = 5
-    ) -> Optional[bytes]:
-        """Generate single image with proper versioning and parameters."""
+        retry_delay: Optional[float] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Generate a single image straight into filepath without holding it in memory.
+        
+        Each attempt goes to the model the router currently prefers; failed
+        attempts wait with exponential backoff and jitter (retry_delay
+        overrides the router's base delay). params override model input.
+        """
         for attempt in range(retries):
+            model = self.router.pick()
             try:
-                output = replicate.run(
-                    "black-forest-labs/flux-1.1-pro",
-                    input={
-                        "prompt": prompt,
-                        "aspect_ratio": "16:9",
-                        "width": 1024,
-                        "height": 576,
-                        "output_format": "png",
-                        "seed": self.seed
-                    }
-                )
-                
-                if isinstance(output, list) and output:
-                    image_url = output[0]
-                elif isinstance(output, str):
-                    image_url = output
-                else:
-                    raise ValueError(f"Unexpected output format: {type(output)}")
-                    
-                response = requests.get(image_url, timeout=10)
-                if response.status_code == 200:
-                    return response.content
+                if model is None:
+                    raise RuntimeError("All models are unavailable (circuit breakers open)")
+                if self._routed_run(model, prompt, filepath, params):
+                    return True
+                logging.error(f"Attempt {attempt + 1}/{retries} returned no image from {model}")
                     
             except Exception as e:
-                if "NSFW content detected" in str(e):
+                if "NSFW content detected" in str(e) and model != FALLBACK_MODEL:
                     try:
-                        return self.generate_with_fallback_model(prompt)
+                        return self._fallback_to_file(prompt, filepath, params)
                     except Exception as fallback_e:
                         logging.error(f"Fallback model failed: {str(fallback_e)}")
                 
                 logging.error(f"Attempt {attempt + 1}/{retries} failed: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(retry_delay)
+            
+            if attempt < retries - 1:
+                time.sleep(self.router.backoff(attempt, retry_delay))
                     
         logging.error(f"All attempts failed for prompt: {prompt}")
-        return None
+        return False
+
+    def generate_recorded(
+        self,
+        prompt: str,
+        filepath: Path,
+        scene_id: Optional[str] = None,
+        prompt_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Generate into filepath and record the result in the manifest; returns whether it succeeded"""
+        self._local.last_run = {}
+        start = time.perf_counter()
+        if not self.generate_to_file(prompt, filepath, params=params):
+            return False
+        latency = time.perf_counter() - start
+        
+        run = self._local.last_run
+        self.manifest.record(
+            filepath,
+            prompt,
+            model=run.get("model"),
+            params=run.get("params"),
+            scene_id=scene_id,
+            prompt_id=prompt_id,
+            metadata={**(metadata or {}), "cached": run.get("cached", False)},
+            latency_seconds=latency
+        )
+        return True
 
-    def batch_generate(self, prompts: List[str]) -> List[str]:
-        """Generate multiple images with proper prompt filtering."""
+    def generate_single_image(
+        self, 
+        prompt: str, 
+        retries: int = 3,
+        retry_delay: Optional[float] = None
+    ) -> Optional[bytes]:
+        """Generate single image with proper versioning and parameters."""
+        return self._read_generated(
+            lambda filepath: self.generate_to_file(prompt, filepath, retries, retry_delay)
+        )
+
+    def batch_generate(
+        self,
+        prompts: List[str],
+        max_concurrency: Optional[int] = None
+    ) -> List[str]:
+        """Generate multiple images concurrently, returning files in prompt order."""
         # Filter out square brackets and empty lines
         filtered_prompts = [
             prompt.strip() 
@@ -138,24 +291,153 @@ class ImageGenerator:
             if prompt.strip() and prompt.strip() not in ['[', ']']
         ]
         
-        generated_files = []
-        with tqdm(total=len(filtered_prompts), desc="Generating images") as pbar:
-            for i, prompt in enumerate(filtered_prompts):
-                logging.info(f"Processing prompt {i+1}/{len(filtered_prompts)}: {prompt}")
+        # Collapse or flag near-duplicate prompts before paying for them
+        canonical = list(range(len(filtered_prompts)))
+        to_generate = canonical
+        self.last_dedupe_report = []
+        if self.deduper:
+            dedupe = self.deduper.dedupe(filtered_prompts)
+            canonical, to_generate = dedupe["canonical"], dedupe["unique"]
+            self.last_dedupe_report = dedupe["report"]
+            if dedupe["report"]:
+                logging.info(
+                    f"{len(dedupe['report'])} near-duplicate prompts "
+                    f"({self.deduper.mode}), generating {len(to_generate)}/{len(filtered_prompts)}"
+                )
+        
+        workers = max(1, max_concurrency or self.max_concurrency)
+        # Unique per batch so runs started in the same second never overwrite each other
+        batch_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        results: List[Optional[str]] = [None] * len(filtered_prompts)
+        
+        with tqdm(total=len(to_generate), desc="Generating images") as pbar:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self._generate_batch_item, i, filtered_prompts[i], len(filtered_prompts), batch_id): i
+                    for i in to_generate
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        logging.error(f"Prompt {i+1} failed: {str(e)}")
+                    pbar.update(1)
+        
+        # Collapsed duplicates share the file of the prompt generated in their place
+        generated = set(to_generate)
+        results = [results[i] if i in generated else results[canonical[i]] for i in range(len(results))]
+        return [filepath for filepath in results if filepath]
+
+    def _generate_batch_item(self, i: int, prompt: str, total: int, batch_id: str) -> Optional[str]:
+        """Generate and save one batch image, returning its path"""
+        logging.info(f"Processing prompt {i+1}/{total}: {prompt}")
+        
+        filename = f"{batch_id}_{i:03d}.png"
+        filepath = self.output_dir / filename
+        
+        if not self.generate_recorded(prompt, filepath, prompt_id=f"{i:03d}", metadata={"batch_id": batch_id}):
+            return None
+        if self.postprocessor:
+            self.postprocessor.submit_image(str(filepath))
+        return str(filepath)
+
+    def generate_stream(
+        self,
+        records: Iterable[Dict[str, Any]],
+        max_concurrency: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Generate images for a stream of prompt records, yielding results as they finish.
+        
+        Records come from ingest.iter_prompt_records and are pulled only
+        while fewer than max_pending are in flight, so memory stays constant
+        however long the input is (with a deduper, bound its memory with
+        max_representatives). Error records are yielded back untouched
+        and never reach the API. With a deduper in collapse mode, near
+        duplicates are yielded with duplicate_of instead of being generated.
+        """
+        workers = max(1, max_concurrency or self.max_concurrency)
+        max_pending = max(workers, max_pending or workers * 4)
+        batch_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        if self.deduper:
+            self.deduper.reset()
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending: Dict[Future, Dict[str, Any]] = {}
+            for n, record in enumerate(records):
+                if "error" in record:
+                    yield record
+                    continue
                 
-                image_data = self.generate_single_image(prompt)
-                if image_data:
-                    filename = f"{int(time.time())}_{i:03d}.png"
-                    filepath = self.output_dir / filename
-                    
-                    with open(filepath, "wb") as f:
-                        f.write(image_data)
-                    
-                    generated_files.append(str(filepath))
+                if self.deduper:
+                    # The deduper keeps the record id of each representative, and nothing per duplicate
+                    index, match, similarity = self.deduper.add(record["prompt"], label=record["id"])
+                    if match is not None:
+                        duplicate = {"duplicate_of": self.deduper.label(match), "similarity": round(similarity, 3)}
+                        if self.deduper.mode == COLLAPSE:
+                            yield {"id": record["id"], "prompt": record["prompt"], **duplicate}
+                            continue
+                        record = {**record, **duplicate}
                 
-                pbar.update(1)
-        
-        return generated_files
+                future = executor.submit(self._generate_stream_item, n, record, batch_id)
+                pending[future] = record
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield self._stream_result(pending.pop(future), future)
+            
+            for future in as_completed(list(pending)):
+                yield self._stream_result(pending.pop(future), future)
+
+    def _generate_stream_item(self, n: int, record: Dict[str, Any], batch_id: str) -> Optional[str]:
+        """Generate and save one streamed record, returning its path"""
+        filepath = self.output_dir / f"{batch_id}_{n:06d}.png"
+        if not self.generate_recorded(
+            record["prompt"],
+            filepath,
+            scene_id=record.get("scene_id"),
+            prompt_id=record["id"],
+            metadata={"batch_id": batch_id},
+            params=record.get("params")
+        ):
+            return None
+        if self.postprocessor:
+            self.postprocessor.submit_image(str(filepath))
+        return str(filepath)
+
+    def _stream_result(self, record: Dict[str, Any], future: Future) -> Dict[str, Any]:
+        result = {key: record[key] for key in ("id", "scene_id", "prompt", "duplicate_of") if key in record}
+        try:
+            filepath = future.result()
+        except Exception as e:
+            logging.error(f"Prompt {record['id']} failed: {str(e)}")
+            return {**result, "error": str(e)}
+        if not filepath:
+            return {**result, "error": "Generation failed"}
+        return {**result, "file": filepath}
+
+    def generate_scene_prompt(
+        self,
+        scene_id: str,
+        prompt_data: Dict[str, Any],
+        output_dir: Optional[Path] = None
+    ) -> Optional[str]:
+        """Generate one image prompt of a scene, returning the saved file path"""
+        # Generate image using just the description, tracked in the manifest
+        filename = f"{scene_id}_{prompt_data['prompt_id']}.png"
+        filepath = Path(output_dir or self.output_dir) / filename
+        if self.generate_recorded(
+            prompt_data["description"],
+            filepath,
+            scene_id=scene_id,
+            prompt_id=prompt_data["prompt_id"],
+            metadata=prompt_data.get("metadata")
+        ):
+            if self.postprocessor:
+                self.postprocessor.submit_image(str(filepath))
+            return str(filepath)
+        return None
 
     def generate_from_scene(self, visual_output: Dict[str, Any]) -> Dict[str, List[str]]:
         """Generate images from a scene's visual output"""
@@ -163,42 +445,69 @@ class ImageGenerator:
         generated_files = []
         
         for prompt_data in visual_output["image_prompts"]:
-            # Store metadata for tracking
-            metadata_key = f"{scene_id}_{prompt_data['prompt_id']}"
-            self.metadata_store[metadata_key] = {
-                "scene_id": scene_id,
-                "prompt_id": prompt_data["prompt_id"],
-                "metadata": prompt_data["metadata"]
-            }
-            
-            # Generate image using just the description
-            image_data = self.generate_single_image(prompt_data["description"])
-            if image_data:
-                filename = f"{metadata_key}.png"
-                filepath = self.output_dir / filename
-                
-                with open(filepath, "wb") as f:
-                    f.write(image_data)
-                generated_files.append(str(filepath))
+            filepath = self.generate_scene_prompt(scene_id, prompt_data)
+            if filepath:
+                generated_files.append(filepath)
+        
+        if self.postprocessor:
+            self.postprocessor.submit_contact_sheet(scene_id, generated_files)
                 
         return {scene_id: generated_files}
 
+    def finish_postprocessing(self) -> Dict[str, Any]:
+        """Wait for queued post-processing and return its reports with per-task timing"""
+        if not self.postprocessor:
+            return {"reports": [], "timings": {}}
+        reports = self.postprocessor.drain()
+        return {"reports": reports, "timings": summarize_timings(reports)}
+
 def main():
-    # Load prompts from file
-    with open("prompts.txt", "r", encoding="utf-8") as f:
-        prompts = [line.strip() for line in f if line.strip()]
+    parser = argparse.ArgumentParser(description="Generate images from a JSONL, CSV or text file of prompts")
+    parser.add_argument("prompts", nargs="?", default=str(Path(__file__).with_name("prompts.txt")))
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Input format, detected from the suffix by default")
+    parser.add_argument("--output-dir", default="generated_images")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=None, help="Prompts in flight at once")
+    parser.add_argument("--dedupe-threshold", type=float, default=0.8, help="0 disables near-duplicate collapsing")
+    parser.add_argument("--dedupe-window", type=int, default=100000,
+                        help="Distinct prompts remembered for dedupe; bounds its memory, "
+                             "duplicates further apart than this are generated again")
+    args = parser.parse_args()
+    
+    generator = ImageGenerator(
+        output_dir=args.output_dir,
+        max_concurrency=args.workers,
+        deduper=(
+            PromptDeduper(args.dedupe_threshold, max_representatives=args.dedupe_window)
+            if args.dedupe_threshold else None
+        )
+    )
+    counts = {"generated": 0, "duplicates": 0, "failed": 0, "invalid": 0}
     
-    # Generate images
-    generator = ImageGenerator()
-    results = generator.batch_generate(prompts)
+    # Results are reported as they arrive; nothing holds the whole prompt list
+    with tqdm(desc="Generating images") as pbar:
+        for result in generator.generate_stream(
+            iter_prompt_records(args.prompts, args.format),
+            max_pending=args.max_pending
+        ):
+            if "line" in result:
+                counts["invalid"] += 1
+                logging.error(f"Skipped record {result['id']} (line {result['line']}): {result['error']}")
+            elif "error" in result:
+                counts["failed"] += 1
+            elif "file" in result:
+                counts["generated"] += 1
+            else:
+                counts["duplicates"] += 1
+            pbar.update(1)
     
     # Report results
-    successful = len(results)
     print(f"\nGeneration complete!")
-    print(f"Successfully generated {successful}/{len(prompts)} images")
+    print(f"Generated {counts['generated']} images, collapsed {counts['duplicates']} near-duplicate prompts")
+    print(f"Failed: {counts['failed']}, invalid records skipped: {counts['invalid']}")
     print(f"Images saved in: {generator.output_dir}")
     
-    return successful == len(prompts)
+    return counts["failed"] == 0 and counts["invalid"] == 0
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
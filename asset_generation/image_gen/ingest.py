@@ -0,0 +1,113 @@
+import ast
+import csv
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+FORMATS = ("jsonl", "csv", "text")
+MAX_PROMPT_CHARS = 4000
+_SUFFIXES = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".txt": "text"}
+# Wrapper lines of the legacy Python-list prompt files, e.g. "prompts = [" and "]"
+_LIST_WRAPPER = re.compile(r"^(\w+\s*=\s*)?\[$|^\],?$")
+
+
+def detect_format(path: Union[str, Path]) -> str:
+    return _SUFFIXES.get(Path(path).suffix.lower(), "text")
+
+
+def _record(raw: Dict[str, Any], default_id: str, line: int) -> Dict[str, Any]:
+    """Validate one raw record into id, scene_id, prompt and params, or an error record"""
+    record_id = str(raw.get("id") or default_id)
+    prompt = raw.get("prompt")
+    params = raw.get("params") or {}
+    if isinstance(params, str):
+        try:
+            params = json.loads(params)
+        except json.JSONDecodeError as e:
+            return {"id": record_id, "line": line, "error": f"Invalid params JSON: {str(e)}"}
+
+    if not isinstance(prompt, str) or not prompt.strip():
+        error = "Record has no prompt"
+    elif len(prompt) > MAX_PROMPT_CHARS:
+        error = f"Prompt is longer than {MAX_PROMPT_CHARS} characters"
+    elif not isinstance(params, dict):
+        error = "params must be an object"
+    else:
+        return {
+            "id": record_id,
+            "scene_id": raw.get("scene_id") or None,
+            "prompt": " ".join(prompt.split()),
+            "params": params,
+        }
+    return {"id": record_id, "line": line, "error": error}
+
+
+def _iter_jsonl(f) -> Iterator[Dict[str, Any]]:
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            raw = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"id": f"line_{line_number}", "line": line_number, "error": f"Invalid JSON: {str(e)}"}
+            continue
+        if isinstance(raw, str):
+            raw = {"prompt": raw}
+        if not isinstance(raw, dict):
+            yield {"id": f"line_{line_number}", "line": line_number, "error": "Record is not an object or string"}
+            continue
+        yield _record(raw, f"line_{line_number}", line_number)
+
+
+def _iter_csv(f) -> Iterator[Dict[str, Any]]:
+    """Rows of a CSV with a header naming at least a prompt column; quoted fields may span lines"""
+    reader = csv.DictReader(f)
+    if not reader.fieldnames or "prompt" not in reader.fieldnames:
+        yield {"id": "header", "line": 1, "error": "CSV header has no 'prompt' column"}
+        return
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield {"id": f"line_{reader.line_num}", "line": reader.line_num, "error": f"Invalid CSV: {str(e)}"}
+            continue
+        if None in row:
+            yield {"id": f"line_{reader.line_num}", "line": reader.line_num, "error": "Row has more fields than the header"}
+            continue
+        yield _record(row, f"line_{reader.line_num}", reader.line_num)
+
+
+def _iter_text(f) -> Iterator[Dict[str, Any]]:
+    """One prompt per line; # comments and the legacy Python-list syntax are understood"""
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line or line.startswith("#") or _LIST_WRAPPER.match(line):
+            continue
+        if line[0] in "\"'":
+            try:
+                line = ast.literal_eval(line.rstrip(","))
+            except (ValueError, SyntaxError):
+                yield {"id": f"line_{line_number}", "line": line_number, "error": "Unterminated quoted prompt"}
+                continue
+        yield _record({"prompt": line}, f"line_{line_number}", line_number)
+
+
+def iter_prompt_records(path: Union[str, Path], fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Lazily read prompt records from a JSONL, CSV or text file.
+
+    Yields one dict per record with ``id``, ``scene_id``, ``prompt`` and
+    ``params``. Records that cannot be used come back with ``line`` and
+    ``error`` instead, so callers can report them rather than send them to
+    the API. Only the current line or row is held in memory.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported prompt format '{fmt}', expected one of {FORMATS}")
+    readers = {"jsonl": _iter_jsonl, "csv": _iter_csv, "text": _iter_text}
+    # newline="" lets the csv module handle quoted line breaks itself
+    with open(path, "r", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+        yield from readers[fmt](f)
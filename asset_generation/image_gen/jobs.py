@@ -0,0 +1,377 @@
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+_COLUMNS = (
+    "job_id", "prompt", "scene_id", "prompt_id", "params", "status", "attempts", "max_attempts",
+    "lease_owner", "lease_expires", "available_at", "result", "error", "created_at", "updated_at"
+)
+
+
+class JobQueue:
+    """Durable SQLite queue of image jobs shared by any number of worker processes.
+
+    Workers claim a job by taking a lease on it inside an immediate
+    transaction, so two workers never hold the same job at once. A worker
+    keeps its lease alive with heartbeats; if it dies the lease expires and
+    the job goes back to whoever claims next, up to ``max_attempts``
+    (at-least-once delivery). Job ids are derived from what a job generates
+    (see ``job_id``), and finished jobs stay in the table, so re-enqueuing
+    the same input never regenerates it while a different file with the same
+    record ids still gets its own jobs.
+
+    The default rollback journal is used rather than WAL because WAL needs
+    shared memory that network filesystems do not provide; this is what lets
+    several hosts drain one queue file on a shared mount.
+    """
+
+    def __init__(self, path: str = "image_jobs.sqlite", timeout: float = 30.0):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode so claims can open their own BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                prompt TEXT NOT NULL,
+                scene_id TEXT,
+                prompt_id TEXT,
+                params TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                available_at REAL NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, available_at, created_at);
+            CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (status, lease_expires);"""
+        )
+
+    def enqueue(
+        self, records: Iterable[Dict[str, Any]], max_attempts: int = 3, chunk_size: int = 1000
+    ) -> Dict[str, int]:
+        """Add prompt records as jobs; returns how many were added and how many were already queued"""
+        added = total = 0
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            total += 1
+            if len(chunk) >= chunk_size:
+                added += self._insert(chunk, max_attempts)
+                chunk = []
+        if chunk:
+            added += self._insert(chunk, max_attempts)
+        return {"added": added, "duplicates": total - added}
+
+    def _insert(self, records, max_attempts: int) -> int:
+        now = time.time()
+        rows = [
+            (
+                job_id(record),
+                record["prompt"],
+                record.get("scene_id"),
+                record.get("prompt_id", str(record["id"])),
+                json.dumps(record.get("params") or {}, sort_keys=True),
+                QUEUED,
+                max_attempts,
+                now,
+                now,
+            )
+            for record in records
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                """INSERT OR IGNORE INTO jobs
+                   (job_id, prompt, scene_id, prompt_id, params, status, max_attempts, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+            self._conn.execute("COMMIT")
+            return self._conn.total_changes - before
+
+    def claim(self, worker_id: str, lease_seconds: float = 120.0) -> Optional[Dict[str, Any]]:
+        """Lease the oldest available job to worker_id, or return None if there is none"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker vanished and that have no attempts left are given up on
+                self._conn.execute(
+                    """UPDATE jobs SET status = ?, error = 'Lease expired too many times', updated_at = ?
+                       WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts""",
+                    (FAILED, now, LEASED, now)
+                )
+                row = self._conn.execute(
+                    f"""SELECT {', '.join(_COLUMNS)} FROM jobs
+                        WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)
+                        ORDER BY created_at LIMIT 1""",
+                    (QUEUED, now, LEASED, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job = dict(zip(_COLUMNS, row))
+                self._conn.execute(
+                    """UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?,
+                       attempts = attempts + 1, updated_at = ? WHERE job_id = ?""",
+                    (LEASED, worker_id, now + lease_seconds, now, job["job_id"])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        job["params"] = json.loads(job["params"])
+        job["attempts"] += 1
+        job["lease_owner"] = worker_id
+        return job
+
+    def _update_owned(self, job_id: str, worker_id: str, assignments: str, values: tuple) -> bool:
+        """Apply an update only while worker_id still holds the job's lease"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                values + (time.time(), job_id, LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = 120.0) -> bool:
+        """Extend a lease; False means it was lost and another worker may have the job"""
+        return self._update_owned(job_id, worker_id, "lease_expires = ?", (time.time() + lease_seconds,))
+
+    def complete(self, job_id: str, worker_id: str, result: str) -> bool:
+        return self._update_owned(
+            job_id, worker_id, "status = ?, result = ?, error = NULL, lease_owner = NULL", (DONE, result)
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_delay: float = 30.0) -> bool:
+        """Requeue a failed job after retry_delay, or mark it failed once attempts run out"""
+        return self._update_owned(
+            job_id,
+            worker_id,
+            """status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END,
+               available_at = ?, error = ?, lease_owner = NULL""",
+            (QUEUED, FAILED, time.time() + retry_delay, error)
+        )
+
+    def next_wakeup(self) -> Optional[float]:
+        """Earliest time a queued job becomes available or a lease expires; None if none is pending"""
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT MIN(CASE WHEN status = ? THEN available_at ELSE lease_expires END)
+                   FROM jobs WHERE status IN (?, ?)""",
+                (QUEUED, QUEUED, LEASED)
+            ).fetchone()
+        return row[0]
+
+    def requeue_failed(self) -> int:
+        """Give failed jobs a fresh set of attempts"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = 0, updated_at = ? WHERE status = ?",
+                (QUEUED, time.time(), FAILED)
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, LEASED, DONE, FAILED)}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def job_id(record: Dict[str, Any]) -> str:
+    """Content id of a prompt record: the same prompt, params and scene always map to the same job"""
+    content = json.dumps(
+        {"prompt": record["prompt"], "params": record.get("params") or {}, "scene_id": record.get("scene_id")},
+        sort_keys=True
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+
+def job_filename(job: Dict[str, Any]) -> str:
+    """Stable file name per job, so a retried job overwrites rather than duplicates"""
+    safe = re.sub(r"[^\w.-]", "_", job.get("prompt_id") or "job")[:80]
+    return f"{safe}_{job['job_id'][:12]}.png"
+
+
+def _heartbeat_loop(queue: JobQueue, job_id: str, worker_id: str, lease_seconds: float, stop: threading.Event) -> None:
+    while not stop.wait(lease_seconds / 3):
+        if not queue.heartbeat(job_id, worker_id, lease_seconds):
+            logging.error(f"Worker {worker_id} lost the lease on job {job_id}")
+            return
+
+
+def run_worker(
+    queue_path: str,
+    worker_id: str,
+    output_dir: str = "generated_images",
+    lease_seconds: float = 120.0,
+    poll_interval: float = 2.0,
+    exit_when_empty: bool = False,
+    retry_delay: float = 30.0,
+    generator_options: Optional[Dict[str, Any]] = None
+) -> int:
+    """Claim and generate jobs until the queue is drained (or forever); returns jobs completed.
+
+    With exit_when_empty the worker only stops once no job is queued or
+    leased, so jobs waiting out a retry delay or held by another worker's
+    lease are still picked up.
+    """
+    # Imported here so queue management works without the Replicate stack
+    from .image_generator import ImageGenerator
+
+    queue = JobQueue(queue_path)
+    generator = ImageGenerator(output_dir=output_dir, **(generator_options or {}))
+    completed = 0
+    try:
+        while True:
+            job = queue.claim(worker_id, lease_seconds)
+            if job is None:
+                stats = queue.stats()
+                if exit_when_empty and not stats[QUEUED] and not stats[LEASED]:
+                    return completed
+                # Wake for the next retry or lease expiry, checking back at least every poll_interval
+                wakeup = queue.next_wakeup()
+                delay = poll_interval if wakeup is None else wakeup - time.time()
+                time.sleep(min(poll_interval, max(0.01, delay)))
+                continue
+
+            filepath = generator.output_dir / job_filename(job)
+            stop = threading.Event()
+            beat = threading.Thread(
+                target=_heartbeat_loop,
+                args=(queue, job["job_id"], worker_id, lease_seconds, stop),
+                daemon=True
+            )
+            beat.start()
+            try:
+                # Files are renamed into place only when complete, so one that
+                # exists was finished by a worker that died before reporting it
+                ok = filepath.exists() or generator.generate_recorded(
+                    job["prompt"],
+                    filepath,
+                    scene_id=job["scene_id"],
+                    prompt_id=job["prompt_id"],
+                    metadata={"job_id": job["job_id"], "attempt": job["attempts"]},
+                    params=job["params"]
+                )
+                if ok:
+                    queue.complete(job["job_id"], worker_id, str(filepath))
+                    completed += 1
+                else:
+                    queue.fail(job["job_id"], worker_id, "Generation failed", retry_delay)
+            except Exception as e:
+                logging.error(f"Job {job['job_id']} failed: {str(e)}")
+                queue.fail(job["job_id"], worker_id, str(e), retry_delay)
+            finally:
+                stop.set()
+                beat.join()
+    finally:
+        queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable image job queue and workers")
+    parser.add_argument("--queue", default=os.getenv("IMAGE_JOB_QUEUE", "image_jobs.sqlite"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Add prompts from a JSONL, CSV or text file")
+    enqueue.add_argument("prompts")
+    enqueue.add_argument("--format", default=None)
+    enqueue.add_argument("--max-attempts", type=int, default=3)
+
+    work = commands.add_parser("work", help="Run worker processes on this host")
+    work.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+    work.add_argument("--output-dir", default="generated_images")
+    work.add_argument("--lease-seconds", type=float, default=120.0)
+    work.add_argument("--retry-delay", type=float, default=30.0, help="Seconds before a failed job is retried")
+    work.add_argument("--exit-when-empty", action="store_true",
+                      help="Stop once no job is queued or leased, after retrying failed jobs")
+
+    commands.add_parser("stats", help="Show job counts by status")
+    commands.add_parser("requeue", help="Retry failed jobs")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        from .ingest import iter_prompt_records
+
+        invalid = 0
+
+        def valid_records():
+            nonlocal invalid
+            for record in iter_prompt_records(args.prompts, args.format):
+                if "error" in record:
+                    invalid += 1
+                    logging.error(f"Skipped record {record['id']} (line {record.get('line')}): {record['error']}")
+                    continue
+                yield record
+
+        queue = JobQueue(args.queue)
+        summary = queue.enqueue(valid_records(), max_attempts=args.max_attempts)
+        if summary["duplicates"]:
+            logging.warning(
+                f"Skipped {summary['duplicates']} records already in the queue (same prompt, params and scene)"
+            )
+        print(json.dumps({**summary, "invalid": invalid, **queue.stats()}))
+    elif args.command == "work":
+        host = socket.gethostname()
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(
+                target=run_worker,
+                args=(args.queue, f"{host}:{os.getpid()}:{n}", args.output_dir, args.lease_seconds),
+                kwargs={"exit_when_empty": args.exit_when_empty, "retry_delay": args.retry_delay}
+            )
+            for n in range(max(1, args.processes))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        print(json.dumps(JobQueue(args.queue).stats()))
+    elif args.command == "requeue":
+        print(json.dumps({"requeued": JobQueue(args.queue).requeue_failed()}))
+    else:
+        print(json.dumps(JobQueue(args.queue).stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+_COLUMNS = (
+    "asset_id", "scene_id", "prompt_id", "prompt", "prompt_hash", "model", "seed", "params",
+    "metadata", "file_path", "bytes", "content_hash", "latency_seconds", "created_at"
+)
+
+
+def prompt_hash(prompt: str) -> str:
+    """Stable hash of a prompt for exact-match lookups"""
+    return hashlib.sha256(prompt.strip().encode("utf-8")).hexdigest()
+
+
+def file_hash(filepath: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetManifest:
+    """Durable SQLite record of every generated image.
+
+    Each row holds what produced the image (scene and prompt ids, prompt and
+    its hash, model, seed and full model input) and what came out (file
+    path, size, content hash, generation latency). Indexes on scene, prompt
+    hash and content hash make lookups independent of how many files exist,
+    so nothing needs to scan the output directory.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS assets (
+                asset_id TEXT PRIMARY KEY,
+                scene_id TEXT,
+                prompt_id TEXT,
+                prompt TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                model TEXT,
+                seed INTEGER,
+                params TEXT,
+                metadata TEXT,
+                file_path TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                latency_seconds REAL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS assets_scene ON assets (scene_id, prompt_id);
+            CREATE INDEX IF NOT EXISTS assets_prompt_hash ON assets (prompt_hash);
+            CREATE INDEX IF NOT EXISTS assets_content_hash ON assets (content_hash);"""
+        )
+        self._conn.commit()
+
+    def record(
+        self,
+        filepath: Union[str, Path],
+        prompt: str,
+        model: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        scene_id: Optional[str] = None,
+        prompt_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        latency_seconds: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Add a generated file and return its manifest entry"""
+        params = params or {}
+        entry = {
+            "asset_id": uuid.uuid4().hex,
+            "scene_id": scene_id,
+            "prompt_id": prompt_id,
+            "prompt": prompt,
+            "prompt_hash": prompt_hash(prompt),
+            "model": model,
+            "seed": params.get("seed"),
+            "params": params,
+            "metadata": metadata or {},
+            "file_path": str(filepath),
+            "bytes": Path(filepath).stat().st_size,
+            "content_hash": file_hash(filepath),
+            "latency_seconds": round(latency_seconds, 3) if latency_seconds is not None else None,
+            "created_at": time.time(),
+        }
+        row = [
+            json.dumps(entry[c], sort_keys=True, default=str) if c in ("params", "metadata") else entry[c]
+            for c in _COLUMNS
+        ]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO assets ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                row
+            )
+            self._conn.commit()
+        return entry
+
+    def _query(
+        self, where: str, params: tuple, limit: Optional[int] = None, order: str = "created_at"
+    ) -> List[Dict[str, Any]]:
+        columns = _COLUMNS + ("rowid",) if order == "rowid" else _COLUMNS
+        query = f"SELECT {', '.join(columns)} FROM assets WHERE {where} ORDER BY {order}"
+        if limit:
+            query += f" DESC LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(zip(columns, row))
+            entry["params"] = json.loads(entry["params"] or "{}")
+            entry["metadata"] = json.loads(entry["metadata"] or "{}")
+            entries.append(entry)
+        return entries
+
+    def get(self, asset_id: str) -> Optional[Dict[str, Any]]:
+        entries = self._query("asset_id = ?", (asset_id,))
+        return entries[0] if entries else None
+
+    def by_scene(self, scene_id: str, prompt_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Entries of a scene, or of one of its prompts, oldest first"""
+        if prompt_id is None:
+            return self._query("scene_id = ?", (scene_id,))
+        return self._query("scene_id = ? AND prompt_id = ?", (scene_id, prompt_id))
+
+    def by_prompt(self, prompt: str) -> List[Dict[str, Any]]:
+        """Entries generated from exactly this prompt text, oldest first"""
+        return self._query("prompt_hash = ?", (prompt_hash(prompt),))
+
+    def by_content(self, content_hash: str) -> List[Dict[str, Any]]:
+        return self._query("content_hash = ?", (content_hash,))
+
+    def since(self, created_after: float) -> List[Dict[str, Any]]:
+        """Entries recorded after a timestamp, oldest first, for incremental consumers"""
+        return self._query("created_at > ?", (created_after,))
+
+    def after_rowid(self, rowid: int) -> List[Dict[str, Any]]:
+        """Entries inserted after a rowid, in insert order, each with its ``rowid``.
+
+        Rowids follow commit order, so unlike created_at (taken before the
+        insert lock) a watermark on them never skips a concurrent writer's row.
+        """
+        return self._query("rowid > ?", (rowid,), order="rowid")
+
+    def latest(self, scene_id: str, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """The most recent image of a scene prompt"""
+        entries = self._query("scene_id = ? AND prompt_id = ?", (scene_id, prompt_id), limit=1)
+        return entries[0] if entries else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total_bytes, scenes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0), COUNT(DISTINCT scene_id) FROM assets"
+            ).fetchone()
+        return {"assets": count, "bytes": total_bytes, "scenes": scenes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,241 @@
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:  # The perceptual index is optional and needs NumPy
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:  # Hashing images also needs Pillow
+    Image = None
+
+from .manifest import AssetManifest
+
+HASH_BITS = 64
+METHODS = ("phash", "dhash")
+# Rows compared per block in all-pairs scans, bounding memory to BLOCK * n distances
+BLOCK = 256
+
+
+def _require() -> None:
+    if np is None or Image is None:
+        raise ImportError("The perceptual hash index requires numpy and Pillow (pip install numpy Pillow)")
+
+
+def _pack(bits: "np.ndarray") -> int:
+    """Fold 64 booleans into one unsigned 64-bit integer"""
+    return int.from_bytes(np.packbits(bits.astype(np.uint8)).tobytes(), "big")
+
+
+def _dct_matrix(n: int) -> "np.ndarray":
+    k = np.arange(n)
+    matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def dhash(image: "Image.Image") -> int:
+    """Gradient hash: whether each pixel is brighter than its right neighbour on a 9x8 grid"""
+    pixels = np.asarray(image.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    return _pack(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(image: "Image.Image") -> int:
+    """DCT hash: low-frequency coefficients of a 32x32 thumbnail compared to their median"""
+    pixels = np.asarray(image.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    dct = _dct_matrix(32)
+    low = (dct @ pixels @ dct.T)[:8, :8].flatten()
+    # The DC term only reflects overall brightness, so it is left out of the median
+    return _pack(low > np.median(low[1:]))
+
+
+def hash_file(filepath: Union[str, Path], method: str = "phash") -> int:
+    _require()
+    with Image.open(filepath) as image:
+        return phash(image) if method == "phash" else dhash(image)
+
+
+def hamming(hashes: "np.ndarray", query: "np.ndarray") -> "np.ndarray":
+    """Bit distances between every hash in query (rows) and every hash in hashes (columns)"""
+    xor = np.bitwise_xor(query.reshape(-1, 1), hashes.reshape(1, -1))
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).astype(np.uint8)
+    # NumPy < 2.0: count bits one byte at a time
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return table[xor.view(np.uint8)].reshape(*xor.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+class PerceptualIndex:
+    """Perceptual hashes of generated images in one packed uint64 array.
+
+    Each image is reduced to a 64-bit pHash or dHash; near-identical images
+    differ in only a few bits. Hashes sit in a contiguous NumPy array so a
+    query against every image is one vectorized XOR and popcount, and
+    all-pairs duplicate scans run block by block. New images are appended
+    from the asset manifest without rescanning the output directory, and the
+    index is saved to an ``.npz`` file between runs.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, method: str = "phash"):
+        _require()
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}")
+        self.path = Path(path) if path else None
+        self.method = method
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.paths: List[str] = []
+        self.scene_ids: List[str] = []
+        # Manifest rowid of the last synced entry
+        self.synced_rowid = 0
+        self._pending: List[int] = []
+        self._known: set = set()
+        if self.path and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def _load(self) -> None:
+        with np.load(self.path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["method"] != self.method:
+                raise ValueError(f"{self.path} holds {meta['method']} hashes, not {self.method}")
+            self.hashes = data["hashes"].astype(np.uint64)
+        self.paths = meta["paths"]
+        self.scene_ids = meta["scene_ids"]
+        # Indexes saved before the rowid watermark resync; add() skips known paths
+        self.synced_rowid = meta.get("synced_rowid", 0)
+        self._known = set(self.paths)
+
+    def save(self) -> None:
+        """Write the index atomically next to where it was loaded from"""
+        if not self.path:
+            return
+        meta = {
+            "method": self.method,
+            "paths": self.paths,
+            "scene_ids": self.scene_ids,
+            "synced_rowid": self.synced_rowid,
+        }
+        tmp = self.path.with_name(f".{self.path.name}.part.npz")
+        np.savez(tmp, hashes=self._array(), meta=np.array(json.dumps(meta)))
+        os.replace(tmp, self.path)
+
+    def _array(self) -> "np.ndarray":
+        """The hash array with any appended hashes folded in"""
+        if self._pending:
+            self.hashes = np.concatenate([self.hashes, np.array(self._pending, dtype=np.uint64)])
+            self._pending = []
+        return self.hashes
+
+    def add(self, filepath: Union[str, Path], scene_id: Optional[str] = None) -> Optional[int]:
+        """Hash and index one image; returns its position, or None if unreadable or already indexed"""
+        filepath = str(filepath)
+        if filepath in self._known:
+            return None
+        try:
+            value = hash_file(filepath, self.method)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not hash {filepath}: {str(e)}")
+            return None
+        self._pending.append(value)
+        self.paths.append(filepath)
+        self.scene_ids.append(scene_id or "")
+        self._known.add(filepath)
+        return len(self.paths) - 1
+
+    def add_many(self, filepaths: Iterable[Union[str, Path]], scene_id: Optional[str] = None) -> int:
+        return sum(1 for filepath in filepaths if self.add(filepath, scene_id) is not None)
+
+    def sync(self, manifest: AssetManifest) -> int:
+        """Index images recorded in the manifest since the last sync; returns how many were added"""
+        added = 0
+        for entry in manifest.after_rowid(self.synced_rowid):
+            if self.add(entry["file_path"], entry["scene_id"]) is not None:
+                added += 1
+            self.synced_rowid = entry["rowid"]
+        return added
+
+    def query(self, value: int, max_distance: int = 6) -> List[Dict[str, Any]]:
+        """Indexed images within max_distance bits of a hash, closest first"""
+        hashes = self._array()
+        if not len(hashes):
+            return []
+        distances = hamming(hashes, np.array([value], dtype=np.uint64))[0]
+        matches = np.flatnonzero(distances <= max_distance)
+        matches = matches[np.argsort(distances[matches], kind="stable")]
+        return [{"path": self.paths[i], "distance": int(distances[i])} for i in matches]
+
+    def duplicates(self, max_distance: int = 4) -> List[List[str]]:
+        """Clusters of images within max_distance bits of each other, largest first"""
+        hashes = self._array()
+        parent = list(range(len(hashes)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for start in range(0, len(hashes), BLOCK):
+            distances = hamming(hashes, hashes[start:start + BLOCK])
+            rows, cols = np.nonzero(distances <= max_distance)
+            for row, col in zip(rows + start, cols):
+                # Each pair shows up twice; joining it once is enough
+                if row < col:
+                    parent[find(col)] = find(row)
+
+        clusters: Dict[int, List[str]] = {}
+        for i in range(len(hashes)):
+            clusters.setdefault(find(i), []).append(self.paths[i])
+        groups = [paths for paths in clusters.values() if len(paths) > 1]
+        return sorted(groups, key=len, reverse=True)
+
+    def scene_similarity(self, scene_id: str) -> Dict[str, Any]:
+        """Pairwise similarity (1 - distance / 64) of one scene's images"""
+        hashes = self._array()
+        members = [i for i, scene in enumerate(self.scene_ids) if scene == scene_id]
+        subset = hashes[members]
+        distances = hamming(subset, subset)
+        return {
+            "paths": [self.paths[i] for i in members],
+            "similarity": (1 - distances / HASH_BITS).round(3).tolist(),
+        }
+
+    def scene_report(self) -> Dict[str, Dict[str, Any]]:
+        """Similarity matrix of every scene with more than one image"""
+        scenes: Dict[str, int] = {}
+        for scene in self.scene_ids:
+            if scene:
+                scenes[scene] = scenes.get(scene, 0) + 1
+        return {scene: self.scene_similarity(scene) for scene, count in scenes.items() if count > 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate and inconsistent generated images")
+    parser.add_argument("output_dir", nargs="?", default="generated_images")
+    parser.add_argument("--method", choices=METHODS, default="phash")
+    parser.add_argument("--max-distance", type=int, default=4, help="Bits two hashes may differ by to count as duplicates")
+    parser.add_argument("--scenes", action="store_true", help="Also print per-scene similarity matrices")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    index = PerceptualIndex(output_dir / f"{args.method}_index.npz", method=args.method)
+    manifest = AssetManifest(output_dir / "manifest.sqlite")
+    added = index.sync(manifest)
+    index.save()
+
+    report = {"indexed": len(index), "added": added, "duplicates": index.duplicates(args.max_distance)}
+    if args.scenes:
+        report["scenes"] = index.scene_report()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
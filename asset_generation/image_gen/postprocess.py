@@ -0,0 +1,214 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:  # Post-processing is optional and needs Pillow
+    Image = None
+    ImageDraw = None
+
+# File extension and Pillow format name for each supported output format
+FORMATS = {
+    "webp": ("webp", "WEBP"),
+    "jpeg": ("jpg", "JPEG"),
+    "jpg": ("jpg", "JPEG"),
+    "png": ("png", "PNG"),
+}
+
+
+def _save(image: "Image.Image", dest: Path, fmt: str, quality: int) -> None:
+    """Write atomically so readers never see a half-written file"""
+    pil_format = FORMATS[fmt][1]
+    if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.part")
+    image.save(tmp, format=pil_format, quality=quality)
+    tmp.replace(dest)
+
+
+def _report(task: str, source: Any, dest: Path, start: float) -> Dict[str, Any]:
+    return {
+        "task": task,
+        "source": source,
+        "output": str(dest),
+        "bytes": dest.stat().st_size,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+# Task functions run in worker processes, so they are module-level and take plain arguments
+
+def make_thumbnail(src: str, dest: str, size: Tuple[int, int], fmt: str, quality: int) -> Dict[str, Any]:
+    """Shrink an image to fit within size, keeping its aspect ratio"""
+    start = time.perf_counter()
+    with Image.open(src) as image:
+        image.thumbnail(size)
+        _save(image, Path(dest), fmt, quality)
+    return _report("thumbnail", src, Path(dest), start)
+
+
+def reencode(src: str, dest: str, fmt: str, max_edge: Optional[int], quality: int) -> Dict[str, Any]:
+    """Re-encode an image, optionally capping its longest edge"""
+    start = time.perf_counter()
+    with Image.open(src) as image:
+        if max_edge and max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge))
+        _save(image, Path(dest), fmt, quality)
+    return _report(f"encode_{FORMATS[fmt][0]}", src, Path(dest), start)
+
+
+def contact_sheet(
+    sources: Sequence[str],
+    dest: str,
+    columns: int,
+    tile_size: Tuple[int, int],
+    title: str,
+    fmt: str,
+    quality: int
+) -> Dict[str, Any]:
+    """Lay images out in a labelled grid, one tile per image in the given order"""
+    start = time.perf_counter()
+    tile_width, tile_height = tile_size
+    label_height = 18
+    columns = max(1, min(columns, len(sources)))
+    rows = (len(sources) + columns - 1) // columns
+    sheet = Image.new("RGB", (columns * tile_width, label_height + rows * (tile_height + label_height)), "white")
+    draw = ImageDraw.Draw(sheet)
+    draw.text((4, 2), title, fill="black")
+
+    for i, src in enumerate(sources):
+        x = (i % columns) * tile_width
+        y = label_height + (i // columns) * (tile_height + label_height)
+        with Image.open(src) as image:
+            image.thumbnail(tile_size)
+            offset = ((tile_width - image.width) // 2, (tile_height - image.height) // 2)
+            sheet.paste(image.convert("RGB"), (x + offset[0], y + offset[1]))
+        draw.text((x + 4, y + tile_height + 2), Path(src).stem, fill="black")
+
+    _save(sheet, Path(dest), fmt, quality)
+    return _report("contact_sheet", list(sources), Path(dest), start)
+
+
+class PostProcessor:
+    """Thumbnails, re-encoded previews and per-scene contact sheets on a process pool.
+
+    Work is submitted as images are saved and runs in separate processes, so
+    Pillow's CPU-bound decoding and encoding uses every core without holding
+    up the download threads. Outputs go next to each image under
+    ``thumbnails/``, ``previews/`` and ``contact_sheets/``; every task
+    reports how long it took.
+    """
+
+    def __init__(
+        self,
+        formats: Sequence[str] = ("webp", "jpeg"),
+        thumbnail_size: Tuple[int, int] = (320, 180),
+        thumbnail_format: str = "jpeg",
+        preview_max_edge: Optional[int] = 1280,
+        quality: int = 85,
+        contact_sheet_columns: int = 4,
+        contact_sheet_format: str = "jpeg",
+        max_workers: Optional[int] = None
+    ):
+        if Image is None:
+            raise ImportError("Image post-processing requires Pillow (pip install Pillow)")
+        for fmt in list(formats) + [thumbnail_format, contact_sheet_format]:
+            if fmt not in FORMATS:
+                raise ValueError(f"Unsupported format '{fmt}', expected one of {sorted(FORMATS)}")
+
+        self.formats = list(formats)
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail_format = thumbnail_format
+        self.preview_max_edge = preview_max_edge
+        self.quality = quality
+        self.contact_sheet_columns = contact_sheet_columns
+        self.contact_sheet_format = contact_sheet_format
+        # Spawned workers are safe to start while download threads are running
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._lock = threading.Lock()
+        self._pending: List[Future] = []
+
+    def _submit(self, fn, *args) -> Future:
+        future = self.executor.submit(fn, *args)
+        with self._lock:
+            self._pending.append(future)
+        return future
+
+    def submit_image(self, filepath: str) -> List[Future]:
+        """Queue the thumbnail and previews of one saved image"""
+        path = Path(filepath)
+        thumb = path.parent / "thumbnails" / f"{path.stem}.{FORMATS[self.thumbnail_format][0]}"
+        futures = [self._submit(
+            make_thumbnail, str(path), str(thumb), self.thumbnail_size, self.thumbnail_format, self.quality
+        )]
+        for fmt in self.formats:
+            preview = path.parent / "previews" / f"{path.stem}.{FORMATS[fmt][0]}"
+            futures.append(self._submit(
+                reencode, str(path), str(preview), fmt, self.preview_max_edge, self.quality
+            ))
+        return futures
+
+    def submit_contact_sheet(self, scene_id: str, filepaths: List[str]) -> Optional[Future]:
+        """Queue a contact sheet of a scene's images, written next to the first one"""
+        if not filepaths:
+            return None
+        dest = Path(filepaths[0]).parent / "contact_sheets" / f"{scene_id}.{FORMATS[self.contact_sheet_format][0]}"
+        return self._submit(
+            contact_sheet,
+            list(filepaths),
+            str(dest),
+            self.contact_sheet_columns,
+            self.thumbnail_size,
+            scene_id,
+            self.contact_sheet_format,
+            self.quality
+        )
+
+    def drain(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Wait for queued tasks and return their reports; failed tasks report an error"""
+        with self._lock:
+            futures, self._pending = self._pending, []
+        done, not_done = wait(futures, timeout=timeout)
+        # Tasks still running stay queued for the next drain
+        with self._lock:
+            self._pending.extend(not_done)
+
+        reports = []
+        for future in futures:
+            if future not in done:
+                continue
+            try:
+                reports.append(future.result())
+            except Exception as e:
+                logging.error(f"Post-processing task failed: {str(e)}")
+                reports.append({"task": "error", "error": str(e)})
+        return reports
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+def summarize_timings(reports: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Count, total, mean and max seconds per task type"""
+    by_task: Dict[str, List[float]] = {}
+    for report in reports:
+        if "seconds" in report:
+            by_task.setdefault(report["task"], []).append(report["seconds"])
+    return {
+        task: {
+            "count": len(seconds),
+            "total": round(sum(seconds), 4),
+            "mean": round(sum(seconds) / len(seconds), 4),
+            "max": max(seconds),
+        }
+        for task, seconds in by_task.items()
+    }
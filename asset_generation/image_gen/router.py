@@ -0,0 +1,165 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calls to a model after repeated consecutive failures.
+
+    After ``failure_threshold`` failures in a row the breaker opens and the
+    model is skipped. Once ``reset_timeout`` seconds pass a single trial call
+    is let through (half-open); success closes the breaker, failure opens it
+    again for another timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; claims the trial call when half-open"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record(self, ok: bool) -> None:
+        self._trial_running = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ModelStats:
+    """Rolling latency and error samples of one model, aged out after window_seconds"""
+
+    def __init__(self, window: int = 50, window_seconds: float = 300.0):
+        self.window_seconds = window_seconds
+        self.samples: Deque[Tuple[float, float, bool]] = deque(maxlen=window)
+
+    def add(self, latency: float, ok: bool) -> None:
+        self.samples.append((time.monotonic(), latency, ok))
+
+    def _recent(self) -> List[Tuple[float, float, bool]]:
+        cutoff = time.monotonic() - self.window_seconds
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return list(self.samples)
+
+    def summary(self) -> Dict[str, Any]:
+        samples = self._recent()
+        latencies = sorted(latency for _, latency, ok in samples if ok)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None
+        return {
+            "samples": len(samples),
+            "error_rate": errors / len(samples) if samples else 0.0,
+            "p50": latencies[len(latencies) // 2] if latencies else None,
+            "p95": p95,
+        }
+
+
+class ModelRouter:
+    """Picks which image model to call based on recent latency and errors.
+
+    Models are tried in preference order. A model is skipped while its
+    circuit breaker is open and moved behind the healthy ones when its
+    rolling p95 latency or error rate crosses a threshold, so traffic shifts
+    to the fallback until the slow samples age out of the window. Retries
+    wait with capped exponential backoff and full jitter instead of a fixed
+    delay, so concurrent workers do not retry in lockstep.
+    """
+
+    def __init__(
+        self,
+        models: Sequence[str],
+        p95_threshold: float = 60.0,
+        error_rate_threshold: float = 0.5,
+        min_samples: int = 5,
+        window: int = 50,
+        window_seconds: float = 300.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 60.0,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0
+    ):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models = list(models)
+        self.p95_threshold = p95_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {model: ModelStats(window, window_seconds) for model in self.models}
+        self.breakers = {model: CircuitBreaker(failure_threshold, reset_timeout) for model in self.models}
+        self._lock = threading.Lock()
+
+    def _healthy(self, model: str) -> bool:
+        summary = self.stats[model].summary()
+        if summary["samples"] < self.min_samples:
+            return True
+        if summary["error_rate"] > self.error_rate_threshold:
+            return False
+        return summary["p95"] is None or summary["p95"] <= self.p95_threshold
+
+    def pick(self, exclude: Sequence[str] = ()) -> Optional[str]:
+        """The model to call next, or None if every breaker is open"""
+        with self._lock:
+            candidates = [m for m in self.models if m not in exclude and self.breakers[m].state != OPEN]
+            # Healthy models first, each group in preference order
+            candidates.sort(key=lambda m: not self._healthy(m))
+            for model in candidates:
+                if self.breakers[model].allow():
+                    return model
+        return None
+
+    def record(self, model: str, latency: Optional[float], ok: bool) -> None:
+        """Report a call's outcome; a latency of None updates only the breaker"""
+        with self._lock:
+            if latency is not None:
+                self.stats[model].add(latency, ok)
+            self.breakers[model].record(ok)
+
+    def backoff(self, attempt: int, base_delay: Optional[float] = None) -> float:
+        """Seconds to wait before retry number attempt (0-based), with full jitter"""
+        base = self.base_delay if base_delay is None else base_delay
+        return random.uniform(0, min(self.max_delay, base * 2 ** attempt))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model breaker state and rolling latency/error summary"""
+        with self._lock:
+            return {
+                model: {
+                    "state": self.breakers[model].state,
+                    "healthy": self._healthy(model),
+                    **self.stats[model].summary(),
+                }
+                for model in self.models
+            }
@@ -0,0 +1,172 @@
+"""Offline benchmark for EnhancedStoryTeamCoordinator.
+
+Runs full generate_content workflows against SimulatedLLMBackend and reports
+wall-clock per node, per iteration and per run. Orchestration overhead is the
+wall clock minus the latency the simulated LLM spent sleeping, so regressions
+in state copying, callback rendering or JSON handling show up without a network.
+Use --sync-render to measure the cost of rendering on the event loop.
+
+    python -m benchmarks.bench_coordinator --runs 10 --latency 0.05 --scenes 10
+"""
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, Any, List
+from rich.console import Console
+from rich.table import Table
+from story_team.callbacks import (
+    CallbackEventBus,
+    CallbackSink,
+    EnhancedStoryTeamCallback,
+    JSONLSink,
+    QuietSink,
+)
+from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.llm_backend import SimulatedLLMBackend
+
+NODE_NAMES = {
+    "story_analyst": "story_analysis",
+    "media_director": "media_direction",
+    "expert_evaluator": "expert_evaluation",
+}
+
+
+class TimingSink(CallbackSink):
+    """Sink collecting the emit-time timestamp of each node start"""
+
+    def __init__(self):
+        self.events: List[tuple] = []
+
+    def handle(self, event: Dict[str, Any]) -> None:
+        if event["event"] == "agent_start":
+            self.events.append((event["agent"], event["state"].get("iteration", 0), event["perf"]))
+
+
+def create_sink(name: str) -> CallbackSink:
+    """Build the rendering sink under test; rich output goes to memory"""
+    if name == "rich":
+        return EnhancedStoryTeamCallback(console=Console(file=io.StringIO(), force_terminal=True))
+    if name == "jsonl":
+        return JSONLSink(stream=io.StringIO())
+    return QuietSink()
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    node_times = defaultdict(list)
+    iteration_times = []
+    run_times = []
+    overheads = []
+    failures = 0
+
+    for run in range(args.runs):
+        backend = SimulatedLLMBackend(
+            latency=args.latency,
+            jitter=args.jitter,
+            failure_rate=args.failure_rate,
+            malformed_rate=args.malformed_rate,
+            num_scenes=args.scenes,
+            shots_per_scene=args.shots,
+            seed=args.seed + run
+        )
+        timing = TimingSink()
+        bus = CallbackEventBus([timing, create_sink(args.sink)], background=not args.sync_render)
+        coordinator = EnhancedStoryTeamCoordinator(llm_backend=backend, callback=bus)
+
+        start = time.perf_counter()
+        try:
+            await coordinator.generate_content(args.prompt)
+        except Exception:
+            failures += 1
+            bus.close()
+            continue
+        end = time.perf_counter()
+        bus.close()
+
+        run_times.append(end - start)
+        overheads.append((end - start) - sum(backend.simulated_latency.values()))
+
+        iterations = defaultdict(float)
+        for i, (agent, iteration, started) in enumerate(timing.events):
+            finished = timing.events[i + 1][2] if i + 1 < len(timing.events) else end
+            node_times[NODE_NAMES.get(agent, agent)].append(finished - started)
+            iterations[iteration] += finished - started
+        iteration_times.extend(iterations.values())
+
+    if not run_times:
+        return {"runs": args.runs, "failures": failures}
+
+    return {
+        "runs": args.runs,
+        "failures": failures,
+        "nodes": {name: summarize(samples) for name, samples in node_times.items()},
+        "iteration": summarize(iteration_times),
+        "generate_content": summarize(run_times),
+        "orchestration_overhead": summarize(overheads),
+    }
+
+
+def print_report(report: Dict[str, Any], console: Console) -> None:
+    table = Table(title="Coordinator Benchmark (seconds)", show_header=True)
+    table.add_column("Measurement", style="cyan")
+    for column in ("count", "mean", "p50", "p95", "max"):
+        table.add_column(column, justify="right", style="green")
+
+    rows = [(f"node: {name}", stats) for name, stats in report.get("nodes", {}).items()]
+    rows += [
+        (name, report[name])
+        for name in ("iteration", "generate_content", "orchestration_overhead")
+        if name in report
+    ]
+    for name, stats in rows:
+        table.add_row(
+            name,
+            str(stats["count"]),
+            *(f"{stats[key]:.4f}" for key in ("mean", "p50", "p95", "max"))
+        )
+
+    console.print(table)
+    console.print(f"Runs: {report['runs']}  Failures: {report['failures']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the story team coordinator offline")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--scenes", type=int, default=3)
+    parser.add_argument("--shots", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sink", choices=["rich", "quiet", "jsonl"], default="rich",
+                        help="Callback sink to render events with")
+    parser.add_argument("--sync-render", action="store_true",
+                        help="Render callbacks on the event loop instead of a background thread")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    parser.add_argument("--prompt", default="Create a short story about a robot discovering emotions.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report, Console())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Startup benchmark for the story team and image CLIs.
+
+Each measurement runs in a fresh interpreter, so nothing is already imported.
+Reports interpreter wall clock, import time of each entry module, coordinator
+construction and first workflow compile, and which heavy dependencies
+(langgraph, langchain_openai, openai, replicate) were loaded along the way.
+
+    python -m benchmarks.bench_startup --runs 5 --json startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List
+from rich.console import Console
+from rich.table import Table
+
+HEAVY_MODULES = ("langgraph", "langchain_openai", "openai", "replicate")
+
+IMPORT_TARGETS = (
+    "utils.config",
+    "story_team.base_agent",
+    "story_team.coordinator",
+    "story_team.batch",
+    "asset_generation.image_gen.image_generator",
+)
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{body}
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                   "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+CONSTRUCT = """
+from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.callbacks import create_callback
+from story_team.llm_backend import SimulatedLLMBackend
+coordinator = EnhancedStoryTeamCoordinator(llm_backend=SimulatedLLMBackend(), callback=create_callback("quiet"))
+"""
+
+COMPILE = CONSTRUCT + "coordinator.workflow\n"
+
+
+def probe(body: str) -> Dict[str, Any]:
+    """Run body in a new interpreter; returns its timed seconds, wall clock and heavy modules loaded"""
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(body=body, heavy=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["wall"] = time.perf_counter() - start
+    return result
+
+
+def measure(body: str, runs: int) -> Dict[str, Any]:
+    samples = [probe(body) for _ in range(runs)]
+    return {
+        "median": statistics.median(s["seconds"] for s in samples),
+        "max": max(s["seconds"] for s in samples),
+        "wall_median": statistics.median(s["wall"] for s in samples),
+        "loaded": samples[-1]["loaded"],
+    }
+
+
+def run_benchmark(runs: int) -> Dict[str, Any]:
+    report = {f"import {target}": measure(f"import {target}", runs) for target in IMPORT_TARGETS}
+    report["construct coordinator"] = measure(CONSTRUCT, runs)
+    report["construct + compile workflow"] = measure(COMPILE, runs)
+    report["interpreter only"] = measure("pass", runs)
+    return report
+
+
+def print_report(report: Dict[str, Any], console: Console) -> None:
+    table = Table(title="Startup Benchmark (seconds)", show_header=True)
+    table.add_column("Measurement", style="cyan")
+    for column in ("median", "max", "wall_median"):
+        table.add_column(column, justify="right", style="green")
+    table.add_column("heavy modules loaded", style="yellow")
+
+    for name, stats in report.items():
+        table.add_row(
+            name,
+            *(f"{stats[key]:.4f}" for key in ("median", "max", "wall_median")),
+            ", ".join(stats["loaded"]) or "-"
+        )
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import and startup time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run_benchmark(max(1, args.runs))
+    print_report(report, Console())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
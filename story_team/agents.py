@@ -1,11 +1,17 @@
 from typing import Dict, Any
-from langchain.schema import SystemMessage, HumanMessage
+from langchain_core.messages import SystemMessage, HumanMessage
 from .state import CreativeState
 from .base_agent import BaseAgent
+from .models import StoryContent, MediaDirection, EvaluationResult
 import json
 
 class StoryAnalyst(BaseAgent):
-    def __init__(self):
+    stream_paths = (("scenes",),)
+    output_field = "story_content"
+    delta_field = "scenes"
+    output_schema = StoryContent
+    
+    def __init__(self, **kwargs):
         super().__init__(
             name="story_analyst",
             system_prompt="""You are an expert story analyst and content creator.
@@ -34,11 +40,17 @@ Output Format:
         }
     ],
     "feedback_addressed": ["List how previous feedback was incorporated"]
-}"""
+}""",
+            **kwargs
         )
 
 class MediaDirector(BaseAgent):
-    def __init__(self):
+    stream_paths = (("shot_list",), ("shot_list", "shots"))
+    output_field = "media_direction"
+    delta_field = "shot_list"
+    output_schema = MediaDirection
+    
+    def __init__(self, **kwargs):
         super().__init__(
             name="media_director",
             system_prompt="""You are an experienced media director.
@@ -80,11 +92,14 @@ Output Format:
         "special_requirements": ["Requirement 1", "Requirement 2"]
     },
     "feedback_addressed": ["List how previous feedback was incorporated"]
-}"""
+}""",
+            **kwargs
         )
 
 class ExpertEvaluator(BaseAgent):
-    def __init__(self):
+    output_schema = EvaluationResult
+    
+    def __init__(self, **kwargs):
         super().__init__(
             name="expert_evaluator",
             system_prompt="""You are a world-class AI-generated content evaluation expert.
@@ -109,6 +124,10 @@ Consider:
 - Audio generation requirements
 - Platform optimization for YouTube
 
+When a recommendation concerns specific scenes, list it under
+scene_recommendations keyed by scene_id instead of the general
+recommendations, so only those scenes need to be revised.
+
 Output Format:
 {
     "scores": {
@@ -130,6 +149,10 @@ Output Format:
         "technical_adjustments": ["AI generation-related improvements"],
         "platform_optimization": ["YouTube-specific optimizations"]
     },
+    "scene_recommendations": {
+        "scene_001": ["Suggestions that only concern this scene"]
+    },
     "iteration_notes": "Notes about improvements needed or made"
-}"""
+}""",
+            **kwargs
         ) 
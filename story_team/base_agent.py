@@ -1,16 +1,37 @@
-from typing import Dict, Any, Optional
-from dataclasses import dataclass
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage, AIMessage
+from typing import Dict, Any, Optional, AsyncIterator, Tuple, List, Type
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, ValidationError
+from utils.json_helpers import parse_json_report
 from .state import CreativeState
-import os
-from dotenv import load_dotenv
+from .llm_cache import LLMResponseCache
+from .llm_backend import DEFAULT_MODEL, DEFAULT_TEMPERATURE, LLMBackend, LazyOpenAILLM
+from .context import ContextBuilder, count_tokens
+from .usage import record_llm_call, call_cost
+from .metrics import observe
+from .streaming import IncrementalJSONParser
+from .delta import merge_scenes, scene_ids
 import json
-
-load_dotenv()
+import time
 
 class BaseAgent:
-    def __init__(self, name: str, system_prompt: str):
+    # Arrays whose objects stream_process emits as soon as each one completes
+    stream_paths: Tuple[Tuple[str, ...], ...] = ()
+    # State field this agent produces and its per-scene list, for delta revisions
+    output_field: Optional[str] = None
+    delta_field: Optional[str] = None
+    # Schema a usable response must match; failures trigger a repair retry
+    output_schema: Optional[Type[BaseModel]] = None
+    
+    def __init__(
+        self,
+        name: str,
+        system_prompt: str,
+        llm_cache: Optional[LLMResponseCache] = None,
+        llm: Optional[LLMBackend] = None,
+        context_token_budget: Optional[int] = None,
+        json_mode: bool = False,
+        max_repair_retries: int = 1
+    ):
         self.name = name
         self.system_prompt = f"""You are part of an AI Film Studio team that uses generative AI tools.
 Our team creates videos using:
@@ -27,51 +48,44 @@ Key Points:
 
 {system_prompt}"""
         
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        if not openai_api_key:
-            raise ValueError("OpenAI API key not found in .env file")
-        
-        self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo-0125",
-            temperature=0.7,
-            openai_api_key=openai_api_key
-        )
-
-    def _build_context(self, state: CreativeState) -> str:
-        """Build rich context from state"""
-        context = []
-        
-        # Add iteration info
-        context.append(f"Current Iteration: {state.iteration}")
-        
-        # Add previous feedback if available
-        if state.previous_feedback:
-            context.append("\nPrevious Feedback:")
-            for feedback in state.previous_feedback:
-                if feedback.get("recommendations"):
-                    context.append("\nRecommendations:")
-                    for key, items in feedback["recommendations"].items():
-                        context.append(f"\n{key}:")
-                        for item in items:
-                            context.append(f"- {item}")
-        
-        # Add current content
-        if state.story_content and self.name != "story_analyst":
-            context.append("\nCurrent Story Content:")
-            # Handle both dict and model cases
-            if hasattr(state.story_content, 'model_dump'):
-                context.append(json.dumps(state.story_content.model_dump(), indent=2))
-            else:
-                context.append(json.dumps(state.story_content, indent=2))
+        self.model_name = getattr(llm, "model_name", DEFAULT_MODEL)
+        self.temperature = getattr(llm, "temperature", DEFAULT_TEMPERATURE)
+        self.llm_cache = llm_cache
+        self.context_builder = ContextBuilder(token_budget=context_token_budget, model=self.model_name)
+        self.last_context_usage: Dict[str, int] = {}
+        # Ask the provider for a JSON object response (OpenAI response_format)
+        self.json_mode = json_mode
+        self.max_repair_retries = max_repair_retries
+        self.repair_attempts = 0
         
-        if state.media_direction and self.name == "expert_evaluator":
-            context.append("\nMedia Direction:")
-            if hasattr(state.media_direction, 'model_dump'):
-                context.append(json.dumps(state.media_direction.model_dump(), indent=2))
-            else:
-                context.append(json.dumps(state.media_direction, indent=2))
-        
-        return "\n".join(context)
+        # Use an injected backend as is; replay-only runs need no backend at all
+        self.llm = llm
+        if llm is None and (llm_cache is None or llm_cache.calls_llm):
+            self.llm = LazyOpenAILLM(self.model_name, self.temperature)
+
+    def _build_context(self, state: CreativeState, delta_scenes: Optional[List[str]] = None) -> str:
+        """Build context from state within this agent's token budget"""
+        context, self.last_context_usage = self.context_builder.build(state, self.name, delta_scenes)
+        return context
+
+    def _delta_scenes(self, state: CreativeState) -> List[str]:
+        """Scenes to revise in place, or an empty list to regenerate everything"""
+        if not self.delta_field or not state.target_scenes:
+            return []
+        existing = scene_ids((getattr(state, self.output_field) or {}).get(self.delta_field))
+        if not all(scene_id in existing for scene_id in state.target_scenes):
+            return []
+        return list(state.target_scenes)
+
+    def _merge_delta(self, state: CreativeState, result: Dict[str, Any], delta_scenes: List[str]) -> Dict[str, Any]:
+        """Carry the previous output over, replacing only the revised scenes"""
+        if "error" in result:
+            return result
+        previous = getattr(state, self.output_field)
+        merged = dict(previous)
+        merged[self.delta_field] = merge_scenes(previous[self.delta_field], result.get(self.delta_field), delta_scenes)
+        merged["feedback_addressed"] = result.get("feedback_addressed", [])
+        return merged
 
     def _validate_scores(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """Validate and normalize scores if present"""
@@ -93,11 +107,16 @@ Key Points:
                 result["scores"] = scores
         return result
 
-    async def process(self, state: CreativeState) -> Dict[str, Any]:
-        """Process state with full context"""
-        context = self._build_context(state)
+    def _build_messages(self, state: CreativeState, delta_scenes: Optional[List[str]] = None) -> list:
+        """Render the system and human messages for this state"""
+        context = self._build_context(state, delta_scenes)
+        
+        instructions = "Please process this information according to your role and return a valid JSON response."
+        if delta_scenes:
+            instructions = f"""Revise only scenes: {", ".join(delta_scenes)}
+Everything else is kept as is. Return a valid JSON object with only "{self.delta_field}" containing exactly these scenes, keeping their scene_id values, and "feedback_addressed"."""
         
-        messages = [
+        return [
             SystemMessage(content=self.system_prompt),
             HumanMessage(content=f"""
 Current Iteration: {state.iteration}
@@ -106,30 +125,206 @@ Original Prompt: {state.memory.get('original_prompt', '')}
 Context:
 {context}
 
-Please process this information according to your role and return a valid JSON response.
+{instructions}
 """)
         ]
-        
-        response = await self.llm.ainvoke(messages)
+
+    def _parse_response(self, response_content: str) -> Dict[str, Any]:
+        """Parse the JSON result out of a raw response, repairing common defects"""
+        start = time.perf_counter()
         try:
-            content = self._extract_json(response.content)
-            result = json.loads(content)
+            result, truncated = parse_json_report(response_content)
+            if not isinstance(result, dict):
+                raise json.JSONDecodeError("Expected a JSON object", response_content, 0)
+            if truncated:
+                # A closed-off prefix can still match the schema while missing scenes
+                return {
+                    "error": "Response was cut off before the JSON was complete",
+                    "raw_response": response_content
+                }
             return self._validate_scores(result)
         except json.JSONDecodeError as e:
-            print(f"JSON Decode Error: {str(e)}")
-            print(f"Raw Response: {response.content}")
             return {
-                "error": "Failed to parse JSON response",
-                "raw_response": response.content
+                "error": f"Failed to parse JSON response: {e}",
+                "raw_response": response_content
             }
+        finally:
+            observe("parse_seconds", time.perf_counter() - start, self.name)
+
+    def _checked_result(
+        self, state: CreativeState, response_content: str, delta_scenes: List[str]
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Parse, merge and validate a response; returns the result and what is wrong with it"""
+        result = self._parse_response(response_content)
+        if "error" in result:
+            return result, result["error"]
+        if delta_scenes:
+            result = self._merge_delta(state, result, delta_scenes)
+        if self.output_schema is not None:
+            try:
+                self.output_schema.model_validate(result)
+            except ValidationError as e:
+                return result, f"Response does not match the output format: {e}"
+        return result, None
+
+    def _repair_messages(
+        self, state: CreativeState, response_content: str, error: str, delta_scenes: List[str]
+    ) -> list:
+        """A short follow-up asking only for a corrected version of a bad response"""
+        scope = f"Revise only scenes: {', '.join(delta_scenes)}\n" if delta_scenes else ""
+        return [
+            SystemMessage(content=self.system_prompt),
+            HumanMessage(content=f"""
+Current Iteration: {state.iteration}
+{scope}Your previous response could not be used.
+Problem: {error[:500]}
+
+Previous response:
+{response_content}
+
+Return only the corrected, complete JSON object in the required output format.
+""")
+        ]
+
+    async def _complete(
+        self,
+        state: CreativeState,
+        response_content: str,
+        delta_scenes: List[str],
+        llm_options: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Turn a response into a result, retrying only this call when it is unusable"""
+        result, error = self._checked_result(state, response_content, delta_scenes)
+        attempts = 0
+        while error and attempts < self.max_repair_retries:
+            attempts += 1
+            self.repair_attempts += 1
+            messages = self._repair_messages(state, response_content, error, delta_scenes)
+            response_content = await self._invoke(messages, **llm_options)
+            result, error = self._checked_result(state, response_content, delta_scenes)
+        
+        if error:
+            print(f"{self.name}: unusable response after {attempts} repair attempts: {error}")
+            # Keep the last good output rather than passing an error on as content
+            previous = getattr(state, self.output_field) if self.output_field else None
+            if "error" in result and previous and "error" not in previous:
+                return previous
+        return result
 
-    def _extract_json(self, content: str) -> str:
-        """Extract JSON from response content"""
-        content = content.strip()
-        if content.startswith('```json'):
-            content = content[7:]
-        if content.startswith('```'):
-            content = content[3:]
-        if content.endswith('```'):
-            content = content[:-3]
-        return content.strip()
\ No newline at end of file
+    async def process(self, state: CreativeState, **llm_options: Any) -> Dict[str, Any]:
+        """Process state with full context.
+        
+        ``llm_options`` (e.g. ``temperature`` or ``seed``) are passed to the
+        LLM call, overriding the client defaults for this call only. When the
+        state targets specific scenes, only those are regenerated and merged
+        into the previous output.
+        """
+        delta_scenes = self._delta_scenes(state)
+        messages = self._build_messages(state, delta_scenes)
+        response_content = await self._invoke(messages, **llm_options)
+        return await self._complete(state, response_content, delta_scenes, llm_options)
+
+    async def stream_process(self, state: CreativeState, **llm_options: Any) -> AsyncIterator[Dict[str, Any]]:
+        """Process state while streaming, yielding each completed item early.
+        
+        Yields ``{"type": "item", ...}`` events for every object completed in
+        one of this agent's ``stream_paths`` (scenes, shots) while the rest of
+        the response is still arriving, then a final ``{"type": "result", ...}``
+        event with the same parsed result ``process`` would return.
+        """
+        delta_scenes = self._delta_scenes(state)
+        messages = self._build_messages(state, delta_scenes)
+        parser = IncrementalJSONParser(self.stream_paths)
+        chunks = []
+        
+        async for text in self._stream(messages, **llm_options):
+            chunks.append(text)
+            for path, item in parser.feed(text):
+                yield {"type": "item", "agent": self.name, "path": path, "item": item}
+        
+        result = await self._complete(state, "".join(chunks), delta_scenes, llm_options)
+        yield {"type": "result", "agent": self.name, "result": result}
+
+    def _call_options(self, llm_options: Dict[str, Any]) -> Dict[str, Any]:
+        if self.json_mode:
+            return {"response_format": {"type": "json_object"}, **llm_options}
+        return llm_options
+
+    def _cache_key(self, messages: list, llm_options: Dict[str, Any]) -> str:
+        options = dict(llm_options)
+        temperature = options.pop("temperature", self.temperature)
+        return self.llm_cache.make_key(self.model_name, temperature, messages, options)
+
+    def _record_usage(
+        self,
+        messages: list,
+        response_content: str,
+        usage_metadata: Optional[Dict[str, Any]] = None,
+        cached: bool = False
+    ) -> None:
+        """Record token usage for the current run, estimating it if the backend reports none"""
+        if cached:
+            record_llm_call(self.model_name, 0, 0, cached=True)
+            return
+        if usage_metadata:
+            prompt_tokens = usage_metadata.get("input_tokens", 0)
+            completion_tokens = usage_metadata.get("output_tokens", 0)
+        else:
+            prompt_tokens = sum(count_tokens(m.content, self.model_name) for m in messages)
+            completion_tokens = count_tokens(response_content, self.model_name)
+        record_llm_call(self.model_name, prompt_tokens, completion_tokens)
+        observe("prompt_tokens", prompt_tokens, self.name)
+        observe("completion_tokens", completion_tokens, self.name)
+        observe("llm_cost_usd", call_cost(self.model_name, prompt_tokens, completion_tokens), self.name)
+
+    async def _invoke(self, messages: list, **llm_options: Any) -> str:
+        """Call the LLM, reading from and writing to the response cache if enabled"""
+        llm_options = self._call_options(llm_options)
+        key = None
+        if self.llm_cache is not None:
+            key = self._cache_key(messages, llm_options)
+            cached = self.llm_cache.get(key)
+            if cached is not None:
+                self._record_usage(messages, cached, cached=True)
+                return cached
+        
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(messages, **llm_options)
+        observe("llm_latency_seconds", time.perf_counter() - start, self.name)
+        self._record_usage(messages, response.content, getattr(response, "usage_metadata", None))
+        if key is not None:
+            self.llm_cache.put(key, self.model_name, response.content)
+        return response.content
+
+    async def _stream(self, messages: list, **llm_options: Any) -> AsyncIterator[str]:
+        """Stream response text from the LLM, falling back to a single chunk"""
+        llm_options = self._call_options(llm_options)
+        key = None
+        if self.llm_cache is not None:
+            key = self._cache_key(messages, llm_options)
+            cached = self.llm_cache.get(key)
+            if cached is not None:
+                self._record_usage(messages, cached, cached=True)
+                yield cached
+                return
+        
+        parts = []
+        usage_metadata = None
+        start = time.perf_counter()
+        if hasattr(self.llm, "astream"):
+            async for chunk in self.llm.astream(messages, **llm_options):
+                usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+                parts.append(chunk.content)
+                yield chunk.content
+        else:
+            response = await self.llm.ainvoke(messages, **llm_options)
+            usage_metadata = getattr(response, "usage_metadata", None)
+            parts.append(response.content)
+            yield response.content
+        
+        # Includes time the consumer spent on each chunk, which is small next to the LLM
+        observe("llm_latency_seconds", time.perf_counter() - start, self.name)
+        self._record_usage(messages, "".join(parts), usage_metadata)
+        
+        if key is not None:
+            self.llm_cache.put(key, self.model_name, "".join(parts))
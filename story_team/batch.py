@@ -0,0 +1,95 @@
+from typing import Dict, Any, Optional, List
+import argparse
+import asyncio
+import json
+import time
+from rich.console import Console
+from asset_generation.image_gen.ingest import iter_prompt_records
+from .callbacks import create_callback
+from .coordinator import EnhancedStoryTeamCoordinator
+from .llm_cache import LLMResponseCache
+from .checkpoint import CheckpointStore
+
+
+async def run_batch(
+    records: List[Dict[str, Any]],
+    output_path: str,
+    max_concurrency: int = 4,
+    coordinator: Optional[EnhancedStoryTeamCoordinator] = None
+) -> Dict[str, int]:
+    """Run many generate_content workflows concurrently on one event loop.
+
+    All runs share a single coordinator, so agents, LLM client and compiled
+    graph are built once. Each result is appended to ``output_path`` as soon
+    as its run finishes.
+    """
+    coordinator = coordinator or EnhancedStoryTeamCoordinator()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run_one(record: Dict[str, Any]) -> Dict[str, Any]:
+        if "error" in record:
+            return record
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await coordinator.generate_content(record["prompt"])
+                output = {"id": record["id"], "prompt": record["prompt"], "result": result}
+            except Exception as e:
+                output = {"id": record["id"], "prompt": record["prompt"], "error": str(e)}
+            output["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+            return output
+
+    summary = {"succeeded": 0, "failed": 0}
+    with open(output_path, "a", encoding="utf-8") as out:
+        for finished in asyncio.as_completed([run_one(record) for record in records]):
+            output = await finished
+            summary["failed" if "error" in output else "succeeded"] += 1
+            out.write(json.dumps(output, ensure_ascii=False) + "\n")
+            out.flush()
+    return summary
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run the story team over a file of prompts")
+    parser.add_argument("prompts", help="Input JSONL, CSV or text file, read like image job prompts")
+    parser.add_argument("output", help="Output JSONL; results are appended as runs finish")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent workflows")
+    parser.add_argument("--sink", choices=["rich", "quiet", "jsonl"], default="jsonl",
+                        help="Progress output; jsonl writes structured events to --events")
+    parser.add_argument("--events", default="story_team_events.jsonl", help="Event log for the jsonl sink")
+    parser.add_argument("--candidates", type=int, default=1,
+                        help="Candidate stories generated and evaluated in parallel per iteration")
+    parser.add_argument("--metrics", default=None,
+                        help="Write per-agent latency, token and cost histograms here in Prometheus text format")
+    parser.add_argument("--json-mode", action="store_true",
+                        help="Request JSON object responses from the provider")
+    parser.add_argument("--delta", action="store_true",
+                        help="After the first iteration, only regenerate scenes the evaluator tagged")
+    args = parser.parse_args()
+
+    console = Console()
+    records = list(iter_prompt_records(args.prompts))
+    console.print(f"[bold]🎥 Running {len(records)} prompts with concurrency {args.concurrency}[/bold]")
+
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_cache=LLMResponseCache.from_env(),
+        callback=create_callback(args.sink, path=args.events),
+        num_candidates=args.candidates,
+        delta_mode=args.delta,
+        json_mode=args.json_mode,
+        checkpoint_store=CheckpointStore.from_env()
+    )
+    summary = await run_batch(records, args.output, args.concurrency, coordinator)
+    coordinator.callback.close()
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(coordinator.metrics_registry.to_prometheus())
+
+    console.print(
+        f"\n[bold green]Batch complete:[/bold green] {summary['succeeded']} succeeded, "
+        f"{summary['failed']} failed. Results in {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,13 +1,167 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, TextIO
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.markdown import Markdown
+import atexit
 import json
+import logging
+import queue
+import threading
+import time
 
-class EnhancedStoryTeamCallback:
-    def __init__(self):
-        self.console = Console(force_terminal=True)
+class CallbackSink:
+    """Receives callback events; subclasses override the on_* hooks or handle()"""
+    
+    def handle(self, event: Dict[str, Any]) -> None:
+        """Dispatch an event to the matching on_* hook"""
+        if event["event"] == "chain_start":
+            self.on_chain_start(event["state"])
+        elif event["event"] == "agent_start":
+            self.on_agent_start(event["agent"], event["state"])
+        elif event["event"] == "agent_finish":
+            self.on_agent_finish(event["agent"], event["result"])
+    
+    def on_chain_start(self, state: Dict[str, Any]) -> None:
+        pass
+    
+    def on_agent_start(self, agent: str, state: Dict[str, Any]) -> None:
+        pass
+    
+    def on_agent_finish(self, agent: str, result: Dict[str, Any]) -> None:
+        pass
+    
+    def close(self) -> None:
+        pass
+
+class QuietSink(CallbackSink):
+    """Discards all events"""
+
+class JSONLSink(CallbackSink):
+    """Writes one compact JSON line per event, without any pretty-printing"""
+    
+    def __init__(self, path: Optional[str] = None, stream: Optional[TextIO] = None, include_results: bool = True):
+        self._owns_stream = stream is None
+        self.stream = stream or open(path or "story_team_events.jsonl", "a", encoding="utf-8")
+        self.include_results = include_results
+    
+    def handle(self, event: Dict[str, Any]) -> None:
+        record = {"event": event["event"], "time": event["time"]}
+        if "agent" in event:
+            record["agent"] = event["agent"]
+        
+        state = event.get("state")
+        if state is not None:
+            record["iteration"] = state.get("iteration", 0)
+            record["feedback_entries"] = len(state.get("previous_feedback") or [])
+            if event["event"] == "chain_start":
+                record["prompt"] = state.get("memory", {}).get("original_prompt", "")
+        
+        result = event.get("result")
+        if isinstance(result, dict):
+            scores = result.get("scores")
+            if isinstance(scores, dict) and "overall_score" in scores:
+                record["overall_score"] = scores["overall_score"]
+            if self.include_results:
+                record["result"] = result
+        
+        self.stream.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+        self.stream.flush()
+    
+    def close(self) -> None:
+        if self._owns_stream:
+            self.stream.close()
+
+class CallbackEventBus:
+    """Queues callback events and renders them on a background thread.
+    
+    Emitting an event only timestamps it and puts it on a queue, so rich
+    rendering or file I/O in the sinks never stalls the event loop. Pass
+    ``background=False`` to dispatch synchronously instead.
+    """
+    
+    def __init__(self, sinks: List[CallbackSink], background: bool = True):
+        self.sinks = list(sinks)
+        self.background = background
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+    
+    def _ensure_worker(self) -> None:
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="story-team-callbacks", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+    
+    def _run(self) -> None:
+        while True:
+            event = self._queue.get()
+            try:
+                if event is None:
+                    return
+                self._dispatch(event)
+            finally:
+                self._queue.task_done()
+    
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        for sink in self.sinks:
+            try:
+                sink.handle(event)
+            except Exception as e:
+                logging.error(f"Callback sink {type(sink).__name__} failed: {str(e)}")
+    
+    def _emit(self, event_type: str, **payload: Any) -> None:
+        event = {"event": event_type, "time": time.time(), "perf": time.perf_counter(), **payload}
+        if not self.background:
+            self._dispatch(event)
+            return
+        self._ensure_worker()
+        self._queue.put_nowait(event)
+    
+    def on_chain_start(self, state: Dict[str, Any]) -> None:
+        self._emit("chain_start", state=dict(state))
+    
+    def on_agent_start(self, agent: str, state: Dict[str, Any]) -> None:
+        self._emit("agent_start", agent=agent, state=dict(state))
+    
+    def on_agent_finish(self, agent: str, result: Dict[str, Any]) -> None:
+        self._emit("agent_finish", agent=agent, result=result)
+    
+    def flush(self) -> None:
+        """Block until every queued event has been rendered"""
+        if self._thread is not None:
+            self._queue.join()
+    
+    def close(self) -> None:
+        """Render remaining events, stop the worker and close the sinks"""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put_nowait(None)
+            thread.join()
+        for sink in self.sinks:
+            sink.close()
+        self.sinks = []
+
+def create_callback(sink: str = "rich", path: Optional[str] = None, background: bool = True) -> CallbackEventBus:
+    """Create an event bus with one of the built-in sinks: rich, quiet or jsonl"""
+    if sink == "rich":
+        sinks = [EnhancedStoryTeamCallback()]
+    elif sink == "quiet":
+        sinks = [QuietSink()]
+    elif sink == "jsonl":
+        sinks = [JSONLSink(path)]
+    else:
+        raise ValueError(f"Unknown callback sink '{sink}', expected rich, quiet or jsonl")
+    return CallbackEventBus(sinks, background=background)
+
+class EnhancedStoryTeamCallback(CallbackSink):
+    """Rich console sink rendering markdown, score tables and result panels"""
+    
+    def __init__(self, console: Optional[Console] = None):
+        # Let rich detect the terminal so logs redirected to files stay plain text
+        self.console = console or Console()
         
     def _format_feedback_history(self, feedback_list: List[Dict[str, Any]]) -> str:
         """Format feedback history into readable markdown"""
@@ -0,0 +1,255 @@
+from typing import Dict, Any, Optional, List
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Next node recorded once the workflow has reached its end
+END_NODE = "__end__"
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+class CheckpointStore:
+    """SQLite store of workflow state after every completed graph node.
+
+    Each run keeps its checkpoints in order with the node that produced them
+    and the node that runs next, so an interrupted run can resume from the
+    last completed node instead of starting over. Runs are ``running`` until
+    they reach the end of the graph, or ``failed`` if an error stopped them;
+    both can be resumed.
+    """
+
+    def __init__(self, path: str = ".story_checkpoints.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                prompt TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                run_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                node TEXT NOT NULL,
+                next_node TEXT NOT NULL,
+                state TEXT NOT NULL,
+                usage TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (run_id, seq)
+            );"""
+        )
+        # Stores created before usage was checkpointed
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(checkpoints)")]
+        if "usage" not in columns:
+            self._conn.execute("ALTER TABLE checkpoints ADD COLUMN usage TEXT")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["CheckpointStore"]:
+        """Build a store from STORY_CHECKPOINT_PATH, if configured"""
+        path = os.getenv("STORY_CHECKPOINT_PATH")
+        return cls(path) if path else None
+
+    def start_run(self, run_id: str, prompt: str) -> None:
+        """Register a new run, or mark an existing one as running again"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, prompt, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET status = excluded.status, error = NULL, "
+                "updated_at = excluded.updated_at",
+                (run_id, prompt, RUNNING, now, now)
+            )
+            self._conn.commit()
+
+    def save(
+        self,
+        run_id: str,
+        node: str,
+        next_node: str,
+        state: Dict[str, Any],
+        usage: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Append the state (and the run's usage so far) after ``node`` completed"""
+        now = time.time()
+        payload = json.dumps(state, ensure_ascii=False)
+        usage_payload = json.dumps(usage) if usage is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO checkpoints (run_id, seq, node, next_node, state, usage, created_at) "
+                "VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM checkpoints WHERE run_id = ?), ?, ?, ?, ?, ?)",
+                (run_id, run_id, node, next_node, payload, usage_payload, now)
+            )
+            self._conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+            self._conn.commit()
+
+    def finish_run(self, run_id: str, status: str = COMPLETED, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?",
+                (status, error, time.time(), run_id)
+            )
+            self._conn.commit()
+
+    def latest(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Return the run with its last checkpoint, or None for an unknown run"""
+        with self._lock:
+            run = self._conn.execute(
+                "SELECT prompt, status FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if run is None:
+                return None
+            row = self._conn.execute(
+                "SELECT seq, node, next_node, state, usage FROM checkpoints WHERE run_id = ? "
+                "ORDER BY seq DESC LIMIT 1",
+                (run_id,)
+            ).fetchone()
+        checkpoint = {"run_id": run_id, "prompt": run[0], "status": run[1]}
+        if row:
+            checkpoint.update({
+                "seq": row[0],
+                "node": row[1],
+                "next_node": row[2],
+                "state": json.loads(row[3]),
+                "usage": json.loads(row[4]) if row[4] else None
+            })
+        return checkpoint
+
+    def list_runs(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Summaries of stored runs, most recently updated first"""
+        query = (
+            "SELECT r.run_id, r.prompt, r.status, r.error, r.created_at, r.updated_at, "
+            "COUNT(c.seq), MAX(c.seq) FROM runs r LEFT JOIN checkpoints c ON c.run_id = r.run_id"
+        )
+        params: tuple = ()
+        if status:
+            query += " WHERE r.status = ?"
+            params = (status,)
+        query += " GROUP BY r.run_id ORDER BY r.updated_at DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            runs = []
+            for run_id, prompt, run_status, error, created_at, updated_at, count, last_seq in rows:
+                last = self._conn.execute(
+                    "SELECT node, next_node, state FROM checkpoints WHERE run_id = ? AND seq = ?",
+                    (run_id, last_seq)
+                ).fetchone() if count else None
+                runs.append({
+                    "run_id": run_id,
+                    "prompt": prompt,
+                    "status": run_status,
+                    "error": error,
+                    "checkpoints": count,
+                    "last_node": last[0] if last else None,
+                    "next_node": last[1] if last else None,
+                    "iteration": json.loads(last[2]).get("iteration", 0) if last else 0,
+                    "created_at": created_at,
+                    "updated_at": updated_at
+                })
+        return runs
+
+    def prune(
+        self,
+        older_than_seconds: Optional[float] = None,
+        status: Optional[str] = None,
+        keep_latest: bool = False
+    ) -> int:
+        """Delete runs (optionally only older or in a given status) and return how many were removed.
+
+        With ``keep_latest`` runs are not deleted; instead every checkpoint
+        except the last one of each selected run is dropped, which is all
+        that resuming needs.
+        """
+        conditions, params = [], []
+        if older_than_seconds is not None:
+            conditions.append("updated_at < ?")
+            params.append(time.time() - older_than_seconds)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            run_ids = [row[0] for row in self._conn.execute(f"SELECT run_id FROM runs{where}", params)]
+            for run_id in run_ids:
+                if keep_latest:
+                    self._conn.execute(
+                        "DELETE FROM checkpoints WHERE run_id = ? AND seq < "
+                        "(SELECT MAX(seq) FROM checkpoints WHERE run_id = ?)",
+                        (run_id, run_id)
+                    )
+                else:
+                    self._conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+                    self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self._conn.commit()
+        return len(run_ids)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+async def main():
+    from rich.console import Console
+    from rich.table import Table
+
+    parser = argparse.ArgumentParser(description="Inspect, prune and resume story team checkpoints")
+    parser.add_argument("--path", default=os.getenv("STORY_CHECKPOINT_PATH", ".story_checkpoints.sqlite"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="List stored runs")
+    list_parser.add_argument("--status", choices=[RUNNING, COMPLETED, FAILED])
+    prune_parser = commands.add_parser("prune", help="Delete old runs")
+    prune_parser.add_argument("--older-than-days", type=float, default=None)
+    prune_parser.add_argument("--status", choices=[RUNNING, COMPLETED, FAILED])
+    prune_parser.add_argument("--keep-latest", action="store_true",
+                              help="Keep each run and its last checkpoint, drop the history")
+    resume_parser = commands.add_parser("resume", help="Resume a run from its last checkpoint")
+    resume_parser.add_argument("run_id")
+    args = parser.parse_args()
+
+    console = Console()
+    store = CheckpointStore(args.path)
+    if args.command == "list":
+        table = Table("run_id", "status", "iteration", "next node", "checkpoints", "prompt")
+        for run in store.list_runs(args.status):
+            table.add_row(
+                run["run_id"], run["status"], str(run["iteration"]), str(run["next_node"]),
+                str(run["checkpoints"]), run["prompt"][:60]
+            )
+        console.print(table)
+    elif args.command == "prune":
+        older_than = args.older_than_days * 86400 if args.older_than_days is not None else None
+        removed = store.prune(older_than, args.status, args.keep_latest)
+        console.print(f"[bold]Pruned {removed} runs[/bold]")
+    else:
+        # Imported here because the coordinator itself depends on this module
+        from .coordinator import EnhancedStoryTeamCoordinator
+        from .llm_cache import LLMResponseCache
+
+        coordinator = EnhancedStoryTeamCoordinator(
+            llm_cache=LLMResponseCache.from_env(),
+            checkpoint_store=store
+        )
+        result = await coordinator.resume(args.run_id)
+        console.print_json(json.dumps(result, ensure_ascii=False))
+    store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
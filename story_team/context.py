@@ -0,0 +1,277 @@
+from typing import Dict, Any, Optional, List, Tuple
+from functools import lru_cache
+import json
+import re
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character-based estimate
+    tiktoken = None
+
+# Rough characters-per-token ratio for English/JSON when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            return None
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo-0125") -> int:
+    """Count tokens with tiktoken, or estimate them from the text length"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo-0125") -> str:
+    """Cut text down to at most max_tokens at a line break, marking that it was truncated"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    marker = "\n...(truncated)"
+    keep = max(0, max_tokens - count_tokens(marker, model))
+    encoding = _encoding(model)
+    if encoding is None:
+        text = text[:keep * CHARS_PER_TOKEN]
+    else:
+        text = encoding.decode(encoding.encode(text)[:keep])
+    # Whole lines only, so no recommendation is cut mid-sentence
+    if "\n" in text:
+        text = text[:text.rindex("\n")]
+    return text + marker
+
+
+def compact_json(value: Any) -> str:
+    """Serialize without indentation whitespace, which costs tokens and adds nothing"""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _scene_list(value: Any) -> Optional[List[Any]]:
+    """The scene or shot list of a story, media direction or delta section"""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        for key in ("scenes", "shot_list"):
+            if isinstance(value.get(key), list):
+                return value[key]
+    return None
+
+
+def _normalize(item: str) -> str:
+    return re.sub(r"\s+", " ", str(item)).strip().lower()
+
+
+class ContextBuilder:
+    """Builds agent context within a token budget.
+
+    Sections are added in priority order: iteration, current story, media
+    direction, scene-tagged feedback, the most recent feedback in full, then
+    a rolling summary of older feedback. Recommendations repeated across
+    iterations appear once. ``build`` also reports the tokens each section
+    used.
+
+    The budget is opt-in. With one, story and media sections that do not fit
+    lose whole scenes from the end (and say which), feedback is cut at line
+    breaks, and sections with no room left are dropped.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        full_feedback_iterations: int = 1,
+        summary_items_per_category: int = 5,
+        model: str = "gpt-3.5-turbo-0125"
+    ):
+        self.token_budget = token_budget
+        self.full_feedback_iterations = max(1, full_feedback_iterations)
+        self.summary_items_per_category = summary_items_per_category
+        self.model = model
+
+    def _split_feedback(
+        self, previous_feedback: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]], List[int]]:
+        """Split feedback into recent entries and a deduplicated summary of older ones"""
+        entries = [f for f in previous_feedback if f.get("recommendations")]
+        recent = entries[-self.full_feedback_iterations:]
+        older = entries[:-self.full_feedback_iterations]
+
+        # Walk newest first so each recommendation is kept where it last appeared
+        seen = set()
+        deduped_recent = []
+        for feedback in reversed(recent):
+            recommendations = {}
+            for category, items in feedback["recommendations"].items():
+                unique = []
+                for item in items:
+                    key = _normalize(item)
+                    if key not in seen:
+                        seen.add(key)
+                        unique.append(item)
+                if unique:
+                    recommendations[category] = unique
+            deduped_recent.insert(0, {"iteration": feedback.get("iteration"), "recommendations": recommendations})
+
+        summary: Dict[str, List[str]] = {}
+        for feedback in reversed(older):
+            for category, items in feedback["recommendations"].items():
+                bucket = summary.setdefault(category, [])
+                for item in items:
+                    key = _normalize(item)
+                    if key not in seen and len(bucket) < self.summary_items_per_category:
+                        seen.add(key)
+                        bucket.append(item)
+
+        summary = {category: items for category, items in summary.items() if items}
+        return deduped_recent, summary, [f.get("iteration", 0) for f in older]
+
+    def _format_recommendations(self, recommendations: Dict[str, List[str]]) -> List[str]:
+        lines = []
+        for key, items in recommendations.items():
+            lines.append(f"\n{key}:")
+            lines.extend(f"- {item}" for item in items)
+        return lines
+
+    def _scene_feedback(self, state: Any, scene_ids: Optional[List[str]] = None) -> str:
+        """Latest scene-tagged recommendations, limited to ``scene_ids`` if given"""
+        for feedback in reversed(state.previous_feedback or []):
+            tagged = feedback.get("scene_recommendations")
+            if tagged:
+                lines = [f"\nScene Feedback (iteration {feedback.get('iteration')}):"]
+                for scene_id, items in tagged.items():
+                    if scene_ids is None or scene_id in scene_ids:
+                        lines.append(f"\n{scene_id}:")
+                        lines.extend(f"- {item}" for item in items)
+                return "\n".join(lines) if len(lines) > 1 else ""
+        return ""
+
+    def _feedback_sections(self, state: Any) -> List[Tuple[str, str, Any]]:
+        sections = []
+        recent, summary, older_iterations = self._split_feedback(state.previous_feedback)
+        lines = []
+        for feedback in recent:
+            if feedback["recommendations"]:
+                lines.append(f"\nRecommendations (iteration {feedback['iteration']}):")
+                lines.extend(self._format_recommendations(feedback["recommendations"]))
+        if lines:
+            sections.append(("recent_feedback", "", "\nPrevious Feedback:" + "\n".join(lines)))
+
+        if summary:
+            span = f"{min(older_iterations)}-{max(older_iterations)}"
+            lines = [f"\nEarlier Feedback Summary (iterations {span}, not yet addressed):"]
+            lines.extend(self._format_recommendations(summary))
+            sections.append(("feedback_summary", "", "\n".join(lines)))
+        return sections
+
+    def _delta_sections(self, state: Any, agent_name: str, scene_ids: List[str]) -> List[Tuple[str, str, Any]]:
+        """Only what is needed to revise the targeted scenes"""
+        sections = [("iteration", "", f"Current Iteration: {state.iteration}")]
+        story = state.story_content or {}
+        story_scenes = [s for s in story.get("scenes", []) if isinstance(s, dict) and s.get("scene_id") in scene_ids]
+
+        if agent_name == "story_analyst":
+            outline = {key: story.get(key) for key in ("title", "synopsis", "target_audience", "estimated_duration")}
+            sections.append(("story_outline", "\nStory Outline:\n", outline))
+            sections.append(("revised_scenes", "\nScenes To Revise:\n", story_scenes))
+        else:
+            media = state.media_direction or {}
+            style = {key: media.get(key) for key in ("visual_style", "audio_style")}
+            shots = [s for s in media.get("shot_list", []) if isinstance(s, dict) and s.get("scene_id") in scene_ids]
+            sections.append(("media_style", "\nMedia Style:\n", style))
+            sections.append(("story_content", "\nRevised Story Scenes:\n", story_scenes))
+            sections.append(("revised_scenes", "\nCurrent Shots For These Scenes:\n", shots))
+
+        scene_feedback = self._scene_feedback(state, scene_ids)
+        if scene_feedback:
+            sections.append(("scene_feedback", "", scene_feedback))
+        if state.previous_feedback:
+            sections.extend(self._feedback_sections(state))
+        return sections
+
+    def _sections(self, state: Any, agent_name: str) -> List[Tuple[str, str, Any]]:
+        """(name, header, body) per section; a non-string body is serialized as JSON"""
+        sections = [("iteration", "", f"Current Iteration: {state.iteration}")]
+
+        if state.story_content and agent_name != "story_analyst":
+            sections.append(("story_content", "\nCurrent Story Content:\n", state.story_content))
+
+        if state.media_direction and agent_name == "expert_evaluator":
+            sections.append(("media_direction", "\nMedia Direction:\n", state.media_direction))
+
+        if state.previous_feedback:
+            scene_feedback = self._scene_feedback(state)
+            if scene_feedback:
+                sections.append(("scene_feedback", "", scene_feedback))
+            sections.extend(self._feedback_sections(state))
+
+        return sections
+
+    def build(
+        self, state: Any, agent_name: str, scene_ids: Optional[List[str]] = None
+    ) -> Tuple[str, Dict[str, int]]:
+        """Return the context text and the tokens used per section.
+
+        With ``scene_ids`` the context covers only those scenes, for a delta
+        revision that leaves the rest of the story untouched.
+        """
+        remaining = self.token_budget
+        parts = []
+        usage: Dict[str, int] = {}
+
+        if scene_ids:
+            sections = self._delta_sections(state, agent_name, scene_ids)
+        else:
+            sections = self._sections(state, agent_name)
+        for name, header, body in sections:
+            text = header + (body if isinstance(body, str) else compact_json(body))
+            tokens = count_tokens(text, self.model)
+            if remaining is not None and tokens > remaining:
+                text = self._fit(header, body, remaining) if remaining >= 16 else None
+                if text is None:
+                    usage[name] = 0
+                    continue
+                tokens = count_tokens(text, self.model)
+            parts.append(text)
+            usage[name] = tokens
+            if remaining is not None:
+                remaining -= tokens
+
+        usage["total"] = sum(usage.values())
+        if self.token_budget is not None:
+            usage["budget"] = self.token_budget
+        return "\n".join(parts), usage
+
+    def _fit(self, header: str, body: Any, max_tokens: int) -> Optional[str]:
+        """A section shrunk to max_tokens, or None if nothing useful fits.
+
+        Text is cut at a line break. Structured sections keep their leading
+        scenes whole and list the ids of the scenes left out, so the model
+        never sees half-serialized JSON.
+        """
+        if isinstance(body, str):
+            return truncate_to_tokens(header + body, max_tokens, self.model)
+        scenes = _scene_list(body)
+        if not scenes:
+            return None
+        for keep in range(len(scenes) - 1, -1, -1):
+            omitted = [s.get("scene_id") if isinstance(s, dict) else None for s in scenes[keep:]]
+            if isinstance(body, list):
+                value = scenes[:keep]
+            else:
+                key = "scenes" if body.get("scenes") is scenes else "shot_list"
+                value = {**body, key: scenes[:keep]}
+            note = f"\n({len(omitted)} scenes omitted to fit the context budget: {', '.join(str(i) for i in omitted)})"
+            text = header + compact_json(value) + note
+            if count_tokens(text, self.model) <= max_tokens:
+                return text
+        return None
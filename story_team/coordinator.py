@@ -1,20 +1,110 @@
-from typing import Dict, Any, Callable
-from langgraph.graph import StateGraph, END
+import asyncio
+import time
+from contextvars import ContextVar
+from functools import cached_property
+from typing import Dict, Any, Awaitable, Callable, Optional, List
 from .agents import StoryAnalyst, MediaDirector, ExpertEvaluator
-from .state import CreativeState
-from .callbacks import EnhancedStoryTeamCallback
+from .state import CreativeState, WorkflowState, merge_update
+from .callbacks import CallbackEventBus, create_callback
 from .models import StoryContent, MediaDirection, EvaluationResult
+from .llm_cache import LLMResponseCache
+from .llm_backend import LLMBackend, LazyOpenAILLM
+from .policy import StoppingPolicy
+from .delta import scene_ids, target_scenes
+from .usage import RunUsage, current_usage
+from .checkpoint import CheckpointStore, new_run_id, COMPLETED, FAILED, END_NODE
+from .metrics import MetricsRegistry, RunMetrics, current_metrics, observe, registry
+
+# Graph node that runs each agent, and the node that follows it in sequential mode
+AGENT_NODES = {
+    "story_analyst": "story_analysis",
+    "media_director": "media_direction",
+    "expert_evaluator": "expert_evaluation"
+}
+NEXT_NODES = {"story_analysis": "media_direction", "media_direction": "expert_evaluation"}
+
+# Called with (media_direction, scene_ids) once those scenes will not be regenerated
+SceneListener = Callable[[Dict[str, Any], List[str]], Awaitable[None]]
+current_scene_listener: ContextVar[Optional[SceneListener]] = ContextVar("current_scene_listener", default=None)
 
 class EnhancedStoryTeamCoordinator:
-    def __init__(self):
-        self.story_analyst = StoryAnalyst()
-        self.media_director = MediaDirector()
-        self.expert_evaluator = ExpertEvaluator()
-        self.callback = EnhancedStoryTeamCallback()
-        self.workflow = self._create_workflow()
+    def __init__(
+        self,
+        llm_cache: Optional[LLMResponseCache] = None,
+        llm_backend: Optional[LLMBackend] = None,
+        callback: Optional[CallbackEventBus] = None,
+        num_candidates: int = 1,
+        candidate_temperatures: Optional[List[float]] = None,
+        stopping_policy: Optional[StoppingPolicy] = None,
+        delta_mode: bool = False,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
+        json_mode: bool = False,
+        max_repair_retries: int = 1,
+        context_token_budgets: Optional[Dict[str, int]] = None
+    ):
+        # All agents share one client instead of opening a connection pool each
+        if llm_backend is None and (llm_cache is None or llm_cache.calls_llm):
+            llm_backend = LazyOpenAILLM()
+        
+        agent_options = {
+            "llm_cache": llm_cache,
+            "llm": llm_backend,
+            "json_mode": json_mode,
+            "max_repair_retries": max_repair_retries
+        }
+        # Context token budgets by agent name; agents without one get their full context
+        budgets = context_token_budgets or {}
+        self.story_analyst = StoryAnalyst(context_token_budget=budgets.get("story_analyst"), **agent_options)
+        self.media_director = MediaDirector(context_token_budget=budgets.get("media_director"), **agent_options)
+        self.expert_evaluator = ExpertEvaluator(context_token_budget=budgets.get("expert_evaluator"), **agent_options)
+        self.callback = callback or create_callback("rich")
+        self.stopping_policy = stopping_policy or StoppingPolicy.default()
+        # Delta mode: later iterations only regenerate the scenes the evaluator tagged
+        self.delta_mode = delta_mode
+        # Saves the state after every node so interrupted runs can be resumed
+        self.checkpoint_store = checkpoint_store
+        # Histograms of every run, for Prometheus export across a batch
+        self.metrics_registry = metrics_registry if metrics_registry is not None else registry
+        
+        # Speculative mode: several story/media candidates per iteration, best one kept
+        self.num_candidates = max(1, num_candidates)
+        self.candidate_options = self._candidate_options(candidate_temperatures)
+        
+    def _candidate_options(self, temperatures: Optional[List[float]]) -> List[Dict[str, Any]]:
+        """LLM options for each candidate, spreading temperatures and seeds"""
+        if self.num_candidates == 1:
+            return [{}]
+        if not temperatures:
+            temperatures = [round(min(1.3, 0.5 + 0.2 * i), 2) for i in range(self.num_candidates)]
+        return [
+            {"temperature": temperatures[i % len(temperatures)], "seed": i}
+            for i in range(self.num_candidates)
+        ]
+        
+    @cached_property
+    def workflow(self):
+        """The compiled graph, built on the first run and reused by every later one"""
+        return self._create_workflow()
         
-    def _create_workflow(self) -> StateGraph:
-        workflow = StateGraph(Dict)
+    def _create_workflow(self):
+        # langgraph is slow to import, so constructing a coordinator does not load it
+        from langgraph.graph import StateGraph, END
+        
+        workflow = StateGraph(WorkflowState)
+        
+        if self.num_candidates > 1:
+            workflow.add_node("candidate_generation", self._generate_candidates)
+            workflow.add_conditional_edges(
+                "candidate_generation",
+                self.should_continue,
+                {
+                    "continue": "candidate_generation",
+                    "end": END
+                }
+            )
+            workflow.set_entry_point("candidate_generation")
+            return workflow.compile()
         
         # Add nodes for each agent
         workflow.add_node("story_analysis", 
@@ -38,95 +128,297 @@ class EnhancedStoryTeamCoordinator:
         workflow.add_edge("story_analysis", "media_direction")
         workflow.add_edge("media_direction", "expert_evaluation")
         
-        workflow.set_entry_point("story_analysis")
+        # Resumed runs enter at the node after their last checkpoint
+        workflow.set_conditional_entry_point(self._entry_node, list(AGENT_NODES.values()))
         
         return workflow.compile()
 
+    def _entry_node(self, state: Dict[str, Any]) -> str:
+        return state.get("resume_node") or "story_analysis"
+
+    def _next_node(self, node: str, state: Dict[str, Any]) -> str:
+        """The node the graph runs after ``node`` for this (merged) state"""
+        if node in NEXT_NODES:
+            return NEXT_NODES[node]
+        if self.should_continue(state) == "end":
+            return END_NODE
+        return node if node == "candidate_generation" else "story_analysis"
+
+    def _checkpoint(self, node: str, state: Dict[str, Any], update: Dict[str, Any]) -> None:
+        """Persist the state as it is once this node's update is merged"""
+        run_id = state.get("run_id")
+        if self.checkpoint_store is None or not run_id:
+            return
+        merged = merge_update(state, update)
+        merged.pop("resume_node", None)
+        usage = current_usage.get()
+        self.checkpoint_store.save(
+            run_id, node, self._next_node(node, merged), merged, usage.snapshot() if usage else None
+        )
+
     def should_continue(self, state: Dict[str, Any]) -> str:
-        """Determine if workflow should continue based on evaluation scores"""
-        if isinstance(state, dict):
-            evaluation_result = state.get("evaluation_result", {})
-            iteration = state.get("iteration", 0)
-            previous_scores = state.get("previous_scores", [])
-            
-            # Get overall score
-            overall_score = 0.0
-            if isinstance(evaluation_result, dict):
-                scores = evaluation_result.get("scores", {})
-                if isinstance(scores, dict):
-                    overall_score = float(scores.get("overall_score", 0.0))
-            
-            # Store score history
-            previous_scores.append(overall_score)
-            state["previous_scores"] = previous_scores
-            
-            # Check for score improvement
-            score_improving = len(previous_scores) >= 2 and overall_score > previous_scores[-2]
-            
-            # Termination conditions
-            if iteration == 0:
-                return "continue"
-            elif overall_score >= 8.0:
-                return "end"
-            elif iteration >= 3 and not score_improving:
-                return "end"
-            elif iteration >= 5:  # Hard limit
-                return "end"
+        """Determine if workflow should continue based on the stopping policy"""
+        if not isinstance(state, dict):
             return "continue"
+        # The evaluator node records the policy decision alongside its scores
+        if "stop_reason" in state:
+            return "end" if state["stop_reason"] else "continue"
+        if self.stopping_policy.check(state, current_usage.get()):
+            return "end"
         return "continue"
 
+    def _state_update(self, agent_name: str, state: CreativeState, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the partial state update for an agent's result"""
+        if agent_name == "story_analyst":
+            return {"story_content": result}
+        if agent_name == "media_director":
+            return {"media_direction": result}
+        
+        update = {
+            "evaluation_result": result,
+            "iteration": state.iteration + 1
+        }
+        if result.get("recommendations") or result.get("scene_recommendations"):
+            feedback = {
+                "iteration": state.iteration,
+                "recommendations": result.get("recommendations") or {}
+            }
+            if result.get("scene_recommendations"):
+                feedback["scene_recommendations"] = result["scene_recommendations"]
+            update["previous_feedback"] = [feedback]
+        if self.delta_mode:
+            story_scenes = scene_ids((state.story_content or {}).get("scenes"))
+            update["target_scenes"] = target_scenes(result, story_scenes)
+        
+        overall_score = 0.0
+        scores = result.get("scores", {})
+        if isinstance(scores, dict):
+            overall_score = float(scores.get("overall_score") or 0.0)
+        update["previous_scores"] = [overall_score]
+        
+        # Decide on the state as it will be once this update is merged
+        next_state = {
+            "memory": state.memory,
+            "evaluation_result": result,
+            "iteration": update["iteration"],
+            "previous_scores": state.previous_scores + [overall_score]
+        }
+        update["stop_reason"] = self.stopping_policy.check(next_state, current_usage.get())
+        return update
+
     def _wrap_with_callbacks(self, agent_name: str, process_func: Callable) -> Callable:
         """Wrap an agent's process function with callbacks"""
-        async def wrapped_process(state: Dict[str, Any]) -> Dict[str, Any]:
-            if isinstance(state, dict):
-                state = CreativeState(**state)
-            
-            self.callback.on_agent_start(agent_name, state.model_dump())
-            result = await process_func(state)
+        async def wrapped_process(state: WorkflowState) -> Dict[str, Any]:
+            start = self._node_started(agent_name, state)
+            creative_state = self._agent_state(agent_name, state)
+            result = await process_func(creative_state)
             self.callback.on_agent_finish(agent_name, result)
             
-            # Update state with result based on agent type
-            state_dict = state.model_dump()
-            if agent_name == "story_analyst":
-                state_dict["story_content"] = result
-            elif agent_name == "media_director":
-                state_dict["media_direction"] = result
-            elif agent_name == "expert_evaluator":
-                state_dict["evaluation_result"] = result
-                if result.get("recommendations"):
-                    state_dict["previous_feedback"] = state_dict.get("previous_feedback", [])
-                    state_dict["previous_feedback"].append({
-                        "iteration": state.iteration,
-                        "recommendations": result["recommendations"]
-                    })
-                if result.get("scores", {}).get("overall_score"):
-                    state_dict["previous_scores"] = state_dict.get("previous_scores", [])
-                    state_dict["previous_scores"].append(
-                        float(result["scores"]["overall_score"])
-                    )
-                state_dict["iteration"] = state.iteration + 1
-            
-            return state_dict
+            # Return only the changed fields; the graph merges them
+            update = self._state_update(agent_name, creative_state, result)
+            await asyncio.to_thread(self._checkpoint, AGENT_NODES[agent_name], state, update)
+            if agent_name == "expert_evaluator":
+                await self._announce_final_scenes(creative_state, update)
+            self._node_finished(agent_name, start)
+            return update
         return wrapped_process
 
-    async def generate_content(self, prompt: str) -> Dict[str, Any]:
-        """Generate content from prompt"""
+    async def _announce_final_scenes(self, state: CreativeState, update: Dict[str, Any]) -> None:
+        """Pass the scenes that will not change again to the run's scene listener.
+
+        Every scene is final once the loop stops. In delta mode the scenes the
+        evaluator did not tag are carried over unchanged, so they are final
+        unless a later evaluation tags them; listeners then get them again.
+        """
+        listener = current_scene_listener.get()
+        if listener is None:
+            return
+        media_direction = state.media_direction or {}
+        shot_scenes = scene_ids(media_direction.get("shot_list"))
+        if update.get("stop_reason"):
+            final = shot_scenes
+        elif self.delta_mode and update.get("target_scenes"):
+            final = [scene_id for scene_id in shot_scenes if scene_id not in update["target_scenes"]]
+        else:
+            return
+        if final:
+            await listener(media_direction, final)
+
+    def _node_started(self, node: str, state: Dict[str, Any]) -> float:
+        """Record how long the node waited since the previous one finished"""
+        start = time.perf_counter()
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.iteration = state.get("iteration", 0)
+            observe("queue_wait_seconds", start - metrics.last_mark, node)
+        return start
+
+    def _node_finished(self, node: str, start: float) -> None:
+        end = time.perf_counter()
+        observe("node_seconds", end - start, node)
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.last_mark = end
+
+    def _agent_state(self, agent_name: str, state: Dict[str, Any]) -> CreativeState:
+        """Build the agent's state view and announce the agent, timing both"""
+        start = time.perf_counter()
+        # Agents only read the state, so skip validation and copying
+        creative_state = CreativeState.model_construct(**state)
+        self.callback.on_agent_start(agent_name, state)
+        observe("state_copy_seconds", time.perf_counter() - start, agent_name)
+        return creative_state
+
+    async def _run_candidate(self, state: WorkflowState, llm_options: Dict[str, Any]) -> Dict[str, Any]:
+        """Run story, media and evaluation for one candidate"""
+        story = await self.story_analyst.process(self._agent_state("story_analyst", state), **llm_options)
+        self.callback.on_agent_finish("story_analyst", story)
+        
+        state = {**state, "story_content": story}
+        media = await self.media_director.process(self._agent_state("media_director", state), **llm_options)
+        self.callback.on_agent_finish("media_director", media)
+        
+        # Evaluate every candidate with the same judge settings
+        state = {**state, "media_direction": media}
+        evaluation = await self.expert_evaluator.process(self._agent_state("expert_evaluator", state))
+        self.callback.on_agent_finish("expert_evaluator", evaluation)
+        
+        return {"story_content": story, "media_direction": media, "evaluation_result": evaluation}
+
+    def _candidate_score(self, candidate: Dict[str, Any]) -> float:
+        scores = candidate["evaluation_result"].get("scores", {})
+        if isinstance(scores, dict):
+            try:
+                return float(scores.get("overall_score") or 0.0)
+            except (TypeError, ValueError):
+                return 0.0
+        return 0.0
+
+    async def _generate_candidates(self, state: WorkflowState) -> Dict[str, Any]:
+        """Generate and evaluate candidates concurrently, carrying forward the best"""
+        start = self._node_started("candidate_generation", state)
+        results = await asyncio.gather(
+            *(self._run_candidate(state, options) for options in self.candidate_options),
+            return_exceptions=True
+        )
+        candidates = [r for r in results if not isinstance(r, BaseException)]
+        if not candidates:
+            raise results[0]
+        
+        scores = [self._candidate_score(c) for c in candidates]
+        best = candidates[scores.index(max(scores))]
+        
+        # The evaluator update reads the story it evaluated, as in the sequential graph
+        creative_state = CreativeState.model_construct(**{**state, **best})
+        update = self._state_update("story_analyst", creative_state, best["story_content"])
+        update.update(self._state_update("media_director", creative_state, best["media_direction"]))
+        update.update(self._state_update("expert_evaluator", creative_state, best["evaluation_result"]))
+        
+        memory = dict(state.get("memory") or {})
+        memory["candidate_scores"] = memory.get("candidate_scores", []) + [scores]
+        update["memory"] = memory
+        await asyncio.to_thread(self._checkpoint, "candidate_generation", state, update)
+        self._node_finished("candidate_generation", start)
+        return update
+
+    async def generate_content(
+        self,
+        prompt: str,
+        run_id: Optional[str] = None,
+        on_scenes_final: Optional[SceneListener] = None
+    ) -> Dict[str, Any]:
+        """Generate content from prompt.
+        
+        With a checkpoint store the run is saved under ``run_id`` (a new id
+        by default, returned in the result) and can be continued with
+        ``resume`` if it is interrupted. ``on_scenes_final`` is awaited with
+        the media direction and the ids of scenes that are done, while the
+        rest are still being refined (see ``_announce_final_scenes``).
+        """
         initial_state = CreativeState(
             memory={"original_prompt": prompt}
-        )
+        ).model_dump()
         
-        self.callback.on_chain_start(initial_state.model_dump())
-        final_state = await self.workflow.ainvoke(initial_state.model_dump())
+        if self.checkpoint_store is not None:
+            initial_state["run_id"] = run_id or new_run_id()
+            await asyncio.to_thread(self.checkpoint_store.start_run, initial_state["run_id"], prompt)
+        return await self._run_workflow(initial_state, on_scenes_final=on_scenes_final)
+
+    async def resume(self, run_id: str) -> Dict[str, Any]:
+        """Continue a checkpointed run from the node after its last completed one"""
+        if self.checkpoint_store is None:
+            raise ValueError("Resuming requires a checkpoint store")
+        checkpoint = await asyncio.to_thread(self.checkpoint_store.latest, run_id)
+        if checkpoint is None:
+            raise ValueError(f"No checkpointed run with id '{run_id}'")
+        if "state" not in checkpoint:
+            # Interrupted before the first node finished
+            return await self.generate_content(checkpoint["prompt"], run_id)
+        
+        state = checkpoint["state"]
+        # Token, cost and time budgets count what the run spent before it stopped
+        usage = RunUsage.restore(checkpoint.get("usage"))
+        if checkpoint["next_node"] == END_NODE:
+            # The process may have died between the last checkpoint and finish_run
+            if checkpoint["status"] != COMPLETED:
+                await asyncio.to_thread(self.checkpoint_store.finish_run, run_id, COMPLETED)
+            return self._result(state, usage)
+        
+        await asyncio.to_thread(self.checkpoint_store.start_run, run_id, checkpoint["prompt"])
+        # Candidate mode has a single entry node, so the next node is implied
+        if self.num_candidates == 1:
+            state["resume_node"] = checkpoint["next_node"]
+        return await self._run_workflow(state, usage)
+
+    async def _run_workflow(
+        self,
+        state: Dict[str, Any],
+        usage: Optional[RunUsage] = None,
+        on_scenes_final: Optional[SceneListener] = None
+    ) -> Dict[str, Any]:
+        run_id = state.get("run_id")
+        usage = usage or RunUsage()
+        metrics = RunMetrics(self.metrics_registry)
+        usage_token = current_usage.set(usage)
+        metrics_token = current_metrics.set(metrics)
+        listener_token = current_scene_listener.set(on_scenes_final)
+        try:
+            self.callback.on_chain_start(state)
+            final_state = await self.workflow.ainvoke(state)
+        except BaseException as e:
+            if self.checkpoint_store is not None and run_id:
+                await asyncio.to_thread(self.checkpoint_store.finish_run, run_id, FAILED, str(e) or type(e).__name__)
+            raise
+        finally:
+            current_usage.reset(usage_token)
+            current_metrics.reset(metrics_token)
+            current_scene_listener.reset(listener_token)
+        if self.checkpoint_store is not None and run_id:
+            await asyncio.to_thread(self.checkpoint_store.finish_run, run_id, COMPLETED)
+        # Let queued progress output finish before the caller prints results
+        await asyncio.to_thread(self.callback.flush)
         
         # Ensure we return a dictionary
         if isinstance(final_state, CreativeState):
             final_state = final_state.model_dump()
-        
+        return self._result(final_state, usage, metrics)
+
+    def _result(
+        self,
+        final_state: Dict[str, Any],
+        usage: RunUsage,
+        metrics: Optional[RunMetrics] = None
+    ) -> Dict[str, Any]:
         return {
+            "run_id": final_state.get("run_id"),
             "story": final_state.get("story_content", {}),
             "media_direction": final_state.get("media_direction", {}),
             "evaluation": final_state.get("evaluation_result", {}),
             "iterations": final_state.get("iteration", 0),
             "previous_feedback": final_state.get("previous_feedback", []),
-            "previous_scores": final_state.get("previous_scores", [])
-        } 
\ No newline at end of file
+            "previous_scores": final_state.get("previous_scores", []),
+            "candidate_scores": final_state.get("memory", {}).get("candidate_scores", []),
+            "stop_reason": final_state.get("stop_reason"),
+            "usage": usage.to_dict(),
+            "metrics": metrics.summary() if metrics is not None else {}
+        }
@@ -0,0 +1,47 @@
+from typing import Dict, Any, Optional, List
+
+
+def scene_ids(items: Optional[List[Dict[str, Any]]]) -> List[str]:
+    """Scene ids of a list of scenes or shot list entries, in order"""
+    return [item["scene_id"] for item in items or [] if isinstance(item, dict) and item.get("scene_id")]
+
+
+def target_scenes(evaluation_result: Optional[Dict[str, Any]], known_ids: List[str]) -> List[str]:
+    """Scene ids the evaluator tagged with recommendations, in story order.
+
+    Tags for scenes that do not exist are ignored. An empty list means no
+    scene was singled out, and the next iteration regenerates everything.
+    """
+    if not isinstance(evaluation_result, dict):
+        return []
+    tagged = evaluation_result.get("scene_recommendations")
+    if not isinstance(tagged, dict):
+        return []
+    return [scene_id for scene_id in known_ids if tagged.get(scene_id)]
+
+
+def merge_scenes(
+    existing: List[Dict[str, Any]],
+    updated: Any,
+    targets: List[str]
+) -> List[Dict[str, Any]]:
+    """Replace the targeted scenes in ``existing`` with their regenerated versions.
+
+    Order and scene ids stay exactly as in ``existing``. Regenerated entries
+    without a scene_id are matched to the targets by position, entries for
+    scenes that were not targeted are dropped, and a targeted scene missing
+    from the update keeps its previous version.
+    """
+    replacements: Dict[str, Dict[str, Any]] = {}
+    items = [item for item in updated if isinstance(item, dict)] if isinstance(updated, list) else []
+    for position, item in enumerate(items):
+        scene_id = item.get("scene_id")
+        if not scene_id and position < len(targets):
+            scene_id = targets[position]
+        if scene_id in targets and scene_id not in replacements:
+            replacements[scene_id] = {**item, "scene_id": scene_id}
+
+    return [
+        replacements.get(item.get("scene_id"), item) if isinstance(item, dict) else item
+        for item in existing
+    ]
@@ -0,0 +1,321 @@
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
+from langchain_core.messages import AIMessage, AIMessageChunk
+import asyncio
+import json
+import random
+import re
+import threading
+import zlib
+from utils.config import get_openai_api_key
+
+DEFAULT_MODEL = "gpt-3.5-turbo-0125"
+DEFAULT_TEMPERATURE = 0.7
+
+# ChatOpenAI clients by (model, temperature), shared by every agent and coordinator
+_clients: Dict[Tuple[str, float], Any] = {}
+_clients_lock = threading.Lock()
+
+
+class LLMBackend:
+    """Interface BaseAgent needs from an LLM client.
+
+    ``ChatOpenAI`` already satisfies it; any object exposing ``model_name``,
+    ``temperature`` and an async ``ainvoke(messages)`` returning a message
+    with ``.content`` can be passed to the agents instead.
+    """
+    model_name: str = ""
+    temperature: float = 0.0
+
+    async def ainvoke(self, messages: List[Any], **options: Any) -> AIMessage:
+        """Run the messages; ``options`` such as temperature or seed override defaults"""
+        raise NotImplementedError
+
+    # Backends may also provide ``astream(messages)`` yielding message chunks;
+    # BaseAgent.stream_process falls back to ainvoke when it is missing.
+
+
+def create_openai_llm(
+    model_name: str = DEFAULT_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE
+):
+    """Create the OpenAI chat client; one instance can be shared by many agents"""
+    api_key = get_openai_api_key()
+    # langchain_openai pulls in the openai SDK, so it is only imported when a client is built
+    from langchain_openai import ChatOpenAI
+    
+    return ChatOpenAI(
+        model=model_name,
+        temperature=temperature,
+        openai_api_key=api_key
+    )
+
+
+def shared_openai_llm(model_name: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE):
+    """The process-wide ChatOpenAI client for a model and temperature, created on first request"""
+    key = (model_name, temperature)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = create_openai_llm(model_name, temperature)
+        return _clients[key]
+
+
+class LazyOpenAILLM(LLMBackend):
+    """OpenAI backend that builds its client on the first call.
+    
+    The API key is still checked on construction, so a missing key fails
+    fast, but langchain_openai is not imported and no connection pool is
+    opened until an agent actually calls the model. Instances with the same
+    model and temperature share one client.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE):
+        get_openai_api_key()
+        self.model_name = model_name
+        self.temperature = temperature
+
+    @property
+    def client(self):
+        return shared_openai_llm(self.model_name, self.temperature)
+
+    async def ainvoke(self, messages: List[Any], **options: Any) -> AIMessage:
+        return await self.client.ainvoke(messages, **options)
+
+    def astream(self, messages: List[Any], **options: Any) -> AsyncIterator[AIMessageChunk]:
+        return self.client.astream(messages, **options)
+
+
+class SimulatedLLMError(RuntimeError):
+    """Raised by SimulatedLLMBackend to mimic an API failure"""
+
+
+class SimulatedLLMBackend(LLMBackend):
+    """Offline stand-in for the OpenAI backend used in tests and benchmarks.
+
+    Returns schema-valid JSON for the story analyst, media director and
+    expert evaluator after a configurable delay. Evaluator scores rise with
+    the iteration so the refinement loop converges like a real run.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        num_scenes: int = 3,
+        shots_per_scene: int = 2,
+        base_score: float = 6.5,
+        score_step: float = 0.6,
+        score_jitter: float = 0.0,
+        stream_chunk_size: int = 64,
+        flagged_scenes: int = 1,
+        seed: Optional[int] = None
+    ):
+        self.model_name = "simulated"
+        self.temperature = 0.0
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.num_scenes = num_scenes
+        self.shots_per_scene = shots_per_scene
+        self.base_score = base_score
+        self.score_step = score_step
+        self.score_jitter = score_jitter
+        self.stream_chunk_size = max(1, stream_chunk_size)
+        self.flagged_scenes = flagged_scenes
+        self.random = random.Random(seed)
+        self.calls: Dict[str, int] = {}
+        self.simulated_latency: Dict[str, float] = {}
+
+    def _agent_for(self, system_prompt: str) -> str:
+        """Work out which agent is calling from its output format"""
+        if '"scores"' in system_prompt:
+            return "expert_evaluator"
+        if '"shot_list"' in system_prompt:
+            return "media_director"
+        return "story_analyst"
+
+    def _iteration(self, prompt: str) -> int:
+        match = re.search(r"Current Iteration: (\d+)", prompt)
+        return int(match.group(1)) if match else 0
+
+    def _scene_ids(self) -> List[str]:
+        return [f"scene_{i:03d}" for i in range(1, self.num_scenes + 1)]
+
+    def _revised_scenes(self, prompt: str) -> Optional[List[str]]:
+        """Scene ids of a delta revision request, None for a full generation"""
+        match = re.search(r"Revise only scenes: ([\w, ]+)", prompt)
+        return [s.strip() for s in match.group(1).split(",")] if match else None
+
+    def _flagged(self, iteration: int) -> List[str]:
+        """Scenes the evaluator singles out, rotating with the iteration"""
+        ids = self._scene_ids()
+        count = min(self.flagged_scenes, len(ids))
+        return sorted({ids[(iteration + i) % len(ids)] for i in range(count)})
+
+    def _story(self, iteration: int, variant: str = "", scene_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        if scene_ids is not None:
+            story = self._story(iteration, variant)
+            return {
+                "scenes": [scene for scene in story["scenes"] if scene["scene_id"] in scene_ids],
+                "feedback_addressed": story["feedback_addressed"]
+            }
+        return {
+            "title": f"Simulated Story v{iteration}{variant}",
+            "synopsis": "A robot discovers emotions for the first time.",
+            "target_audience": "General YouTube audience",
+            "estimated_duration": "1 minute",
+            "scenes": [
+                {
+                    "scene_id": scene_id,
+                    "description": f"Description of {scene_id} (v{iteration})",
+                    "key_moments": ["Key moment 1", "Key moment 2"],
+                    "emotional_beats": ["Curiosity", "Wonder"],
+                    "visual_potential": ["Neon city", "Soft rain"]
+                }
+                for scene_id in self._scene_ids()
+            ],
+            "feedback_addressed": [f"Addressed feedback from iteration {iteration - 1}"] if iteration else []
+        }
+
+    def _media_direction(self, iteration: int, scene_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        if scene_ids is not None:
+            media = self._media_direction(iteration)
+            return {
+                "shot_list": [scene for scene in media["shot_list"] if scene["scene_id"] in scene_ids],
+                "feedback_addressed": media["feedback_addressed"]
+            }
+        return {
+            "visual_style": "Cinematic, soft neon palette",
+            "audio_style": "Ambient synth score",
+            "shot_list": [
+                {
+                    "scene_id": scene_id,
+                    "shots": [
+                        {
+                            "shot_id": f"{i:03d}",
+                            "description": f"Shot {i} of {scene_id} (v{iteration})",
+                            "camera_work": "Slow dolly in",
+                            "lighting": "Low-key, rim light",
+                            "duration": "3s",
+                            "ai_considerations": "Keep character design consistent"
+                        }
+                        for i in range(1, self.shots_per_scene + 1)
+                    ],
+                    "audio_elements": {
+                        "music": "Soft pads",
+                        "sound_effects": ["Servo whir", "Rain"],
+                        "ambient_sound": "City hum"
+                    }
+                }
+                for scene_id in self._scene_ids()
+            ],
+            "technical_requirements": {
+                "equipment": ["Image model", "Video model"],
+                "special_requirements": ["Consistent character seed"]
+            },
+            "feedback_addressed": [f"Addressed feedback from iteration {iteration - 1}"] if iteration else []
+        }
+
+    def _evaluation(self, iteration: int, prompt: str) -> Dict[str, Any]:
+        score = self.base_score + self.score_step * iteration
+        if self.score_jitter:
+            # Deterministic per evaluated content, so candidates score differently
+            score += random.Random(zlib.crc32(prompt.encode("utf-8"))).uniform(
+                -self.score_jitter, self.score_jitter
+            )
+        score = round(max(0.0, min(10.0, score)), 1)
+        criteria = [
+            "story_impact",
+            "visual_quality",
+            "platform_optimization",
+            "audience_connection",
+            "technical_feasibility"
+        ]
+        scores = {name: score for name in criteria}
+        scores["overall_score"] = score
+        return {
+            "scores": scores,
+            "analysis": {
+                "strengths": ["Clear emotional arc"],
+                "weaknesses": ["Pacing in the middle"],
+                "viral_potential": "Moderate",
+                "production_complexity": "Low"
+            },
+            "recommendations": {
+                "story_improvements": [f"Tighten pacing (iteration {iteration})"],
+                "technical_adjustments": ["Reuse character reference images"],
+                "platform_optimization": ["Stronger hook in the first 3 seconds"]
+            },
+            "scene_recommendations": {
+                scene_id: [f"Clarify the emotional beat of {scene_id} (iteration {iteration})"]
+                for scene_id in self._flagged(iteration)
+            },
+            "iteration_notes": f"Simulated evaluation for iteration {iteration}"
+        }
+
+    def _usage(self, messages: List[Any], content: str) -> Dict[str, int]:
+        """Approximate token usage at four characters per token"""
+        input_tokens = sum(len(m.content) for m in messages) // 4
+        output_tokens = len(content) // 4
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
+
+    def _respond(self, messages: List[Any], options: Dict[str, Any]) -> Tuple[str, Optional[str], float]:
+        """Pick the simulated latency and build the response text, None for a failure"""
+        system_prompt = messages[0].content if messages else ""
+        prompt = messages[-1].content if messages else ""
+        agent = self._agent_for(system_prompt)
+        iteration = self._iteration(prompt)
+
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        self.calls[agent] = self.calls.get(agent, 0) + 1
+        self.simulated_latency[agent] = self.simulated_latency.get(agent, 0.0) + delay
+
+        if self.random.random() < self.failure_rate:
+            return agent, None, delay
+
+        if agent == "expert_evaluator":
+            payload = self._evaluation(iteration, prompt)
+        elif agent == "media_director":
+            payload = self._media_direction(iteration, self._revised_scenes(prompt))
+        else:
+            variant = "".join(f" {key}={options[key]}" for key in ("temperature", "seed") if key in options)
+            payload = self._story(iteration, variant, self._revised_scenes(prompt))
+
+        content = json.dumps(payload)
+        if self.random.random() < self.malformed_rate:
+            content = f"Here is the result:\n{content[:len(content) // 2]}"
+        return agent, f"```json\n{content}\n```", delay
+
+    async def ainvoke(self, messages: List[Any], **options: Any) -> AIMessage:
+        agent, content, delay = self._respond(messages, options)
+        if delay:
+            await asyncio.sleep(delay)
+        if content is None:
+            raise SimulatedLLMError(f"Simulated failure for {agent}")
+        return AIMessage(content=content, usage_metadata=self._usage(messages, content))
+
+    async def astream(self, messages: List[Any], **options: Any) -> AsyncIterator[AIMessageChunk]:
+        """Stream the response in chunks, spreading the latency across them"""
+        agent, content, delay = self._respond(messages, options)
+        if content is None:
+            if delay:
+                await asyncio.sleep(delay)
+            raise SimulatedLLMError(f"Simulated failure for {agent}")
+        chunks = [
+            content[i:i + self.stream_chunk_size]
+            for i in range(0, len(content), self.stream_chunk_size)
+        ]
+        for i, chunk in enumerate(chunks):
+            if delay:
+                await asyncio.sleep(delay / len(chunks))
+            if i == len(chunks) - 1:
+                # Like OpenAI, report usage once on the final chunk
+                yield AIMessageChunk(content=chunk, usage_metadata=self._usage(messages, content))
+            else:
+                yield AIMessageChunk(content=chunk)
@@ -0,0 +1,148 @@
+from typing import Dict, Any, Optional, List
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+READ_THROUGH = "read_through"
+WRITE_THROUGH = "write_through"
+REPLAY_ONLY = "replay_only"
+CACHE_MODES = (READ_THROUGH, WRITE_THROUGH, REPLAY_ONLY)
+
+
+class ReplayCacheMiss(LookupError):
+    """Raised in replay-only mode when a request has no cached response"""
+
+
+class LLMResponseCache:
+    """SQLite-backed cache of LLM responses keyed on model, temperature and messages.
+
+    Modes:
+    - read_through: serve cached responses, call the LLM and store on a miss
+    - write_through: always call the LLM and refresh the stored response
+    - replay_only: only serve cached responses, never call the LLM
+    """
+
+    def __init__(
+        self,
+        path: str = ".llm_cache.sqlite",
+        mode: str = READ_THROUGH,
+        ttl_seconds: Optional[float] = None
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+        self.prune()
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        """Build a cache from LLM_CACHE_PATH/LLM_CACHE_MODE/LLM_CACHE_TTL, if configured"""
+        path = os.getenv("LLM_CACHE_PATH")
+        if not path:
+            return None
+        ttl = os.getenv("LLM_CACHE_TTL")
+        return cls(
+            path=path,
+            mode=os.getenv("LLM_CACHE_MODE", READ_THROUGH),
+            ttl_seconds=float(ttl) if ttl else None
+        )
+
+    @property
+    def calls_llm(self) -> bool:
+        """Whether this cache ever lets requests through to the LLM"""
+        return self.mode != REPLAY_ONLY
+
+    @staticmethod
+    def make_key(
+        model: str,
+        temperature: float,
+        messages: List[Any],
+        options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Hash the model, temperature, rendered messages and any call options into a cache key"""
+        rendered = [
+            {"role": getattr(m, "type", ""), "content": getattr(m, "content", m)}
+            for m in messages
+        ]
+        request = {"model": model, "temperature": temperature, "messages": rendered}
+        if options:
+            request["options"] = options
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, honouring the cache mode"""
+        if self.mode == WRITE_THROUGH:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self._is_expired(row[1]):
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+
+            if row:
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+
+        if self.mode == REPLAY_ONLY:
+            raise ReplayCacheMiss(f"No cached LLM response for key {key}")
+        return None
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store a response for a key"""
+        if self.mode == REPLAY_ONLY:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, model, response, time.time())
+            )
+            self._conn.commit()
+
+    def prune(self) -> int:
+        """Delete entries older than the TTL and return how many were removed"""
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of stored responses"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
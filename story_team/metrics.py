@@ -0,0 +1,149 @@
+from typing import Dict, Any, Optional, List, Tuple
+from contextvars import ContextVar
+import bisect
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+COST_BUCKETS = (0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+# Metric name -> (help text, histogram buckets)
+METRICS: Dict[str, Tuple[str, tuple]] = {
+    "queue_wait_seconds": ("Time between the previous node finishing and this one starting", LATENCY_BUCKETS),
+    "node_seconds": ("Wall clock of a graph node, including callbacks", LATENCY_BUCKETS),
+    "llm_latency_seconds": ("Wall clock of one LLM call, excluding cache hits", LATENCY_BUCKETS),
+    "parse_seconds": ("Time to extract and parse the JSON response", LATENCY_BUCKETS),
+    "state_copy_seconds": ("Time spent building agent state views and callback copies", LATENCY_BUCKETS),
+    "prompt_tokens": ("Prompt tokens per LLM call", TOKEN_BUCKETS),
+    "completion_tokens": ("Completion tokens per LLM call", TOKEN_BUCKETS),
+    "llm_cost_usd": ("Estimated USD cost per LLM call", COST_BUCKETS),
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(upper bound, cumulative count) pairs ending with +Inf"""
+        total = 0
+        bounds = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            bounds.append((bound if bound == "+Inf" else f"{bound:g}", total))
+        return bounds
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "total": round(sum(ordered), 6),
+        "mean": round(sum(ordered) / len(ordered), 6),
+        "p50": round(ordered[int(0.5 * (len(ordered) - 1))], 6),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 6),
+        "max": round(ordered[-1], 6),
+    }
+
+
+class MetricsRegistry:
+    """Process-wide histograms per metric and agent, for Prometheus scraping or dumps"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe(self, name: str, value: float, agent: str) -> None:
+        with self._lock:
+            histogram = self.histograms.get((name, agent))
+            if histogram is None:
+                histogram = self.histograms[(name, agent)] = Histogram(METRICS[name][1])
+            histogram.observe(value)
+
+    def to_prometheus(self, prefix: str = "story_team_") -> str:
+        """Render all histograms in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in METRICS:
+                series = sorted((agent, h) for (metric, agent), h in self.histograms.items() if metric == name)
+                if not series:
+                    continue
+                metric = prefix + name
+                lines.append(f"# HELP {metric} {METRICS[name][0]}")
+                lines.append(f"# TYPE {metric} histogram")
+                for agent, histogram in series:
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{agent="{agent}",le="{bound}"}} {count}')
+                    lines.append(f'{metric}_sum{{agent="{agent}"}} {histogram.sum:g}')
+                    lines.append(f'{metric}_count{{agent="{agent}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RunMetrics:
+    """Samples recorded during one generate_content run.
+
+    Every sample is also added to a process-wide registry, so a batch can be
+    exported as one set of histograms while each result carries its own
+    per-agent and per-iteration summary.
+    """
+
+    def __init__(self, metrics_registry: Optional[MetricsRegistry] = None):
+        self.registry = metrics_registry if metrics_registry is not None else registry
+        self.samples: List[Tuple[str, str, int, float]] = []
+        self.iteration = 0
+        self.last_mark = time.perf_counter()
+
+    def observe(self, name: str, value: float, agent: str) -> None:
+        self.samples.append((name, agent, self.iteration, value))
+        self.registry.observe(name, value, agent)
+
+    def summary(self) -> Dict[str, Any]:
+        """Stats per agent and metric, plus per-iteration totals"""
+        by_agent: Dict[str, Dict[str, List[float]]] = {}
+        by_iteration: Dict[int, Dict[str, Dict[str, float]]] = {}
+        for name, agent, iteration, value in self.samples:
+            by_agent.setdefault(agent, {}).setdefault(name, []).append(value)
+            totals = by_iteration.setdefault(iteration, {}).setdefault(agent, {})
+            totals[name] = round(totals.get(name, 0.0) + value, 6)
+        return {
+            "by_agent": {
+                agent: {name: _stats(values) for name, values in metrics.items()}
+                for agent, metrics in by_agent.items()
+            },
+            "by_iteration": {str(iteration): agents for iteration, agents in sorted(by_iteration.items())}
+        }
+
+    def to_prometheus(self, prefix: str = "story_team_") -> str:
+        """This run's samples alone, in the Prometheus text format"""
+        run_registry = MetricsRegistry()
+        for name, agent, _, value in self.samples:
+            run_registry.observe(name, value, agent)
+        return run_registry.to_prometheus(prefix)
+
+
+current_metrics: ContextVar[Optional[RunMetrics]] = ContextVar("current_metrics", default=None)
+
+
+def observe(name: str, value: float, agent: str) -> None:
+    """Record a sample against the current run, if one is being measured"""
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.observe(name, value, agent)
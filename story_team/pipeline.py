@@ -0,0 +1,320 @@
+from typing import Dict, Any, Optional, List, Tuple
+from pathlib import Path
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from rich.console import Console
+from asset_generation.image_gen.ingest import iter_prompt_records
+from .callbacks import create_callback
+from .coordinator import EnhancedStoryTeamCoordinator
+from .llm_cache import LLMResponseCache
+
+# Marks the end of the image job queue for each image worker
+_DONE = None
+
+
+def shot_to_image_prompt(shot: Dict[str, Any], visual_style: str = "") -> Dict[str, Any]:
+    """Convert a MediaDirector shot into an ImageGenerator image prompt"""
+    parts = [shot.get("description", "")]
+    for key in ("camera_work", "lighting"):
+        if shot.get(key):
+            parts.append(shot[key])
+    if visual_style:
+        parts.append(f"Style: {visual_style}")
+
+    return {
+        "prompt_id": shot.get("shot_id", ""),
+        "description": ". ".join(part.strip().rstrip(".") for part in parts if part),
+        "metadata": {
+            key: shot.get(key)
+            for key in ("camera_work", "lighting", "duration", "ai_considerations")
+            if shot.get(key)
+        }
+    }
+
+
+def output_dirname(record_id: str) -> str:
+    """Directory name for a record id; ids that are not already safe get a hash suffix to stay unique"""
+    safe = re.sub(r"[^\w.-]", "_", record_id)[:80].strip(".")
+    if safe == record_id:
+        return safe
+    return f"{safe or 'run'}_{hashlib.sha1(record_id.encode('utf-8')).hexdigest()[:8]}"
+
+
+def media_direction_to_visual_outputs(media_direction: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Convert a media direction shot list into ImageGenerator.generate_from_scene inputs"""
+    visual_style = media_direction.get("visual_style", "")
+    visual_outputs = []
+    for scene in media_direction.get("shot_list", []):
+        if not isinstance(scene, dict) or not scene.get("scene_id"):
+            continue
+        visual_outputs.append({
+            "scene_id": scene["scene_id"],
+            "image_prompts": [
+                shot_to_image_prompt(shot, visual_style)
+                for shot in scene.get("shots", [])
+                if isinstance(shot, dict) and shot.get("description")
+            ]
+        })
+    return visual_outputs
+
+
+class ProductionPipeline:
+    """Runs story generation and image generation as overlapping stages.
+
+    Story workers run the refinement loop for each prompt and push one image
+    job per approved shot onto a bounded queue. Image workers pull jobs and
+    generate them on threads through the ImageGenerator, whose rate limiter
+    still applies. When the image stage falls behind, the full queue makes
+    story workers wait, so the image stage can never be outrun.
+
+    Scenes are queued as soon as the coordinator reports them final: with a
+    delta-mode coordinator that is after the first evaluation that leaves
+    them untagged, so their images are generated while the tagged scenes are
+    still being refined. A scene that is tagged again later is requeued and
+    its stale images are dropped. Otherwise, and always with ``min_score``
+    (which judges the whole concept), a concept's images are queued when its
+    run finishes, overlapping with the next concepts.
+    """
+
+    def __init__(
+        self,
+        coordinator: EnhancedStoryTeamCoordinator,
+        image_generator: Any,
+        story_concurrency: int = 2,
+        image_workers: int = 4,
+        queue_size: int = 16,
+        min_score: Optional[float] = None
+    ):
+        self.coordinator = coordinator
+        self.image_generator = image_generator
+        self.story_concurrency = max(1, story_concurrency)
+        self.image_workers = max(1, image_workers)
+        self.queue_size = max(1, queue_size)
+        self.min_score = min_score
+
+    def _is_approved(self, content: Dict[str, Any]) -> bool:
+        if self.min_score is None:
+            return True
+        scores = (content.get("evaluation") or {}).get("scores") or {}
+        return float(scores.get("overall_score", 0.0)) >= self.min_score
+
+    async def _queue_scenes(
+        self,
+        run_id: str,
+        media_direction: Dict[str, Any],
+        scene_ids: Optional[List[str]],
+        jobs: asyncio.Queue,
+        runs: Dict[str, Dict[str, Any]],
+        versions: Dict[Tuple[str, str], str]
+    ) -> None:
+        """Queue image jobs for the given scenes (all if None) unless already queued unchanged"""
+        run = runs[run_id]
+        output_dir = Path(self.image_generator.output_dir) / output_dirname(run_id)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for visual_output in media_direction_to_visual_outputs(media_direction):
+            scene_id = visual_output["scene_id"]
+            if scene_ids is not None and scene_id not in scene_ids:
+                continue
+            version = hashlib.sha1(
+                json.dumps(visual_output["image_prompts"], sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+            if versions.get((run_id, scene_id)) == version:
+                continue
+            # Images of an earlier version of the scene are superseded
+            versions[(run_id, scene_id)] = version
+            run["images"][scene_id] = []
+            for prompt_data in visual_output["image_prompts"]:
+                # Blocks while the image stage is saturated
+                await jobs.put((run_id, scene_id, version, prompt_data, output_dir))
+                run["jobs"] += 1
+
+    async def _story_worker(
+        self,
+        prompts: asyncio.Queue,
+        jobs: asyncio.Queue,
+        runs: Dict[str, Dict[str, Any]],
+        versions: Dict[Tuple[str, str], str]
+    ) -> None:
+        while True:
+            try:
+                record = prompts.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            run = runs[record["id"]]
+
+            async def on_scenes_final(media_direction: Dict[str, Any], scene_ids: List[str]) -> None:
+                await self._queue_scenes(record["id"], media_direction, scene_ids, jobs, runs, versions)
+
+            start = time.perf_counter()
+            try:
+                content = await self.coordinator.generate_content(
+                    record["prompt"],
+                    # min_score approves the concept as a whole, so nothing is queued before the end
+                    on_scenes_final=on_scenes_final if self.min_score is None else None
+                )
+            except Exception as e:
+                run["error"] = str(e)
+                continue
+            run["content"] = content
+            run["story_seconds"] = round(time.perf_counter() - start, 3)
+
+            if not self._is_approved(content):
+                run["error"] = "Final score below min_score; no images generated"
+                continue
+            await self._queue_scenes(
+                record["id"], content.get("media_direction") or {}, None, jobs, runs, versions
+            )
+
+    async def _image_worker(
+        self,
+        jobs: asyncio.Queue,
+        runs: Dict[str, Dict[str, Any]],
+        versions: Dict[Tuple[str, str], str]
+    ) -> None:
+        while True:
+            job = await jobs.get()
+            try:
+                if job is _DONE:
+                    return
+                run_id, scene_id, version, prompt_data, output_dir = job
+                run = runs[run_id]
+                try:
+                    filepath = await asyncio.to_thread(
+                        self.image_generator.generate_scene_prompt, scene_id, prompt_data, output_dir
+                    )
+                except Exception as e:
+                    logging.error(f"Image {prompt_data.get('prompt_id')} of {run_id}/{scene_id} failed: {str(e)}")
+                    run["image_errors"].append(
+                        {"scene_id": scene_id, "prompt_id": prompt_data.get("prompt_id"), "error": str(e)}
+                    )
+                    filepath = None
+                if versions.get((run_id, scene_id)) != version:
+                    # The scene was revised after this job was queued
+                    continue
+                if filepath:
+                    run["images"][scene_id].append(filepath)
+                else:
+                    run["failed_jobs"] += 1
+            finally:
+                jobs.task_done()
+
+    async def run(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Produce stories and storyboards for prompt records ({"id", "prompt"})"""
+        prompts: asyncio.Queue = asyncio.Queue()
+        jobs: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        runs: Dict[str, Dict[str, Any]] = {}
+        # Hash of the image prompts last queued for each (run, scene)
+        versions: Dict[Tuple[str, str], str] = {}
+        results = []
+        for record in records:
+            if record["id"] in runs:
+                # Output directories and results are keyed by id, so a repeat would overwrite the first
+                results.append({
+                    "id": record["id"],
+                    "prompt": record.get("prompt"),
+                    "error": "Duplicate id; an earlier record already uses it"
+                })
+                continue
+            run = runs[record["id"]] = {
+                "id": record["id"],
+                "prompt": record.get("prompt"),
+                "images": {},
+                "jobs": 0,
+                "failed_jobs": 0,
+                "image_errors": []
+            }
+            results.append(run)
+            if "error" in record:
+                run["error"] = record["error"]
+            else:
+                prompts.put_nowait(record)
+
+        start = time.perf_counter()
+        image_tasks = [
+            asyncio.create_task(self._image_worker(jobs, runs, versions))
+            for _ in range(self.image_workers)
+        ]
+        await asyncio.gather(*(
+            self._story_worker(prompts, jobs, runs, versions)
+            for _ in range(self.story_concurrency)
+        ))
+        for _ in image_tasks:
+            await jobs.put(_DONE)
+        await asyncio.gather(*image_tasks)
+        
+        # Contact sheets need every image of a scene, so they are queued last
+        postprocessor = getattr(self.image_generator, "postprocessor", None)
+        if postprocessor:
+            for run in runs.values():
+                for scene_id, files in run["images"].items():
+                    postprocessor.submit_contact_sheet(f"{output_dirname(run['id'])}_{scene_id}", files)
+
+        elapsed = round(time.perf_counter() - start, 3)
+        for run in runs.values():
+            run["pipeline_seconds"] = elapsed
+        return results
+
+
+async def main():
+    # Imported here so the story team does not depend on the image stack unless this runs
+    from asset_generation.image_gen.image_generator import FALLBACK_MODEL, PRIMARY_MODEL, ImageGenerator
+    from asset_generation.image_gen.router import ModelRouter
+
+    parser = argparse.ArgumentParser(description="Produce storyboards from a file of prompts")
+    parser.add_argument("prompts", help="Input JSONL, CSV or text file, read like image job prompts")
+    parser.add_argument("output", help="Output JSONL with one production result per prompt")
+    parser.add_argument("--output-dir", default="generated_images")
+    parser.add_argument("--story-concurrency", type=int, default=2)
+    parser.add_argument("--delta", action="store_true",
+                        help="Revise only tagged scenes, and generate images of the others while that runs")
+    parser.add_argument("--image-workers", type=int, default=4)
+    parser.add_argument("--requests-per-second", type=float, default=None)
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--min-score", type=float, default=None)
+    parser.add_argument("--p95-threshold", type=float, default=60.0,
+                        help="Shift traffic to the fallback model above this p95 latency in seconds")
+    parser.add_argument("--error-rate-threshold", type=float, default=0.5,
+                        help="Shift traffic to the fallback model above this error rate")
+    args = parser.parse_args()
+
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_cache=LLMResponseCache.from_env(),
+        callback=create_callback("quiet"),
+        delta_mode=args.delta
+    )
+    generator = ImageGenerator(
+        output_dir=args.output_dir,
+        max_concurrency=args.image_workers,
+        requests_per_second=args.requests_per_second,
+        router=ModelRouter(
+            [PRIMARY_MODEL, FALLBACK_MODEL],
+            p95_threshold=args.p95_threshold,
+            error_rate_threshold=args.error_rate_threshold
+        )
+    )
+    pipeline = ProductionPipeline(
+        coordinator,
+        generator,
+        story_concurrency=args.story_concurrency,
+        image_workers=args.image_workers,
+        queue_size=args.queue_size,
+        min_score=args.min_score
+    )
+
+    results = await pipeline.run(list(iter_prompt_records(args.prompts)))
+    with open(args.output, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    images = sum(len(files) for result in results for files in result["images"].values())
+    Console().print(f"[bold green]Production complete:[/bold green] {images} images for {len(results)} prompts")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,178 @@
+from typing import Dict, Any, Optional, List
+from .usage import RunUsage, MODEL_PRICES
+
+
+def _overall_score(state: Dict[str, Any]) -> float:
+    evaluation_result = state.get("evaluation_result") or {}
+    if isinstance(evaluation_result, dict):
+        scores = evaluation_result.get("scores", {})
+        if isinstance(scores, dict):
+            try:
+                return float(scores.get("overall_score", 0.0) or 0.0)
+            except (TypeError, ValueError):
+                return 0.0
+    return 0.0
+
+
+class StoppingRule:
+    """One reason to stop the refinement loop.
+
+    ``check`` runs after every evaluation with the updated workflow state
+    (``iteration`` already counts the finished iteration and
+    ``previous_scores`` includes its score) and the run's usage, if tracked.
+    It returns a human-readable stop reason, or None to keep going.
+    """
+
+    def check(self, state: Dict[str, Any], usage: Optional[RunUsage]) -> Optional[str]:
+        raise NotImplementedError
+
+
+class ScoreThreshold(StoppingRule):
+    """Stop once the overall score reaches the target"""
+
+    def __init__(self, threshold: float = 8.0):
+        self.threshold = threshold
+
+    def check(self, state: Dict[str, Any], usage: Optional[RunUsage]) -> Optional[str]:
+        score = _overall_score(state)
+        if score >= self.threshold:
+            return f"score_threshold: {score:.1f} >= {self.threshold:.1f}"
+        return None
+
+
+class MaxIterations(StoppingRule):
+    """Hard cap on the number of iterations"""
+
+    def __init__(self, max_iterations: int = 5):
+        self.max_iterations = max_iterations
+
+    def check(self, state: Dict[str, Any], usage: Optional[RunUsage]) -> Optional[str]:
+        if state.get("iteration", 0) >= self.max_iterations:
+            return f"max_iterations: {self.max_iterations}"
+        return None
+
+
+class MinGain(StoppingRule):
+    """Stop when the latest iteration improved the score by less than ``min_gain``"""
+
+    def __init__(self, min_gain: float = 0.0, min_iteration: int = 3):
+        self.min_gain = min_gain
+        self.min_iteration = min_iteration
+
+    def check(self, state: Dict[str, Any], usage: Optional[RunUsage]) -> Optional[str]:
+        scores = state.get("previous_scores") or []
+        if state.get("iteration", 0) < self.min_iteration or len(scores) < 2:
+            return None
+        gain = scores[-1] - scores[-2]
+        if gain <= self.min_gain:
+            return f"min_gain: last gain {gain:+.2f} <= {self.min_gain:.2f}"
+        return None
+
+
+class Plateau(StoppingRule):
+    """Stop when the best score of the last ``window`` iterations beats the earlier best by less than ``min_gain``"""
+
+    def __init__(self, window: int = 2, min_gain: float = 0.1):
+        self.window = max(1, window)
+        self.min_gain = min_gain
+
+    def check(self, state: Dict[str, Any], usage: Optional[RunUsage]) -> Optional[str]:
+        scores = state.get("previous_scores") or []
+        if len(scores) <= self.window:
+            return None
+        best_before = max(scores[:-self.window])
+        best_recent = max(scores[-self.window:])
+        if best_recent - best_before < self.min_gain:
+            return (
+                f"plateau: best of last {self.window} iterations {best_recent:.1f} "
+                f"vs {best_before:.1f} before"
+            )
+        return None
+
+
+class _BudgetRule(StoppingRule):
+    """Stops when a budget is spent or, with ``project``, when one more iteration would exceed it"""
+
+    name = "budget"
+
+    def __init__(self, limit: float, project: bool = True):
+        self.limit = limit
+        self.project = project
+
+    def used(self, usage: RunUsage) -> float:
+        raise NotImplementedError
+
+    def check(self, state: Dict[str, Any], usage: Optional[RunUsage]) -> Optional[str]:
+        if usage is None:
+            return None
+        used = self.used(usage)
+        if used >= self.limit:
+            return f"{self.name}: used {used:.4g} of {self.limit:.4g}"
+        iterations = state.get("iteration", 0)
+        if self.project and iterations:
+            projected = used + used / iterations
+            if projected > self.limit:
+                return f"{self.name}: next iteration would reach {projected:.4g} of {self.limit:.4g}"
+        return None
+
+
+class WallClockBudget(_BudgetRule):
+    name = "wall_clock_seconds"
+
+    def used(self, usage: RunUsage) -> float:
+        return usage.elapsed_seconds
+
+
+class TokenBudget(_BudgetRule):
+    """Caps prompt, completion or total tokens (``kind`` is prompt, completion or total)"""
+
+    def __init__(self, limit: int, kind: str = "total", project: bool = True):
+        if kind not in ("prompt", "completion", "total"):
+            raise ValueError(f"Unknown token kind '{kind}', expected prompt, completion or total")
+        super().__init__(limit, project)
+        self.kind = kind
+        self.name = f"{kind}_tokens"
+
+    def used(self, usage: RunUsage) -> float:
+        if self.kind == "prompt":
+            return usage.prompt_tokens
+        if self.kind == "completion":
+            return usage.completion_tokens
+        return usage.total_tokens
+
+
+class CostBudget(_BudgetRule):
+    name = "estimated_cost_usd"
+
+    def __init__(self, limit: float, project: bool = True, prices: Optional[Dict[str, tuple]] = None):
+        super().__init__(limit, project)
+        self.prices = prices or MODEL_PRICES
+
+    def used(self, usage: RunUsage) -> float:
+        return usage.estimated_cost(self.prices)
+
+
+class StoppingPolicy:
+    """Ordered set of stopping rules; the first rule that fires ends the run.
+
+    No rule is consulted before ``min_iterations`` iterations have finished.
+    """
+
+    def __init__(self, rules: List[StoppingRule], min_iterations: int = 1):
+        self.rules = list(rules)
+        self.min_iterations = min_iterations
+
+    @classmethod
+    def default(cls) -> "StoppingPolicy":
+        """The original loop rules: stop at 8.0, when no longer improving from iteration 3, or at 5"""
+        return cls([ScoreThreshold(8.0), MinGain(0.0, min_iteration=3), MaxIterations(5)])
+
+    def check(self, state: Dict[str, Any], usage: Optional[RunUsage] = None) -> Optional[str]:
+        """Return the reason to stop, or None to run another iteration"""
+        if state.get("iteration", 0) < self.min_iterations:
+            return None
+        for rule in self.rules:
+            reason = rule.check(state, usage)
+            if reason:
+                return reason
+        return None
@@ -3,11 +3,18 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.json import JSON
 from .coordinator import EnhancedStoryTeamCoordinator
+from .llm_cache import LLMResponseCache
+from .checkpoint import CheckpointStore
 import json
 
 async def main():
     console = Console()
-    coordinator = EnhancedStoryTeamCoordinator()
+    # Set LLM_CACHE_PATH (and optionally LLM_CACHE_MODE/LLM_CACHE_TTL) to reuse responses
+    # Set STORY_CHECKPOINT_PATH to checkpoint runs; resume with python -m story_team.checkpoint resume
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_cache=LLMResponseCache.from_env(),
+        checkpoint_store=CheckpointStore.from_env()
+    )
     
     prompt = """Create a short story about a robot discovering emotions for the first time.
     The story should be visually interesting and suitable for a 1-minute video."""
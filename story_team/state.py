@@ -1,5 +1,6 @@
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Union, TypedDict, Annotated
 from pydantic import BaseModel, Field
+import operator
 
 class StoryContent(BaseModel):
     """Story content structure"""
@@ -32,4 +33,36 @@ class CreativeState(BaseModel):
     media_direction: Optional[Dict[str, Any]] = None
     evaluation_result: Optional[Dict[str, Any]] = None
     previous_feedback: List[Dict[str, Any]] = Field(default_factory=list)
-    previous_scores: List[float] = Field(default_factory=list) 
\ No newline at end of file
+    previous_scores: List[float] = Field(default_factory=list)
+    stop_reason: Optional[str] = None
+    target_scenes: List[str] = Field(default_factory=list)
+    run_id: Optional[str] = None
+
+class WorkflowState(TypedDict, total=False):
+    """Graph state for the LangGraph workflow.
+
+    Nodes return only the fields they change. Feedback and score history are
+    append-only channels, so each update is merged instead of copied.
+    """
+    iteration: int
+    memory: Dict[str, Any]
+    story_content: Optional[Dict[str, Any]]
+    media_direction: Optional[Dict[str, Any]]
+    evaluation_result: Optional[Dict[str, Any]]
+    previous_feedback: Annotated[List[Dict[str, Any]], operator.add]
+    previous_scores: Annotated[List[float], operator.add]
+    stop_reason: Optional[str]
+    target_scenes: List[str]
+    run_id: Optional[str]
+    resume_node: Optional[str]
+
+
+def merge_update(state: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a node's partial update the way the graph does, appending history"""
+    merged = dict(state)
+    for key, value in update.items():
+        if key in ("previous_feedback", "previous_scores"):
+            merged[key] = list(state.get(key) or []) + list(value)
+        else:
+            merged[key] = value
+    return merged
@@ -0,0 +1,96 @@
+from typing import Any, Iterable, List, Optional, Tuple
+import json
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "start", "expect_key", "key")
+
+    def __init__(self, kind: str, path: Tuple[str, ...], start: int):
+        self.kind = kind
+        self.path = path
+        self.start = start
+        self.expect_key = kind == "obj"
+        self.key: Optional[str] = None
+
+
+class IncrementalJSONParser:
+    """Parses a JSON document as it streams in and emits completed array items.
+
+    ``paths`` names the arrays to watch by their member keys from the root,
+    e.g. ``("scenes",)`` or ``("shot_list", "shots")``. Every object that
+    closes inside one of those arrays is decoded and returned by ``feed`` as
+    soon as its closing brace arrives. Text before the first ``{`` or ``[``,
+    such as a markdown fence or a sentence of prose, is skipped.
+    """
+
+    def __init__(self, paths: Iterable[Tuple[str, ...]]):
+        self.paths = {tuple(path) for path in paths}
+        self.buffer = ""
+        self.done = False
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    def _on_string_end(self, end: int) -> None:
+        frame = self._stack[-1]
+        if frame.kind == "obj" and frame.expect_key:
+            frame.key = json.loads(self.buffer[self._string_start:end + 1])
+            frame.expect_key = False
+
+    def _open(self, kind: str, start: int) -> None:
+        path: Tuple[str, ...] = ()
+        if self._stack:
+            parent = self._stack[-1]
+            path = parent.path
+            if parent.kind == "obj" and parent.key is not None:
+                path = path + (parent.key,)
+        self._stack.append(_Frame(kind, path, start))
+
+    def _close(self, end: int, items: List[Tuple[str, Any]]) -> None:
+        frame = self._stack.pop()
+        if not self._stack:
+            self.done = True
+            return
+        parent = self._stack[-1]
+        if frame.kind == "obj" and parent.kind == "arr" and parent.path in self.paths:
+            try:
+                items.append(("/".join(parent.path), json.loads(self.buffer[frame.start:end + 1])))
+            except ValueError:
+                pass
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Add streamed text and return (path, item) pairs completed by it"""
+        self.buffer += text
+        items: List[Tuple[str, Any]] = []
+        buffer = self.buffer
+        i = self._pos
+
+        while i < len(buffer) and not self.done:
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string_end(i)
+            elif not self._stack:
+                if ch in "{[":
+                    self._open("obj" if ch == "{" else "arr", i)
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._open("obj" if ch == "{" else "arr", i)
+            elif ch in "}]":
+                self._close(i, items)
+            elif ch == "," and self._stack[-1].kind == "obj":
+                self._stack[-1].expect_key = True
+                self._stack[-1].key = None
+            i += 1
+
+        self._pos = i
+        return items
@@ -0,0 +1,106 @@
+from typing import Dict, Any, Optional
+from contextvars import ContextVar
+import time
+
+# Approximate USD prices per 1K tokens as (prompt, completion)
+MODEL_PRICES: Dict[str, tuple] = {
+    "gpt-3.5-turbo-0125": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "simulated": (0.0, 0.0),
+}
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int, prices: Optional[Dict[str, tuple]] = None) -> float:
+    """Estimated USD cost of one call; unknown models are priced as gpt-3.5-turbo"""
+    prices = prices or MODEL_PRICES
+    prompt_price, completion_price = prices.get(model, prices.get("gpt-3.5-turbo-0125", (0.0, 0.0)))
+    return prompt_tokens / 1000 * prompt_price + completion_tokens / 1000 * completion_price
+
+
+class RunUsage:
+    """Wall clock, token and cost accounting for one generate_content run.
+
+    The coordinator sets it as the current usage for the run; agents record
+    each LLM call into it through ``record_llm_call``. Because it lives in a
+    context variable, concurrent runs sharing the same agents stay separate.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.llm_calls = 0
+        self.cached_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.model_tokens: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int, cached: bool = False) -> None:
+        """Add one LLM call; cached responses cost nothing and are only counted"""
+        if cached:
+            self.cached_calls += 1
+            return
+        self.llm_calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        tokens = self.model_tokens.setdefault(model, {"prompt": 0, "completion": 0})
+        tokens["prompt"] += prompt_tokens
+        tokens["completion"] += completion_tokens
+
+    def estimated_cost(self, prices: Optional[Dict[str, tuple]] = None) -> float:
+        """Estimated spend in USD; unknown models are priced as gpt-3.5-turbo"""
+        return sum(
+            call_cost(model, tokens["prompt"], tokens["completion"], prices)
+            for model, tokens in self.model_tokens.items()
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything needed to continue accounting after a resume"""
+        return {
+            "elapsed_seconds": self.elapsed_seconds,
+            "llm_calls": self.llm_calls,
+            "cached_calls": self.cached_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "model_tokens": self.model_tokens,
+        }
+
+    @classmethod
+    def restore(cls, snapshot: Optional[Dict[str, Any]]) -> "RunUsage":
+        """Usage that carries on from a snapshot, so budgets span the resumed run"""
+        usage = cls()
+        if snapshot:
+            usage.started_at -= snapshot.get("elapsed_seconds", 0.0)
+            usage.llm_calls = snapshot.get("llm_calls", 0)
+            usage.cached_calls = snapshot.get("cached_calls", 0)
+            usage.prompt_tokens = snapshot.get("prompt_tokens", 0)
+            usage.completion_tokens = snapshot.get("completion_tokens", 0)
+            usage.model_tokens = {model: dict(tokens) for model, tokens in snapshot.get("model_tokens", {}).items()}
+        return usage
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "llm_calls": self.llm_calls,
+            "cached_calls": self.cached_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_cost_usd": round(self.estimated_cost(), 6),
+        }
+
+
+current_usage: ContextVar[Optional[RunUsage]] = ContextVar("current_usage", default=None)
+
+
+def record_llm_call(model: str, prompt_tokens: int, completion_tokens: int, cached: bool = False) -> None:
+    """Record an LLM call against the current run, if one is being tracked"""
+    usage = current_usage.get()
+    if usage is not None:
+        usage.record(model, prompt_tokens, completion_tokens, cached)
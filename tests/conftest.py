@@ -0,0 +1,51 @@
+import threading
+import time
+import pytest
+import requests
+from asset_generation.image_gen import image_generator
+
+
+class FakeResponse:
+    def __init__(self, content: bytes, status_code: int = 200, fail_after: int = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {"Content-Length": str(len(content))}
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), 2):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise requests.ConnectionError("connection reset")
+            yield self.content[start:start + 2]
+
+
+@pytest.fixture
+def fake_replicate(monkeypatch):
+    """Replace Replicate and HTTP calls with local fakes"""
+    calls = []
+    lock = threading.Lock()
+
+    def fake_run(model, input):
+        with lock:
+            calls.append((model, dict(input)))
+        # Later prompts finish first to exercise result ordering
+        time.sleep(0.01 * (5 - len(input["prompt"]) % 5))
+        return f"https://example.invalid/{input['prompt']}.png"
+
+    def fake_get(session, url, *args, **kwargs):
+        return FakeResponse(url.rsplit("/", 1)[-1].encode())
+
+    monkeypatch.setenv("REPLICATE_API_TOKEN", "test-token")
+    monkeypatch.setattr(image_generator.replicate, "run", fake_run)
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    return calls
@@ -0,0 +1,91 @@
+import pytest
+from story_team.callbacks import create_callback
+from story_team.checkpoint import CheckpointStore, COMPLETED, FAILED
+from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.llm_backend import SimulatedLLMBackend
+
+
+class CrashingBackend(SimulatedLLMBackend):
+    """Fails every call after the first ``crash_after`` calls"""
+
+    def __init__(self, crash_after, **kwargs):
+        super().__init__(**kwargs)
+        self.crash_after = crash_after
+        self.total_calls = 0
+
+    async def ainvoke(self, messages, **options):
+        self.total_calls += 1
+        if self.total_calls > self.crash_after:
+            raise RuntimeError("connection lost")
+        return await super().ainvoke(messages, **options)
+
+
+def _coordinator(backend, store):
+    return EnhancedStoryTeamCoordinator(
+        llm_backend=backend,
+        callback=create_callback("quiet"),
+        checkpoint_store=store
+    )
+
+
+@pytest.mark.asyncio
+async def test_resume_continues_from_last_completed_node(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    # Two full iterations plus the story analyst of the third, then a crash
+    crashing = CrashingBackend(crash_after=7, base_score=5.0, score_step=0.5, seed=0)
+    with pytest.raises(RuntimeError):
+        await _coordinator(crashing, store).generate_content("A robot discovers emotions", run_id="run-1")
+
+    [run] = store.list_runs()
+    assert run["run_id"] == "run-1"
+    assert run["status"] == FAILED
+    assert run["checkpoints"] == 7
+    assert run["next_node"] == "media_direction"
+
+    backend = SimulatedLLMBackend(base_score=5.0, score_step=0.5, seed=0)
+    result = await _coordinator(backend, store).resume("run-1")
+
+    assert result["run_id"] == "run-1"
+    assert result["iterations"] == 5
+    assert len(result["previous_scores"]) == 5
+    # Only the remaining work was redone: media direction of iteration 3 onwards
+    assert backend.calls == {"media_director": 3, "expert_evaluator": 3, "story_analyst": 2}
+    # Usage carries over from the interrupted run, so budgets cover both
+    assert result["usage"]["llm_calls"] == 7 + 8
+    assert store.list_runs()[0]["status"] == COMPLETED
+
+    # A completed run resumes to its stored result without any calls
+    again = await _coordinator(SimulatedLLMBackend(), store).resume("run-1")
+    assert again["previous_scores"] == result["previous_scores"]
+
+
+@pytest.mark.asyncio
+async def test_prune_removes_runs_and_history(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    coordinator = _coordinator(SimulatedLLMBackend(seed=0), store)
+    first = await coordinator.generate_content("First prompt")
+    await coordinator.generate_content("Second prompt")
+
+    assert store.prune(keep_latest=True) == 2
+    assert all(run["checkpoints"] == 1 for run in store.list_runs())
+    assert store.latest(first["run_id"])["next_node"] == "__end__"
+
+    assert store.prune(status=COMPLETED) == 2
+    assert store.list_runs() == []
+    with pytest.raises(ValueError):
+        await coordinator.resume(first["run_id"])
+
+
+@pytest.mark.asyncio
+async def test_resume_completes_run_that_died_before_finishing(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    coordinator = _coordinator(SimulatedLLMBackend(seed=0), store)
+    result = await coordinator.generate_content("A robot discovers emotions", run_id="run-1")
+    # As if the process died after the last checkpoint but before finish_run
+    store.start_run("run-1", "A robot discovers emotions")
+    assert store.list_runs(status=COMPLETED) == []
+
+    again = await coordinator.resume("run-1")
+
+    assert again["previous_scores"] == result["previous_scores"]
+    assert [run["run_id"] for run in store.list_runs(status=COMPLETED)] == ["run-1"]
@@ -0,0 +1,81 @@
+import json
+from story_team.callbacks import create_callback
+from story_team.context import ContextBuilder, count_tokens
+from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.llm_backend import SimulatedLLMBackend
+from story_team.state import CreativeState
+
+
+def _feedback(iteration, items):
+    return {"iteration": iteration, "recommendations": {"story_improvements": items}}
+
+
+def test_context_dedupes_and_summarizes_old_feedback():
+    state = CreativeState(
+        iteration=3,
+        story_content={"title": "Robot", "scenes": [{"scene_id": "scene_001"}]},
+        previous_feedback=[
+            _feedback(0, ["Tighten pacing", "Add a hook"]),
+            _feedback(1, ["tighten  pacing", "Show the robot's face"]),
+            _feedback(2, ["Tighten pacing", "Stronger ending"]),
+        ]
+    )
+
+    context, usage = ContextBuilder(token_budget=1000).build(state, "media_director")
+
+    assert context.count("ighten") == 1
+    assert "Recommendations (iteration 2):" in context
+    assert "Earlier Feedback Summary (iterations 0-1" in context
+    assert "Add a hook" in context and "Show the robot's face" in context
+    assert '{"title":"Robot"' in context
+    assert set(usage) >= {"iteration", "story_content", "recent_feedback", "feedback_summary", "total"}
+
+
+def test_context_respects_token_budget():
+    state = CreativeState(
+        iteration=1,
+        story_content={"scenes": [{"scene_id": f"scene_{i:03d}", "description": "x " * 50} for i in range(50)]},
+        media_direction={"shot_list": []},
+    )
+
+    context, usage = ContextBuilder(token_budget=200).build(state, "expert_evaluator")
+
+    assert usage["total"] <= 200
+    assert count_tokens(context) <= 210
+    # Whole scenes are left out rather than the JSON being cut mid-document
+    story = context.split("Current Story Content:\n")[1].split("\n(")[0]
+    kept = json.loads(story)["scenes"]
+    assert 0 < len(kept) < 50
+    assert f"{50 - len(kept)} scenes omitted to fit the context budget: scene_{len(kept):03d}" in context
+
+
+def test_context_is_unbounded_by_default():
+    state = CreativeState(
+        iteration=1,
+        story_content={"scenes": [{"scene_id": f"scene_{i:03d}", "description": "x " * 50} for i in range(50)]},
+    )
+
+    context, usage = ContextBuilder().build(state, "media_director")
+
+    assert "omitted" not in context and "budget" not in usage
+    assert context.count('"scene_id"') == 50
+
+
+def test_coordinator_passes_budgets_to_each_agent():
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_backend=SimulatedLLMBackend(),
+        callback=create_callback("quiet"),
+        context_token_budgets={"media_director": 200}
+    )
+    state = CreativeState(
+        iteration=1,
+        story_content={"scenes": [{"scene_id": f"scene_{i:03d}", "description": "x " * 50} for i in range(50)]},
+        media_direction={"shot_list": []},
+    )
+
+    coordinator.media_director._build_context(state)
+    coordinator.expert_evaluator._build_context(state)
+
+    assert coordinator.media_director.last_context_usage["budget"] == 200
+    assert coordinator.media_director.last_context_usage["total"] <= 200
+    assert "budget" not in coordinator.expert_evaluator.last_context_usage
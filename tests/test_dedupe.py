@@ -0,0 +1,59 @@
+import random
+from asset_generation.image_gen.dedupe import PromptDeduper, normalize_prompt
+
+PREFIX = "IMG_1018.CR2 "
+SUFFIX = " Soft, eerie lighting, cinematic 35mm film, high detail."
+
+
+def test_normalize_ignores_case_punctuation_and_quotes():
+    assert normalize_prompt("A Teenage Boy’s fist, CLENCHED!") == ["a", "teenage", "boys", "fist", "clenched"]
+    assert normalize_prompt("boy's") == normalize_prompt("boy’s")
+
+
+def test_collapses_near_duplicates_onto_first_prompt():
+    prompts = [
+        PREFIX + "A dark hallway with faint light spilling out from a partially open door at the end of it." + SUFFIX,
+        PREFIX + "A dark hallway with faint light spilling out from a partially open door at the end of it!" + SUFFIX,
+        PREFIX + "A close-up of a window at night with faint reflections of indistinct shapes outside." + SUFFIX,
+        PREFIX + "A dark hallway with faint light spilling out from a partly open door at the end of it." + SUFFIX,
+    ]
+
+    result = PromptDeduper(threshold=0.8).dedupe(prompts)
+
+    assert result["unique"] == [0, 2]
+    assert result["canonical"] == [0, 0, 2, 0]
+    assert [entry["index"] for entry in result["report"]] == [1, 3]
+    assert result["report"][1]["similarity"] < 1.0
+
+    flagged = PromptDeduper(threshold=0.8, mode="flag").dedupe(prompts)
+    assert flagged["unique"] == [0, 1, 2, 3]
+    assert len(flagged["report"]) == 2
+
+
+def test_dedupe_scales_to_large_lists():
+    words = "shadow dark room light house fog tree night hallway door window boy quiet eerie lamp bed".split()
+    rng = random.Random(0)
+    prompts = [PREFIX + " ".join(rng.choice(words) for _ in range(20)) + SUFFIX for _ in range(5000)]
+
+    deduper = PromptDeduper()
+    result = deduper.dedupe(prompts + prompts[:100])
+
+    assert len(result["unique"]) == 5000
+    assert result["canonical"][5000:] == list(range(100))
+    # LSH keeps exact checks near one per prompt instead of ~12.7M all-pairs comparisons
+    assert deduper.comparisons <= 2 * 5100
+
+
+def test_window_bounds_memory_of_streamed_prompts():
+    deduper = PromptDeduper(threshold=0.8, max_representatives=2)
+    prompts = [f"{word} lamp glowing in an empty room at night" for word in ("red", "blue", "green")]
+
+    for i, prompt in enumerate(prompts):
+        assert deduper.add(prompt, label=f"id{i}")[1] is None
+    assert deduper.add(prompts[2])[1] == 2
+    assert deduper.label(2) == "id2"
+
+    # The first prompt was forgotten, so a repeat of it is new again
+    assert deduper.add(prompts[0])[1] is None
+    assert len(deduper._shingles) == 2
+    assert sum(len(bucket) for bucket in deduper._buckets[0].values()) == 2
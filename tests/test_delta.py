@@ -0,0 +1,61 @@
+import pytest
+from story_team.callbacks import create_callback
+from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.delta import merge_scenes, target_scenes
+from story_team.llm_backend import SimulatedLLMBackend
+
+
+def test_merge_keeps_order_and_scene_ids():
+    existing = [{"scene_id": f"scene_00{i}", "v": 0} for i in range(1, 4)]
+    updated = [
+        {"v": 1},  # no scene_id: matched to the first target
+        {"scene_id": "scene_001", "v": 1},  # not targeted
+    ]
+
+    merged = merge_scenes(existing, updated, ["scene_002", "scene_003"])
+
+    assert [s["scene_id"] for s in merged] == ["scene_001", "scene_002", "scene_003"]
+    assert [s["v"] for s in merged] == [0, 1, 0]
+
+
+def test_target_scenes_ignores_unknown_ids():
+    evaluation = {"scene_recommendations": {"scene_009": ["x"], "scene_002": ["y"], "scene_001": []}}
+    assert target_scenes(evaluation, ["scene_001", "scene_002"]) == ["scene_002"]
+    assert target_scenes({"recommendations": {}}, ["scene_001"]) == []
+
+
+async def _run(delta_mode):
+    backend = SimulatedLLMBackend(num_scenes=10, base_score=5.0, score_step=0.5, seed=0)
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_backend=backend,
+        callback=create_callback("quiet"),
+        delta_mode=delta_mode
+    )
+    calls = []
+    original = coordinator.story_analyst._record_usage
+
+    def record(messages, content, usage_metadata=None, cached=False):
+        calls.append(usage_metadata["output_tokens"])
+        original(messages, content, usage_metadata, cached)
+
+    coordinator.story_analyst._record_usage = record
+    result = await coordinator.generate_content("A robot discovers emotions")
+    return result, calls
+
+
+@pytest.mark.asyncio
+async def test_delta_mode_regenerates_only_tagged_scenes():
+    full, full_story_tokens = await _run(delta_mode=False)
+    delta, delta_story_tokens = await _run(delta_mode=True)
+
+    assert delta["iterations"] == full["iterations"] == 5
+    scenes = delta["story"]["scenes"]
+    assert [s["scene_id"] for s in scenes] == [f"scene_{i:03d}" for i in range(1, 11)]
+    # Scene 1 was tagged after iteration 1 and revised in iteration 2, scene 5 never
+    assert scenes[1]["description"].endswith("(v2)")
+    assert scenes[4]["description"].endswith("(v0)")
+    assert delta["story"]["title"] == "Simulated Story v0"
+    assert len(delta["media_direction"]["shot_list"]) == 10
+    # Later story revisions cost a fraction of the first full generation
+    assert all(tokens < delta_story_tokens[0] / 4 for tokens in delta_story_tokens[1:])
+    assert delta["usage"]["completion_tokens"] < full["usage"]["completion_tokens"] / 2
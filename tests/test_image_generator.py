@@ -0,0 +1,189 @@
+import time
+import pytest
+from asset_generation.image_gen import image_generator
+from asset_generation.image_gen.image_generator import ImageGenerator
+from asset_generation.image_gen.cache import GenerationCache
+from asset_generation.image_gen.dedupe import PromptDeduper
+from asset_generation.image_gen.downloads import download_to_file
+from asset_generation.image_gen.rate_limiter import TokenBucket
+from asset_generation.image_gen.router import ModelRouter
+from tests.conftest import FakeResponse
+
+
+def test_batch_generate_keeps_prompt_order(tmp_path, fake_replicate):
+    generator = ImageGenerator(output_dir=str(tmp_path), max_concurrency=4)
+    prompts = ["[", "a", "bb", "", "ccc", "dddd", "]"]
+
+    files = generator.batch_generate(prompts)
+
+    assert len(files) == 4
+    assert [open(f, "rb").read() for f in files] == [b"a.png", b"bb.png", b"ccc.png", b"dddd.png"]
+    assert len(fake_replicate) == 4
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+    assert not bucket.try_acquire()
+
+
+def test_cache_serves_repeated_requests(tmp_path, fake_replicate):
+    generator = ImageGenerator(
+        output_dir=str(tmp_path / "out"),
+        seed=42,
+        cache_dir=str(tmp_path / "cache")
+    )
+
+    first = generator.generate_single_image("a")
+    second = generator.generate_single_image("a")
+
+    assert first == second == b"a.png"
+    assert len(fake_replicate) == 1
+    assert generator.cache.stats()["hits"] == 1
+    assert generator.cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = GenerationCache(str(tmp_path), max_bytes=10)
+    cache.put("m", {"prompt": "a"}, b"1234")
+    cache.put("m", {"prompt": "b"}, b"5678")
+    assert cache.get("m", {"prompt": "a"}) == b"1234"
+
+    cache.put("m", {"prompt": "c"}, b"9012")
+
+    assert cache.get("m", {"prompt": "b"}) is None
+    assert cache.get("m", {"prompt": "a"}) == b"1234"
+    assert cache.stats()["evictions"] == 1
+    assert GenerationCache(str(tmp_path), max_bytes=10).stats()["entries"] == 2
+
+
+def test_download_resumes_partial_transfer(tmp_path):
+    requests_seen = []
+
+    class FlakySession:
+        def get(self, url, stream, timeout, headers):
+            requests_seen.append(headers.get("Range"))
+            if len(requests_seen) == 1:
+                return FakeResponse(b"0123456789", fail_after=4)
+            return FakeResponse(b"456789", status_code=206)
+
+    target = tmp_path / "image.png"
+    written = download_to_file(
+        "https://example.invalid/image.png", target, session=FlakySession(), retry_delay=0
+    )
+
+    assert written == 10
+    assert target.read_bytes() == b"0123456789"
+    assert requests_seen == [None, "bytes=4-"]
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_manifest_records_generated_images(tmp_path, fake_replicate):
+    generator = ImageGenerator(output_dir=str(tmp_path), seed=7)
+    first = generator.batch_generate(["a", "bb"])
+    second = generator.batch_generate(["a", "bb"])
+    generator.generate_scene_prompt("scene_1", {"prompt_id": "p1", "description": "ccc", "metadata": {"shot": "wide"}})
+
+    # Batches started in the same second get distinct files
+    assert len(set(first + second)) == 4
+
+    entries = generator.manifest.by_prompt("a")
+    assert [e["file_path"] for e in entries] == [first[0], second[0]]
+    assert entries[0]["model"] == image_generator.PRIMARY_MODEL
+    assert entries[0]["seed"] == 7
+    assert entries[0]["bytes"] == len(b"a.png")
+
+    reopened = image_generator.AssetManifest(tmp_path / "manifest.sqlite")
+    scene = reopened.latest("scene_1", "p1")
+    assert scene["prompt"] == "ccc"
+    assert scene["metadata"]["shot"] == "wide"
+    assert scene["latency_seconds"] is not None
+    assert reopened.stats()["assets"] == 5
+
+
+def test_router_opens_breaker_and_shifts_to_fallback(tmp_path, fake_replicate, monkeypatch):
+    fake_run = image_generator.replicate.run
+
+    def flaky_run(model, input):
+        if model == image_generator.PRIMARY_MODEL:
+            fake_replicate.append((model, dict(input)))
+            raise RuntimeError("upstream timeout")
+        return fake_run(model, input)
+
+    monkeypatch.setattr(image_generator.replicate, "run", flaky_run)
+    router = ModelRouter(
+        [image_generator.PRIMARY_MODEL, image_generator.FALLBACK_MODEL],
+        failure_threshold=2,
+        reset_timeout=60,
+        base_delay=0
+    )
+    generator = ImageGenerator(output_dir=str(tmp_path), router=router)
+
+    assert generator.generate_single_image("a") == b"a.png"
+    assert generator.generate_single_image("bb") == b"bb.png"
+
+    models = [model for model, _ in fake_replicate]
+    assert models == [image_generator.PRIMARY_MODEL] * 2 + [image_generator.FALLBACK_MODEL] * 2
+    assert router.snapshot()[image_generator.PRIMARY_MODEL]["state"] == "open"
+
+
+def test_model_specific_calls_report_to_router(tmp_path, fake_replicate):
+    router = ModelRouter([image_generator.PRIMARY_MODEL, image_generator.FALLBACK_MODEL])
+    generator = ImageGenerator(output_dir=str(tmp_path), router=router)
+
+    assert generator.generate_with_primary_model("a") == b"a.png"
+    assert generator.generate_with_fallback_model("bb") == b"bb.png"
+
+    primary_input = fake_replicate[0][1]
+    assert primary_input["output_quality"] == 95 and primary_input["safety_tolerance"] == 5
+    snapshot = router.snapshot()
+    assert snapshot[image_generator.PRIMARY_MODEL]["samples"] == 1
+    assert snapshot[image_generator.FALLBACK_MODEL]["samples"] == 1
+
+
+def test_router_prefers_fallback_when_primary_is_slow():
+    router = ModelRouter(["primary", "fallback"], p95_threshold=1.0, min_samples=3)
+    for _ in range(3):
+        router.record("primary", 5.0, True)
+    router.record("fallback", 0.5, True)
+
+    assert router.pick() == "fallback"
+    assert router.snapshot()["primary"]["healthy"] is False
+    assert 0 <= router.backoff(10) <= router.max_delay
+
+
+def test_batch_generate_skips_collapsed_prompts(tmp_path, fake_replicate):
+    generator = ImageGenerator(output_dir=str(tmp_path), deduper=PromptDeduper(threshold=0.8))
+    prompts = [
+        "a quiet suburban street at dusk with fog rolling in between the houses",
+        "a quiet suburban street at dusk with fog rolling in between the houses.",
+        "a lamp",
+    ]
+
+    files = generator.batch_generate(prompts)
+
+    assert len(fake_replicate) == 2
+    assert files[0] == files[1] != files[2]
+    assert generator.last_dedupe_report[0]["duplicate_of"] == 0
+
+
+def test_generate_stream_bounds_work_and_skips_bad_records(tmp_path, fake_replicate):
+    generator = ImageGenerator(output_dir=str(tmp_path), max_concurrency=2, deduper=PromptDeduper())
+    records = iter([
+        {"id": "1", "scene_id": "s1", "prompt": "a quiet street at dusk with fog between the houses", "params": {"seed": 9}},
+        {"id": "2", "line": 2, "error": "Record has no prompt"},
+        {"id": "3", "scene_id": "s1", "prompt": "a quiet street at dusk with fog between the houses!", "params": {}},
+        {"id": "4", "scene_id": None, "prompt": "bb", "params": {}},
+    ])
+
+    results = {r["id"]: r for r in generator.generate_stream(records, max_pending=2)}
+
+    assert results["2"]["error"] == "Record has no prompt"
+    assert results["3"]["duplicate_of"] == "1"
+    assert open(results["4"]["file"], "rb").read() == b"bb.png"
+    assert len(fake_replicate) == 2
+    assert {input["seed"] for _, input in fake_replicate} == {generator.seed, 9}
+    assert generator.manifest.latest("s1", "1")["seed"] == 9
@@ -0,0 +1,72 @@
+import json
+from asset_generation.image_gen.ingest import iter_prompt_records
+
+
+def test_text_reads_legacy_python_list_files(tmp_path):
+    path = tmp_path / "prompts.txt"
+    path.write_text(
+        'prompts = [\n'
+        '    "A hallway, dimly lit, with a door at the end.",\n'
+        '\n'
+        '    # a comment\n'
+        '    "An unterminated prompt,\n'
+        '    plain prompt without quotes\n'
+        ']\n',
+        encoding="utf-8"
+    )
+
+    records = list(iter_prompt_records(path))
+
+    assert [r.get("prompt") for r in records] == [
+        "A hallway, dimly lit, with a door at the end.", None, "plain prompt without quotes"
+    ]
+    assert records[1] == {"id": "line_5", "line": 5, "error": "Unterminated quoted prompt"}
+
+
+def test_jsonl_validates_records(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    lines = [
+        json.dumps({"id": "a", "scene_id": "scene_1", "prompt": "fog", "params": {"seed": 3}}),
+        json.dumps("bare string"),
+        "{not json",
+        json.dumps({"id": "b", "prompt": "  "}),
+        json.dumps({"id": "c", "prompt": "x", "params": [1]}),
+    ]
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+    records = list(iter_prompt_records(path))
+
+    assert records[0] == {"id": "a", "scene_id": "scene_1", "prompt": "fog", "params": {"seed": 3}}
+    assert records[1]["prompt"] == "bare string"
+    assert records[2]["error"].startswith("Invalid JSON")
+    assert [r["error"] for r in records[3:]] == ["Record has no prompt", "params must be an object"]
+
+
+def test_csv_handles_quoted_commas_and_multiline_prompts(tmp_path):
+    path = tmp_path / "prompts.csv"
+    path.write_text(
+        'id,scene_id,prompt,params\n'
+        's1_p1,scene_1,"A window at night, fogged up,\nsomething outside","{""seed"": 5}"\n'
+        's1_p2,scene_1,,\n'
+        's1_p3,scene_1,"too many",{},extra\n',
+        encoding="utf-8"
+    )
+
+    records = list(iter_prompt_records(path))
+
+    assert records[0]["prompt"] == "A window at night, fogged up, something outside"
+    assert records[0]["params"] == {"seed": 5}
+    assert records[1]["error"] == "Record has no prompt"
+    assert records[2]["error"] == "Row has more fields than the header"
+
+
+def test_reader_is_lazy(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(100000):
+            f.write(json.dumps({"prompt": f"prompt {i}"}) + "\n")
+
+    records = iter_prompt_records(path)
+
+    assert next(records)["id"] == "line_1"
+    assert next(records)["prompt"] == "prompt 1"
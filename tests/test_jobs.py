@@ -0,0 +1,137 @@
+import multiprocessing
+import time
+from asset_generation.image_gen.ingest import iter_prompt_records
+from asset_generation.image_gen.jobs import DONE, FAILED, JobQueue, job_filename, job_id, run_worker
+from asset_generation.image_gen import image_generator
+from asset_generation.image_gen.router import ModelRouter
+
+
+def _records(n):
+    return [{"id": f"p{i}", "scene_id": "s1", "prompt": f"prompt {i}", "params": {}} for i in range(n)]
+
+
+def _drain(path, worker_id, claimed):
+    queue = JobQueue(path)
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            return
+        if queue.complete(job["job_id"], worker_id, "done"):
+            claimed.put(job["job_id"])
+
+
+def test_enqueue_is_idempotent_and_leases_are_exclusive(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    assert queue.enqueue(_records(2)) == {"added": 2, "duplicates": 0}
+    assert queue.enqueue(_records(3)) == {"added": 1, "duplicates": 2}
+
+    first = queue.claim("w1")
+    second = queue.claim("w2")
+    assert first["job_id"] != second["job_id"]
+    assert queue.complete(first["job_id"], "w2", "x") is False
+    assert queue.complete(first["job_id"], "w1", "x") is True
+    assert queue.stats()["done"] == 1
+
+
+def test_expired_leases_are_retried_until_attempts_run_out(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    queue.enqueue(_records(1), max_attempts=2)
+
+    job = queue.claim("w1", lease_seconds=0.01)
+    time.sleep(0.02)
+    retried = queue.claim("w2", lease_seconds=0.01)
+    assert retried["job_id"] == job["job_id"]
+    assert retried["attempts"] == 2
+    assert queue.heartbeat(job["job_id"], "w1") is False
+
+    time.sleep(0.02)
+    assert queue.claim("w3") is None
+    assert queue.get(job["job_id"])["status"] == FAILED
+
+    assert queue.requeue_failed() == 1
+    again = queue.claim("w3")
+    assert queue.fail(again["job_id"], "w3", "boom", retry_delay=0)
+    assert queue.get(job["job_id"])["error"] == "boom"
+    assert queue.claim("w3")["attempts"] == 2
+
+
+def test_processes_drain_queue_without_double_claims(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    JobQueue(path).enqueue(_records(60))
+    context = multiprocessing.get_context("spawn")
+    claimed = context.Queue()
+    workers = [context.Process(target=_drain, args=(path, f"w{n}", claimed)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+
+    job_ids = [claimed.get(timeout=5) for _ in range(60)]
+    assert sorted(job_ids) == sorted(job_id(record) for record in _records(60))
+    assert JobQueue(path).stats()["done"] == 60
+
+
+def test_worker_generates_jobs_and_skips_finished_files(tmp_path, fake_replicate):
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path)
+    records = [{"id": "a", "prompt": "a"}, {"id": "b", "prompt": "bb", "params": {"seed": 4}}]
+    queue.enqueue(records)
+    # A worker that died after writing its file but before completing the job
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / job_filename(queue.get(job_id(records[0])))).write_bytes(b"old")
+
+    completed = run_worker(path, "w1", output_dir=str(tmp_path / "out"), exit_when_empty=True)
+
+    assert completed == 2
+    assert [input["prompt"] for _, input in fake_replicate] == ["bb"]
+    assert fake_replicate[0][1]["seed"] == 4
+    job = queue.get(job_id(records[1]))
+    assert job["status"] == DONE
+    assert open(job["result"], "rb").read() == b"bb.png"
+
+
+def test_worker_retries_failed_job_before_exiting(tmp_path, fake_replicate, monkeypatch):
+    fake_run = image_generator.replicate.run
+    calls = []
+
+    def flaky_run(model, input):
+        calls.append(model)
+        # Every in-process retry of the first job attempt fails
+        if len(calls) <= 3:
+            raise RuntimeError("upstream error")
+        return fake_run(model, input)
+
+    monkeypatch.setattr(image_generator.replicate, "run", flaky_run)
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path)
+    record = {"id": "a", "prompt": "a"}
+    queue.enqueue([record])
+
+    completed = run_worker(
+        path,
+        "w1",
+        output_dir=str(tmp_path / "out"),
+        poll_interval=0.05,
+        exit_when_empty=True,
+        retry_delay=0.1,
+        generator_options={"router": ModelRouter([image_generator.PRIMARY_MODEL], failure_threshold=10, base_delay=0)}
+    )
+
+    assert completed == 1
+    assert queue.get(job_id(record))["status"] == DONE
+    assert queue.get(job_id(record))["attempts"] == 2
+    assert queue.stats() == {"queued": 0, "leased": 0, "done": 1, "failed": 0}
+
+
+def test_files_with_the_same_line_ids_get_separate_jobs(tmp_path):
+    (tmp_path / "a.txt").write_text("a red door\na blue door\n")
+    (tmp_path / "b.txt").write_text("a green door\na blue door\n")
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+
+    assert queue.enqueue(iter_prompt_records(tmp_path / "a.txt")) == {"added": 2, "duplicates": 0}
+    # line_1 is a new prompt; line_2 repeats a.txt's blue door
+    assert queue.enqueue(iter_prompt_records(tmp_path / "b.txt")) == {"added": 1, "duplicates": 1}
+
+    jobs = [queue.claim("w1") for _ in range(3)]
+    assert sorted(job["prompt"] for job in jobs) == ["a blue door", "a green door", "a red door"]
+    assert len({job_filename(job) for job in jobs}) == 3
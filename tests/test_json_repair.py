@@ -0,0 +1,89 @@
+import json
+import pytest
+from story_team.agents import StoryAnalyst
+from story_team.llm_backend import SimulatedLLMBackend
+from story_team.state import CreativeState
+from utils.json_helpers import parse_json, parse_json_report, repair_json
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('Sure! ```json\n{"a": 1}\n``` Hope this helps.', {"a": 1}),
+    ('{"a": [1, 2,], // note\n "b": True, /* x */ "c": None,}', {"a": [1, 2], "b": True, "c": None}),
+    ('Here is the result:\n{"a": {"b": "text", "c": "cut of', {"a": {"b": "text", "c": "cut of"}}),
+    ('{"a": 1, "b": [{"c": 2}, {"d": 7.', {"a": 1, "b": [{"c": 2}]}),
+    ('```json\n{"a": "has ``` inside"}\n```', {"a": "has ``` inside"}),
+    ('{"a": 1} and then more prose {', {"a": 1}),
+    ('{"a": "use ```code``` here", "b": 1}', {"a": "use ```code``` here", "b": 1}),
+    ('Result: {"a": "see ```x```", "b": [1, 2,]}', {"a": "see ```x```", "b": [1, 2]}),
+])
+def test_parse_json_repairs_common_defects(raw, expected):
+    assert parse_json(raw) == expected
+
+
+def test_truncation_is_reported():
+    assert parse_json_report('{"a": 1, "b": [{"c": 2}, {"d": 7.') == ({"a": 1, "b": [{"c": 2}]}, True)
+    assert parse_json_report('{"a": [1, 2,],}') == ({"a": [1, 2]}, False)
+
+
+def test_unrecoverable_text_raises():
+    with pytest.raises(json.JSONDecodeError):
+        parse_json("I could not produce a story.")
+    assert repair_json("no json") == "no json"
+
+
+class ScriptedBackend(SimulatedLLMBackend):
+    """Returns the scripted responses first, then normal simulated output"""
+
+    def __init__(self, responses):
+        super().__init__(seed=0)
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def ainvoke(self, messages, **options):
+        self.prompts.append(messages[-1].content)
+        if self.responses:
+            return _Message(self.responses.pop(0))
+        return await super().ainvoke(messages, **options)
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+@pytest.mark.asyncio
+async def test_invalid_response_costs_one_repair_call():
+    backend = ScriptedBackend(['{"title": "Only a title"}'])
+    agent = StoryAnalyst(llm=backend)
+
+    result = await agent.process(CreativeState(memory={"original_prompt": "robots"}))
+
+    assert result["title"].startswith("Simulated Story")
+    assert agent.repair_attempts == 1
+    assert len(backend.prompts) == 2
+    assert "Your previous response could not be used" in backend.prompts[1]
+    assert "Original Prompt" not in backend.prompts[1]
+
+
+@pytest.mark.asyncio
+async def test_unusable_response_keeps_previous_output():
+    backend = ScriptedBackend(["no json", "still no json"])
+    agent = StoryAnalyst(llm=backend, max_repair_retries=1)
+    previous = {"title": "Earlier", "synopsis": "", "target_audience": "", "estimated_duration": "", "scenes": []}
+
+    result = await agent.process(CreativeState(iteration=1, story_content=previous))
+
+    assert result == previous
+
+
+@pytest.mark.asyncio
+async def test_truncated_response_triggers_repair_call():
+    backend = ScriptedBackend(['{"title": "Cut", "synopsis": "s", "target_audience": "a", '
+                               '"estimated_duration": "1m", "scenes": [{"scene_id": "scene_1"}, {"scene_id": "sc'])
+    agent = StoryAnalyst(llm=backend)
+
+    result = await agent.process(CreativeState(memory={"original_prompt": "robots"}))
+
+    assert agent.repair_attempts == 1
+    assert "cut off" in backend.prompts[1]
+    assert result["title"].startswith("Simulated Story")
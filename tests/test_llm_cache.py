@@ -0,0 +1,72 @@
+import json
+import pytest
+from story_team.agents import StoryAnalyst
+from story_team.llm_cache import LLMResponseCache, ReplayCacheMiss
+from story_team.state import CreativeState
+
+
+# A complete StoryAnalyst response, so no repair call is made
+STORY = {
+    "title": "Robot",
+    "synopsis": "A robot wakes up.",
+    "target_audience": "Everyone",
+    "estimated_duration": "1 minute",
+    "scenes": []
+}
+
+
+class FakeResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class CountingLLM:
+    def __init__(self, content: str):
+        self.content = content
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return FakeResponse(self.content)
+
+
+@pytest.mark.asyncio
+async def test_read_through_cache_skips_repeat_calls(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"))
+    agent = StoryAnalyst(llm_cache=cache)
+    agent.llm = CountingLLM(json.dumps(STORY))
+    state = CreativeState(memory={"original_prompt": "robots"})
+
+    first = await agent.process(state)
+    second = await agent.process(state)
+
+    assert first == second == STORY
+    assert agent.llm.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_replay_only_needs_no_api_key(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    path = str(tmp_path / "cache.sqlite")
+    recorder = StoryAnalyst(llm_cache=LLMResponseCache(path))
+    recorder.llm = CountingLLM(json.dumps(STORY))
+    await recorder.process(CreativeState(memory={"original_prompt": "robots"}))
+
+    monkeypatch.delenv("OPENAI_API_KEY")
+    replayer = StoryAnalyst(llm_cache=LLMResponseCache(path, mode="replay_only"))
+
+    assert replayer.llm is None
+    assert await replayer.process(CreativeState(memory={"original_prompt": "robots"})) == STORY
+    with pytest.raises(ReplayCacheMiss):
+        await replayer.process(CreativeState(memory={"original_prompt": "ships"}))
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), ttl_seconds=60)
+    cache.put("key", "model", "response")
+    cache._conn.execute("UPDATE llm_responses SET created_at = created_at - 120")
+
+    assert cache.get("key") is None
+    assert cache.prune() == 0
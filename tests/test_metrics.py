@@ -0,0 +1,34 @@
+import pytest
+from story_team.callbacks import create_callback
+from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.llm_backend import SimulatedLLMBackend
+from story_team.metrics import MetricsRegistry
+
+
+@pytest.mark.asyncio
+async def test_run_reports_per_agent_metrics():
+    metrics_registry = MetricsRegistry()
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_backend=SimulatedLLMBackend(latency=0.01, seed=0),
+        callback=create_callback("quiet"),
+        metrics_registry=metrics_registry
+    )
+
+    result = await coordinator.generate_content("A robot discovers emotions")
+
+    by_agent = result["metrics"]["by_agent"]
+    iterations = result["iterations"]
+    for agent in ("story_analyst", "media_director", "expert_evaluator"):
+        metrics = by_agent[agent]
+        assert metrics["llm_latency_seconds"]["count"] == iterations
+        assert metrics["llm_latency_seconds"]["p50"] >= 0.01
+        assert metrics["prompt_tokens"]["total"] > 0
+        assert metrics["parse_seconds"]["count"] == iterations
+        assert metrics["queue_wait_seconds"]["count"] == iterations
+        assert metrics["state_copy_seconds"]["count"] == iterations
+    assert sorted(result["metrics"]["by_iteration"]) == [str(i) for i in range(iterations)]
+
+    text = metrics_registry.to_prometheus()
+    assert "# TYPE story_team_llm_latency_seconds histogram" in text
+    assert f'story_team_llm_latency_seconds_count{{agent="story_analyst"}} {iterations}' in text
+    assert f'story_team_prompt_tokens_bucket{{agent="media_director",le="+Inf"}} {iterations}' in text
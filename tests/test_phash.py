@@ -0,0 +1,74 @@
+import time
+import pytest
+from asset_generation.image_gen.manifest import AssetManifest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+from asset_generation.image_gen import phash  # noqa: E402
+from asset_generation.image_gen.phash import PerceptualIndex  # noqa: E402
+
+
+def _image(path, seed, size=(256, 144)):
+    rng = np.random.default_rng(seed)
+    # Smooth random pattern so resizing keeps its structure
+    coarse = rng.integers(0, 255, (9, 16, 3), dtype=np.uint8)
+    Image.fromarray(coarse).resize(size, Image.BILINEAR).save(path)
+    return str(path)
+
+
+def test_duplicates_survive_resizing_and_reencoding(tmp_path):
+    original = _image(tmp_path / "a.png", 1)
+    with Image.open(original) as image:
+        image.resize((512, 288)).save(tmp_path / "a_big.jpg", quality=70)
+    other = _image(tmp_path / "b.png", 2)
+
+    index = PerceptualIndex(tmp_path / "index.npz")
+    assert index.add_many([original, tmp_path / "a_big.jpg", other]) == 3
+    assert index.add(original) is None
+
+    assert index.duplicates(max_distance=6) == [[original, str(tmp_path / "a_big.jpg")]]
+    assert index.query(phash.hash_file(other))[0] == {"path": other, "distance": 0}
+
+
+def test_sync_from_manifest_is_incremental_and_persists(tmp_path):
+    manifest = AssetManifest(tmp_path / "manifest.sqlite")
+    for i in range(3):
+        manifest.record(_image(tmp_path / f"s1_{i}.png", i), f"prompt {i}", scene_id="scene_1")
+
+    index = PerceptualIndex(tmp_path / "index.npz", method="dhash")
+    assert index.sync(manifest) == 3
+    assert index.sync(manifest) == 0
+    index.save()
+
+    manifest.record(_image(tmp_path / "s2_0.png", 9), "prompt 9", scene_id="scene_2")
+    reloaded = PerceptualIndex(tmp_path / "index.npz", method="dhash")
+    assert reloaded.sync(manifest) == 1
+    assert len(reloaded) == 4
+
+    matrix = reloaded.scene_similarity("scene_1")
+    assert len(matrix["paths"]) == 3
+    assert [row[i] for i, row in enumerate(matrix["similarity"])] == [1.0, 1.0, 1.0]
+    assert list(reloaded.scene_report()) == ["scene_1"]
+    with pytest.raises(ValueError):
+        PerceptualIndex(tmp_path / "index.npz", method="phash")
+
+    # A row committed after the last sync is picked up even if its timestamp is older
+    late = manifest.record(_image(tmp_path / "s2_1.png", 10), "prompt 10", scene_id="scene_2")
+    manifest._conn.execute("UPDATE assets SET created_at = 0 WHERE asset_id = ?", (late["asset_id"],))
+    assert reloaded.sync(manifest) == 1
+
+
+def test_batched_queries_on_large_index():
+    index = PerceptualIndex()
+    rng = np.random.default_rng(0)
+    index.hashes = rng.integers(0, 2 ** 63, 50000, dtype=np.uint64)
+    index.paths = [f"img_{i}.png" for i in range(50000)]
+    index.scene_ids = [""] * 50000
+
+    start = time.perf_counter()
+    for value in index.hashes[:20]:
+        assert index.query(int(value), max_distance=0)[0]["path"].startswith("img_")
+    distances = phash.hamming(index.hashes, index.hashes[:256])
+
+    assert distances.shape == (256, 50000)
+    assert time.perf_counter() - start < 2.0
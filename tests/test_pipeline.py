@@ -0,0 +1,125 @@
+import threading
+import time
+import pytest
+from story_team.callbacks import create_callback
+from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.llm_backend import SimulatedLLMBackend
+from story_team.pipeline import ProductionPipeline, media_direction_to_visual_outputs
+
+
+class FakeImageGenerator:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.started = []
+        self.lock = threading.Lock()
+
+    def generate_scene_prompt(self, scene_id, prompt_data, output_dir):
+        with self.lock:
+            self.started.append(time.perf_counter())
+        time.sleep(0.01)
+        filepath = output_dir / f"{scene_id}_{prompt_data['prompt_id']}.png"
+        filepath.write_bytes(prompt_data["description"].encode())
+        return str(filepath)
+
+
+def test_media_direction_converts_to_scene_prompts():
+    visual_outputs = media_direction_to_visual_outputs({
+        "visual_style": "Neon noir",
+        "shot_list": [{
+            "scene_id": "scene_001",
+            "shots": [{"shot_id": "001", "description": "A robot.", "lighting": "Rim light", "duration": "3s"}]
+        }]
+    })
+
+    assert visual_outputs == [{
+        "scene_id": "scene_001",
+        "image_prompts": [{
+            "prompt_id": "001",
+            "description": "A robot. Rim light. Style: Neon noir",
+            "metadata": {"lighting": "Rim light", "duration": "3s"}
+        }]
+    }]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_overlaps_images_with_story_generation(tmp_path):
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_backend=SimulatedLLMBackend(latency=0.01, num_scenes=2, shots_per_scene=2, seed=0),
+        callback=create_callback("quiet")
+    )
+    generator = FakeImageGenerator(tmp_path)
+    pipeline = ProductionPipeline(coordinator, generator, story_concurrency=1, image_workers=2, queue_size=2)
+
+    story_finished = []
+    original = coordinator.generate_content
+
+    async def timed_generate_content(prompt, **kwargs):
+        result = await original(prompt, **kwargs)
+        story_finished.append(time.perf_counter())
+        return result
+
+    coordinator.generate_content = timed_generate_content
+    records = [{"id": f"run_{i}", "prompt": f"Prompt {i}"} for i in range(3)]
+
+    results = await pipeline.run(records)
+
+    assert all(sum(len(files) for files in run["images"].values()) == 4 for run in results)
+    assert all(run["failed_jobs"] == 0 for run in results)
+    assert (tmp_path / "run_0" / "scene_001_001.png").exists()
+    # Images for the first concept start before the last concept's story is done
+    assert min(generator.started) < story_finished[-1]
+
+
+@pytest.mark.asyncio
+async def test_delta_mode_generates_untagged_scenes_while_story_is_refined(tmp_path):
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_backend=SimulatedLLMBackend(latency=0.01, num_scenes=3, shots_per_scene=2, flagged_scenes=1, seed=0),
+        callback=create_callback("quiet"),
+        delta_mode=True
+    )
+    generator = FakeImageGenerator(tmp_path)
+    pipeline = ProductionPipeline(coordinator, generator, story_concurrency=1, image_workers=2)
+
+    story_finished = []
+    original = coordinator.generate_content
+
+    async def timed_generate_content(prompt, **kwargs):
+        result = await original(prompt, **kwargs)
+        story_finished.append(time.perf_counter())
+        return result
+
+    coordinator.generate_content = timed_generate_content
+
+    [run] = await pipeline.run([{"id": "solo", "prompt": "A robot discovers emotions"}])
+
+    assert run["content"]["iterations"] > 1
+    assert sorted(run["images"]) == ["scene_001", "scene_002", "scene_003"]
+    assert all(len(files) == 2 for files in run["images"].values())
+    # With a single prompt, images still start before its refinement loop ends
+    assert min(generator.started) < story_finished[0]
+
+
+class FailingImageGenerator(FakeImageGenerator):
+    def generate_scene_prompt(self, scene_id, prompt_data, output_dir):
+        if scene_id == "scene_002":
+            raise RuntimeError("model unavailable")
+        return super().generate_scene_prompt(scene_id, prompt_data, output_dir)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_reports_image_errors_duplicate_ids_and_sanitizes_dirs(tmp_path):
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_backend=SimulatedLLMBackend(num_scenes=2, shots_per_scene=1, seed=0),
+        callback=create_callback("quiet")
+    )
+    pipeline = ProductionPipeline(coordinator, FailingImageGenerator(tmp_path))
+    records = [{"id": "../escape", "prompt": "Prompt 1"}, {"id": "../escape", "prompt": "Prompt 2"}]
+
+    first, duplicate = await pipeline.run(records)
+
+    assert duplicate["error"].startswith("Duplicate id")
+    assert first["failed_jobs"] == 1
+    assert first["image_errors"] == [{"scene_id": "scene_002", "prompt_id": "001", "error": "model unavailable"}]
+    [output_dir] = [path for path in tmp_path.iterdir() if path.is_dir()]
+    assert output_dir.name.startswith("_escape_") and ".." not in output_dir.name
+    assert len(first["images"]["scene_001"]) == 1
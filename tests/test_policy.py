@@ -0,0 +1,55 @@
+import pytest
+from story_team.callbacks import create_callback
+from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.llm_backend import SimulatedLLMBackend
+from story_team.policy import (
+    StoppingPolicy, ScoreThreshold, MaxIterations, Plateau, TokenBudget, CostBudget
+)
+from story_team.usage import RunUsage
+
+
+def _state(scores):
+    return {
+        "iteration": len(scores),
+        "evaluation_result": {"scores": {"overall_score": scores[-1]}},
+        "previous_scores": scores
+    }
+
+
+def test_default_policy_matches_original_rules():
+    policy = StoppingPolicy.default()
+
+    assert policy.check(_state([6.0])) is None
+    assert policy.check(_state([6.0, 8.2])).startswith("score_threshold")
+    assert policy.check(_state([6.0, 6.5, 6.5])).startswith("min_gain")
+    assert policy.check(_state([6.0, 6.5, 7.0])) is None
+    assert policy.check(_state([5.0, 5.5, 6.0, 6.5, 7.0])).startswith("max_iterations")
+
+
+def test_plateau_and_budget_rules():
+    assert Plateau(window=2, min_gain=0.5).check(_state([6.0, 6.2, 6.3]), None).startswith("plateau")
+    assert Plateau(window=2, min_gain=0.5).check(_state([6.0, 6.2, 7.0]), None) is None
+
+    usage = RunUsage()
+    usage.record("gpt-4o", prompt_tokens=600, completion_tokens=200)
+    # 800 tokens after one iteration; a second would reach 1600
+    assert TokenBudget(1000).check(_state([6.0]), usage).startswith("total_tokens: next iteration")
+    assert TokenBudget(1000, project=False).check(_state([6.0]), usage) is None
+    assert CostBudget(0.001).check(_state([6.0]), usage).startswith("estimated_cost_usd: used")
+
+
+@pytest.mark.asyncio
+async def test_coordinator_stops_on_token_budget():
+    policy = StoppingPolicy([ScoreThreshold(9.5), TokenBudget(1, project=False), MaxIterations(5)])
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_backend=SimulatedLLMBackend(base_score=5.0, seed=0),
+        callback=create_callback("quiet"),
+        stopping_policy=policy
+    )
+
+    result = await coordinator.generate_content("A robot discovers emotions")
+
+    assert result["iterations"] == 1
+    assert result["stop_reason"].startswith("total_tokens")
+    assert result["usage"]["llm_calls"] == 3
+    assert result["usage"]["prompt_tokens"] > 0
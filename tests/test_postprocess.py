@@ -0,0 +1,81 @@
+import io
+import pytest
+import requests
+from asset_generation.image_gen import image_generator
+from asset_generation.image_gen.image_generator import ImageGenerator
+from asset_generation.image_gen.postprocess import PostProcessor
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(color, size=(640, 360)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class PNGResponse:
+    def __init__(self, content):
+        self.status_code = 200
+        self.content = content
+        self.headers = {"Content-Length": str(len(content))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        yield self.content
+
+
+@pytest.fixture
+def postprocessor():
+    processor = PostProcessor(formats=("webp", "jpeg"), thumbnail_size=(160, 90), max_workers=2)
+    yield processor
+    processor.close()
+
+
+def test_generate_from_scene_builds_previews_and_contact_sheet(tmp_path, monkeypatch, postprocessor):
+    monkeypatch.setenv("REPLICATE_API_TOKEN", "test-token")
+    monkeypatch.setattr(image_generator.replicate, "run", lambda model, input: f"https://example.invalid/{input['prompt']}")
+    monkeypatch.setattr(requests.Session, "get", lambda session, url, *a, **kw: PNGResponse(_png(url.rsplit("/", 1)[-1])))
+    generator = ImageGenerator(output_dir=str(tmp_path), postprocessor=postprocessor)
+
+    files = generator.generate_from_scene({
+        "scene_id": "scene_001",
+        "image_prompts": [
+            {"prompt_id": "001", "description": "red", "metadata": {}},
+            {"prompt_id": "002", "description": "blue", "metadata": {}},
+            {"prompt_id": "003", "description": "green", "metadata": {}},
+        ]
+    })
+    summary = generator.finish_postprocessing()
+
+    assert len(files["scene_001"]) == 3
+    assert summary["timings"]["thumbnail"]["count"] == 3
+    assert summary["timings"]["encode_webp"]["count"] == 3
+    assert summary["timings"]["encode_jpg"]["count"] == 3
+    assert summary["timings"]["contact_sheet"]["count"] == 1
+    with Image.open(tmp_path / "thumbnails" / "scene_001_001.jpg") as thumb:
+        assert thumb.size == (160, 90)
+    with Image.open(tmp_path / "previews" / "scene_001_002.webp") as preview:
+        assert preview.format == "WEBP"
+    with Image.open(tmp_path / "contact_sheets" / "scene_001.jpg") as sheet:
+        # Three 160px columns, a title row and one labelled row of tiles
+        assert sheet.size == (480, 18 + 90 + 18)
+
+
+def test_failed_task_is_reported(tmp_path, postprocessor):
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    postprocessor.submit_image(str(broken))
+
+    reports = postprocessor.drain()
+
+    assert len(reports) == 3
+    assert all(report["task"] == "error" for report in reports)
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import pytest
+from story_team.callbacks import create_callback
+from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.llm_backend import LazyOpenAILLM, SimulatedLLMBackend, shared_openai_llm
+
+
+def _loaded_after(code: str) -> str:
+    check = "import sys; print(sorted(m for m in ('langgraph', 'langchain_openai', 'openai') if m in sys.modules))"
+    return subprocess.run(
+        [sys.executable, "-c", f"{code}\n{check}"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def test_constructing_coordinator_loads_no_heavy_dependencies():
+    code = (
+        "from story_team.coordinator import EnhancedStoryTeamCoordinator\n"
+        "from story_team.llm_backend import SimulatedLLMBackend\n"
+        "EnhancedStoryTeamCoordinator(llm_backend=SimulatedLLMBackend())\n"
+        "import utils.config"
+    )
+    assert _loaded_after(code) == "[]"
+
+
+def test_workflow_is_compiled_once_on_first_use():
+    coordinator = EnhancedStoryTeamCoordinator(llm_backend=SimulatedLLMBackend(), callback=create_callback("quiet"))
+
+    assert "workflow" not in coordinator.__dict__
+    assert coordinator.workflow is coordinator.workflow
+
+
+def test_lazy_client_checks_key_up_front_and_shares_client(monkeypatch):
+    monkeypatch.setattr("utils.config.load_dotenv", lambda: None)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(ValueError):
+        LazyOpenAILLM()
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    first, second = LazyOpenAILLM(temperature=0.3), LazyOpenAILLM(temperature=0.3)
+
+    assert first.client is second.client is shared_openai_llm(temperature=0.3)
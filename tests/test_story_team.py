@@ -1,5 +1,11 @@
 import pytest
+from rich.console import Console
+from story_team.callbacks import CallbackEventBus, EnhancedStoryTeamCallback, JSONLSink, create_callback
 from story_team.coordinator import EnhancedStoryTeamCoordinator
+from story_team.llm_backend import SimulatedLLMBackend
+from asset_generation.image_gen.ingest import iter_prompt_records
+from story_team.batch import run_batch
+import io
 import json
 
 @pytest.mark.asyncio
@@ -29,4 +35,83 @@ async def test_content_generation(capsys):
     
     # Verify score improvement
     if "previous_scores" in result and len(result["previous_scores"]) > 1:
-        assert result["previous_scores"][-1] >= result["previous_scores"][0], "Score should improve or stay same"
\ No newline at end of file
+        assert result["previous_scores"][-1] >= result["previous_scores"][0], "Score should improve or stay same"
+
+@pytest.mark.asyncio
+async def test_content_generation_offline():
+    backend = SimulatedLLMBackend(num_scenes=2, seed=0)
+    coordinator = EnhancedStoryTeamCoordinator(llm_backend=backend, callback=create_callback("quiet"))
+    
+    result = await coordinator.generate_content("A robot discovers emotions")
+    
+    assert result["iterations"] >= 2
+    assert [scene["scene_id"] for scene in result["story"]["scenes"]] == ["scene_001", "scene_002"]
+    assert len(result["media_direction"]["shot_list"]) == 2
+    assert "overall_score" in result["evaluation"]["scores"]
+    assert backend.calls["story_analyst"] == result["iterations"]
+    assert len(result["previous_scores"]) == result["iterations"]
+    assert len(result["previous_feedback"]) == result["iterations"]
+
+
+@pytest.mark.asyncio
+async def test_batch_runner_streams_results(tmp_path):
+    prompts_path = tmp_path / "prompts.jsonl"
+    prompts_path.write_text(
+        '{"id": "robot", "prompt": "A robot discovers emotions"}\n'
+        '"A lighthouse keeper meets a whale"\n'
+        'not json\n'
+        '{"id": "empty"}\n'
+    )
+    output_path = tmp_path / "results.jsonl"
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_backend=SimulatedLLMBackend(seed=0),
+        callback=create_callback("quiet")
+    )
+    
+    records = list(iter_prompt_records(prompts_path))
+    summary = await run_batch(records, str(output_path), max_concurrency=2, coordinator=coordinator)
+    
+    outputs = {r["id"]: r for r in map(json.loads, output_path.read_text().splitlines())}
+    assert summary == {"succeeded": 2, "failed": 2}
+    assert outputs["robot"]["result"]["iterations"] >= 2
+    assert outputs["line_2"]["prompt"] == "A lighthouse keeper meets a whale"
+    assert "error" in outputs["line_3"] and "error" in outputs["empty"]
+
+
+@pytest.mark.asyncio
+async def test_callback_bus_renders_to_sinks_in_background():
+    events = io.StringIO()
+    rendered = io.StringIO()
+    bus = CallbackEventBus([
+        JSONLSink(stream=events, include_results=False),
+        EnhancedStoryTeamCallback(console=Console(file=rendered))
+    ])
+    coordinator = EnhancedStoryTeamCoordinator(llm_backend=SimulatedLLMBackend(seed=0), callback=bus)
+    
+    result = await coordinator.generate_content("A robot discovers emotions")
+    
+    records = [json.loads(line) for line in events.getvalue().splitlines()]
+    assert records[0]["event"] == "chain_start"
+    assert sum(r["event"] == "agent_finish" for r in records) == 3 * result["iterations"]
+    assert records[-1]["overall_score"] == result["evaluation"]["scores"]["overall_score"]
+    assert "\x1b[" not in rendered.getvalue()
+    assert "EXPERT_EVALUATOR Output" in rendered.getvalue()
+    bus.close()
+
+
+@pytest.mark.asyncio
+async def test_speculative_candidates_keep_best_score():
+    backend = SimulatedLLMBackend(seed=0, score_jitter=1.0)
+    coordinator = EnhancedStoryTeamCoordinator(
+        llm_backend=backend,
+        callback=create_callback("quiet"),
+        num_candidates=3
+    )
+    
+    result = await coordinator.generate_content("A robot discovers emotions")
+    
+    assert len(result["candidate_scores"]) == result["iterations"]
+    assert all(len(scores) == 3 for scores in result["candidate_scores"])
+    assert result["previous_scores"] == [max(scores) for scores in result["candidate_scores"]]
+    assert backend.calls["story_analyst"] == 3 * result["iterations"]
+    assert "temperature=" in result["story"]["title"]
@@ -0,0 +1,47 @@
+import json
+import pytest
+from story_team.agents import MediaDirector, StoryAnalyst
+from story_team.llm_backend import SimulatedLLMBackend
+from story_team.state import CreativeState
+from story_team.streaming import IncrementalJSONParser
+
+
+def test_parser_emits_items_as_they_complete():
+    document = json.dumps({
+        "title": "A {tricky} \"title\" [with] brackets",
+        "scenes": [
+            {"scene_id": "scene_001", "nested": {"a": [1, 2]}},
+            {"scene_id": "scene_002", "quote": "}]"}
+        ],
+        "feedback_addressed": ["x"]
+    })
+    parser = IncrementalJSONParser([("scenes",)])
+    stream = "```json\n" + document + "\n```"
+
+    emitted = []
+    for i in range(0, len(stream), 7):
+        emitted.append(parser.feed(stream[i:i + 7]))
+
+    items = [item for batch in emitted for item in batch]
+    assert [item["scene_id"] for _, item in items] == ["scene_001", "scene_002"]
+    assert all(path == "scenes" for path, _ in items)
+    # The first scene is available before the document is complete
+    first_batch = next(i for i, batch in enumerate(emitted) if batch)
+    assert first_batch < len(emitted) - 2
+    assert parser.done
+
+
+@pytest.mark.asyncio
+async def test_stream_process_yields_scenes_and_shots_before_result():
+    backend = SimulatedLLMBackend(num_scenes=3, shots_per_scene=2, stream_chunk_size=16)
+    state = CreativeState(memory={"original_prompt": "robots"})
+
+    story_events = [e async for e in StoryAnalyst(llm=backend).stream_process(state)]
+    media_events = [e async for e in MediaDirector(llm=backend).stream_process(state)]
+
+    assert [e["type"] for e in story_events] == ["item"] * 3 + ["result"]
+    assert story_events[-1]["result"]["scenes"][0] == story_events[0]["item"]
+    shot_events = [e for e in media_events if e.get("path") == "shot_list/shots"]
+    scene_events = [e for e in media_events if e.get("path") == "shot_list"]
+    assert len(shot_events) == 6 and len(scene_events) == 3
+    assert media_events[-1]["type"] == "result"
@@ -1,11 +1,19 @@
 import os
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
 
-# Get OpenAI API key from environment variable
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+def get_openai_api_key() -> str:
+    """OpenAI API key from the environment, loading .env only if it is not set there"""
+    if not os.getenv("OPENAI_API_KEY"):
+        load_dotenv()
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is not set")
+    return openai_api_key
 
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable is not set") 
\ No newline at end of file
+
+def __getattr__(name: str):
+    # OPENAI_API_KEY is resolved on access, so importing this module never fails
+    if name == "OPENAI_API_KEY":
+        return get_openai_api_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
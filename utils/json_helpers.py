@@ -1,7 +1,154 @@
+from typing import Any, List, Tuple
+import json
+import re
+
+# The closing fence must start a line; JSON strings cannot hold raw newlines,
+# so a ``` inside a string value never ends the block
+_FENCE = re.compile(r"```(?:json|JSON)?[ \t]*\n?(.*?)(?:\n[ \t]*```|\Z)", re.DOTALL)
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+# Cut points tried when closing truncated JSON, newest first
+_MAX_REPAIR_ATTEMPTS = 64
+
+
 def extract_json_from_markdown(markdown_text: str) -> str:
-    """Extract JSON content from markdown code block."""
-    if markdown_text.startswith('```json\n'):
-        markdown_text = markdown_text[7:]
-    if markdown_text.endswith('\n```'):
-        markdown_text = markdown_text[:-4]
-    return markdown_text.strip() 
\ No newline at end of file
+    """Extract JSON content from a markdown code block, tolerating prose around it."""
+    text = markdown_text.strip()
+    match = _FENCE.search(text)
+    if match:
+        starts = [pos for pos in (text.find("{"), text.find("[")) if pos != -1]
+        # A ``` after the value has started is inside it (code in a string), not a fence
+        if not starts or match.start() < min(starts):
+            return match.group(1).strip()
+    return text
+
+
+def _strip_trailing_comma(out: List[str]) -> None:
+    k = len(out) - 1
+    while k >= 0 and out[k].isspace():
+        k -= 1
+    if k >= 0 and out[k] == ",":
+        del out[k]
+
+
+def _scan(text: str) -> Tuple[str, List[str], bool, List[Tuple[int, Tuple[str, ...]]]]:
+    """Clean one JSON value: drop comments and trailing commas, fix Python literals.
+
+    Returns the cleaned text, the closers still open at the end, whether a
+    string is still open, and the positions after each comma and before each
+    opening bracket with the closers open there, which are the places a
+    truncated value can be cut back to without inventing content.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []
+    in_string = escape = False
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            i += 1
+            continue
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif ch in "{[":
+            # Cutting before the bracket drops a half-written element entirely
+            cuts.append((len(out), tuple(stack)))
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                # End of the top-level value; anything after it is prose
+                break
+        elif ch == ",":
+            cuts.append((len(out), tuple(stack)))
+            out.append(ch)
+        elif ch.isalpha():
+            end = i
+            while end < n and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[i:end]
+            out.append(_LITERALS.get(word, word))
+            i = end
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out), stack, in_string, cuts
+
+
+def repair_json_report(text: str) -> Tuple[str, bool]:
+    """Repair LLM JSON output; returns the repaired text and whether it was truncated.
+
+    Handles markdown fences and prose around the value, // and /* */
+    comments, trailing commas and Python True/False/None. A response cut off
+    mid-way is closed after its last complete member, dropping any partial
+    trailing element, and reported as truncated since content is missing.
+    """
+    text = extract_json_from_markdown(text)
+    starts = [pos for pos in (text.find("{"), text.find("[")) if pos != -1]
+    if not starts:
+        return text, False
+    body, stack, in_string, cuts = _scan(text[min(starts):])
+    if not stack and not in_string:
+        return body, False
+
+    candidates = [(body + ('"' if in_string else ""), tuple(stack))]
+    candidates.extend((body[:pos], closers) for pos, closers in reversed(cuts))
+    for candidate, closers in candidates[:_MAX_REPAIR_ATTEMPTS]:
+        candidate = candidate.rstrip().rstrip(",")
+        closed = candidate + "".join(reversed(closers))
+        try:
+            json.loads(closed)
+            return closed, True
+        except json.JSONDecodeError:
+            continue
+    return body, True
+
+
+def repair_json(text: str) -> str:
+    """Best-effort repair of LLM JSON output; see repair_json_report"""
+    return repair_json_report(text)[0]
+
+
+def parse_json_report(text: str) -> Tuple[Any, bool]:
+    """Parse JSON from an LLM response; returns the value and whether it was truncated.
+
+    Raises json.JSONDecodeError when nothing usable can be recovered.
+    """
+    # Plain JSON first, so a ``` inside a string value is never taken for a fence
+    for candidate in (text.strip(), extract_json_from_markdown(text)):
+        try:
+            return json.loads(candidate), False
+        except json.JSONDecodeError:
+            continue
+    repaired, truncated = repair_json_report(text)
+    return json.loads(repaired), truncated
+
+
+def parse_json(text: str) -> Any:
+    """Parse JSON from an LLM response, repairing it if needed.
+
+    Raises json.JSONDecodeError when nothing usable can be recovered.
+    """
+    return parse_json_report(text)[0]